@@ -0,0 +1,79 @@
+"""Compare whole-tree vs streaming parsing of an arXiv Atom page.
+
+    python benchmarks/bench_atom_parse.py --entries 2000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from collections.abc import Callable
+from typing import Any
+
+from eegfm_digest.arxiv import ATOM_NS, iter_feed_entries, parse_entry
+
+
+def synthetic_feed(entries: int) -> bytes:
+    parts = [
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">',
+        f"<opensearch:totalResults>{entries}</opensearch:totalResults>",
+    ]
+    abstract = " ".join(["EEG foundation model pretraining on large unlabeled corpora."] * 20)
+    for i in range(entries):
+        arxiv_id = f"2501.{i:05d}v1"
+        authors = "".join(f"<author><name>Author {i}-{a}</name></author>" for a in range(6))
+        parts.append(
+            f"<entry><id>http://arxiv.org/abs/{arxiv_id}</id>"
+            "<updated>2025-01-05T00:00:00Z</updated><published>2025-01-05T00:00:00Z</published>"
+            f"<title>Paper {i}</title><summary>{abstract}</summary>{authors}"
+            '<category term="cs.LG"/><category term="eess.SP"/>'
+            f'<link href="http://arxiv.org/abs/{arxiv_id}" rel="alternate" type="text/html"/>'
+            f'<link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}" rel="related" type="application/pdf"/>'
+            "</entry>"
+        )
+    parts.append("</feed>")
+    return "".join(parts).encode("utf-8")
+
+
+def parse_tree(payload: bytes) -> list[dict[str, Any]]:
+    # The previous implementation: decode to str, build the full tree, then walk it.
+    root = ET.fromstring(payload.decode("utf-8"))
+    return [parse_entry(e) for e in root.findall("atom:entry", ATOM_NS)]
+
+
+def parse_stream(payload: bytes) -> list[dict[str, Any]]:
+    return list(iter_feed_entries(io.BytesIO(payload)))
+
+
+def measure(fn: Callable[[bytes], list[dict[str, Any]]], payload: bytes, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(payload)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(payload)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = synthetic_feed(args.entries)
+    assert parse_tree(payload) == parse_stream(payload)
+    print(f"feed: {args.entries} entries, {len(payload) / 1e6:.1f} MB")
+    for name, fn in (("fromstring", parse_tree), ("iterparse", parse_stream)):
+        seconds, peak = measure(fn, payload, args.repeat)
+        print(f"{name:>10}: best {seconds * 1000:7.1f} ms  peak {peak / 1e6:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Replay the TF-IDF pre-filter over accumulated triage history.
+
+    python benchmarks/bench_prefilter.py --outputs outputs --margins 0.3 0.5 0.7
+    python benchmarks/bench_prefilter.py --from-db data/digest.sqlite
+    python benchmarks/bench_prefilter.py --from-docs docs/digest
+
+Each month is scored by a pre-filter trained only on earlier months, so the numbers match
+what an incremental run would have done. Reports recall on LLM accepts and borderlines and
+the share of LLM triage calls the pre-filter would have saved.
+
+`--from-docs` works on a fresh checkout but only sees the published accepts (rejected
+candidates are not published, and the published summary stands in for the abstract), so it
+measures accept recall only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+from eegfm_digest import serde
+from eegfm_digest.db import DigestDB
+from eegfm_digest.prefilter import PREFILTER_REASON, train_prefilter
+from eegfm_digest.render import iter_jsonl
+
+History = dict[str, tuple[list[dict[str, Any]], dict[str, str]]]
+
+
+def _llm_decision(row: dict[str, Any]) -> str | None:
+    """The LLM's decision, or None for rows the pre-filter or an exception fallback wrote."""
+    reasons = row.get("reasons") or []
+    if PREFILTER_REASON in reasons or "automatic_reject_fallback" in reasons:
+        return None
+    return row.get("decision", "reject")
+
+
+def _add(history: History, month: str, paper: dict[str, Any], row: dict[str, Any]) -> None:
+    decision = _llm_decision(row)
+    if decision is not None:
+        papers, decisions = history.setdefault(month, ([], {}))
+        papers.append(paper)
+        decisions[paper["arxiv_id_base"]] = decision
+
+
+def history_from_outputs(output_dir: Path) -> History:
+    history: History = {}
+    for month_dir in sorted(p for p in output_dir.iterdir() if p.is_dir()):
+        raw_path, triage_path = month_dir / "arxiv_raw.json", month_dir / "triage.jsonl"
+        if not raw_path.exists() or not triage_path.exists():
+            continue
+        papers = {p["arxiv_id_base"]: p for p in serde.loads(raw_path.read_bytes())}
+        for row in iter_jsonl(triage_path, fields=("arxiv_id_base", "decision", "reasons")):
+            if row["arxiv_id_base"] in papers:
+                _add(history, month_dir.name, papers[row["arxiv_id_base"]], row)
+    return history
+
+
+def history_from_db(db_path: Path) -> History:
+    """Candidates and triage rows joined from the `papers` and `triage` tables of the digest DB."""
+    history: History = {}
+    db = DigestDB(db_path)
+    try:
+        rows = db.conn.execute(
+            "SELECT t.month, p.metadata_json, t.triage_json FROM triage t "
+            "JOIN papers p ON p.arxiv_id_base = t.arxiv_id_base"
+        ).fetchall()
+        for row in rows:
+            _add(history, row["month"], serde.loads(row["metadata_json"]), serde.loads(row["triage_json"]))
+    finally:
+        db.close()
+    return history
+
+
+def history_from_docs(digest_dir: Path) -> History:
+    """Published accepts, with the summary's one-liner and detailed summary as the abstract."""
+    history: History = {}
+    for path in sorted(digest_dir.glob("*/papers.json")):
+        for paper in json.loads(path.read_text(encoding="utf-8"))["papers"]:
+            summary = paper.get("summary") or {}
+            text = f"{summary.get('one_liner', '')}\n{summary.get('detailed_summary', '')}"
+            _add(history, path.parent.name, {**paper, "summary": text}, paper["triage"])
+    return history
+
+
+def replay(history: History, margin: float) -> dict[str, float]:
+    totals = {"months": 0, "candidates": 0, "saved": 0, "accept": 0, "accept_kept": 0}
+    totals.update({"borderline": 0, "borderline_kept": 0, "seconds": 0.0})
+    seen_papers: list[dict[str, Any]] = []
+    seen_decisions: dict[str, str] = {}
+    for month in sorted(history):
+        papers, decisions = history[month]
+        t0 = time.perf_counter()
+        prefilter = train_prefilter(seen_papers, seen_decisions, margin=margin)
+        seen_papers.extend(papers)
+        seen_decisions.update(decisions)
+        if prefilter is None:
+            continue
+        rejected = {p["arxiv_id_base"] for p in papers if prefilter.rejects(p)}
+        totals["seconds"] += time.perf_counter() - t0
+        totals["months"] += 1
+        totals["candidates"] += len(papers)
+        totals["saved"] += len(rejected)
+        for aid, decision in decisions.items():
+            if decision in {"accept", "borderline"}:
+                totals[decision] += 1
+                totals[f"{decision}_kept"] += aid not in rejected
+    return totals
+
+
+def _pct(num: float, den: float) -> str:
+    return f"{num}/{den} ({100 * num / den:.1f}%)" if den else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--outputs", type=Path, default=Path("outputs"))
+    source.add_argument("--from-db", type=Path, help="digest SQLite DB, e.g. data/digest.sqlite")
+    source.add_argument("--from-docs", type=Path, help="published digests, e.g. docs/digest")
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.3, 0.5, 0.7])
+    args = parser.parse_args()
+
+    path = args.from_db or args.from_docs or args.outputs
+    if not path.exists():
+        raise SystemExit(f"Nothing at {path}; run a backfill first or pass --from-docs docs/digest.")
+    if args.from_db:
+        history = history_from_db(args.from_db)
+    elif args.from_docs:
+        history = history_from_docs(args.from_docs)
+    else:
+        history = history_from_outputs(args.outputs)
+
+    print(f"{'margin':>6} {'months':>6} {'cands':>6} {'saved':>12} {'accept recall':>15} {'border recall':>15} {'time':>7}")
+    for margin in args.margins:
+        t = replay(history, margin)
+        print(
+            f"{margin:>6.2f} {t['months']:>6} {t['candidates']:>6} {_pct(t['saved'], t['candidates']):>12} "
+            f"{_pct(t['accept_kept'], t['accept']):>15} {_pct(t['borderline_kept'], t['borderline']):>15} "
+            f"{t['seconds']:>6.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compare JSON backends over a published site tree.
+
+    python benchmarks/bench_serde.py --docs docs --repeat 5
+
+Decodes and re-encodes every `*.json` under `docs/digest` and `docs/data` with each
+available backend, and checks that the pretty output reproduces each file byte for byte
+(so `month_rev` hashes are unchanged).
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from eegfm_digest import serde
+
+
+def _time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=Path, default=Path("docs"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(p for sub in ("digest", "data") for p in (args.docs / sub).rglob("*.json"))
+    if not paths:
+        raise SystemExit(f"No JSON files under {args.docs}/digest or {args.docs}/data.")
+    raw = [p.read_bytes() for p in paths]
+    print(f"{len(paths)} files, {sum(map(len, raw)) / 1e6:.1f} MB")
+    print(f"{'backend':>8} {'loads':>9} {'dumps':>9} {'compact':>9} {'identical':>10}")
+    previous = serde.backend()
+    try:
+        for name in serde.BACKENDS:
+            serde.use_backend(name)
+            docs = [serde.loads(data) for data in raw]
+            identical = sum(
+                (serde.dumps(doc, pretty=True) + "\n").encode("utf-8") == data
+                for doc, data in zip(docs, raw)
+            )
+            loads = _time(lambda: [serde.loads(data) for data in raw], args.repeat)
+            dumps = _time(
+                lambda docs=docs: [serde.dumps(doc, pretty=True) for doc in docs], args.repeat
+            )
+            compact = _time(lambda docs=docs: [serde.dumps(doc) for doc in docs], args.repeat)
+            print(
+                f"{name:>8} {loads * 1e3:>7.1f}ms {dumps * 1e3:>7.1f}ms {compact * 1e3:>7.1f}ms "
+                f"{identical:>4}/{len(paths)}"
+            )
+    finally:
+        serde.use_backend(previous)
+
+
+if __name__ == "__main__":
+    main()
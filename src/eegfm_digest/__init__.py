@@ -1,5 +1,6 @@
 __all__ = [
     "arxiv",
+    "concurrency",
     "config",
     "db",
     "keywords",
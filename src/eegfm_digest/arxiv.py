@@ -1,18 +1,36 @@
 from __future__ import annotations
 
+import io
 import re
+import sys
 import time
 import xml.etree.ElementTree as ET
-from datetime import datetime, timezone
-from typing import Any
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any
 
 import httpx
 
+from .concurrency import RateLimiter, map_ordered
 from .keywords import ARXIV_CATEGORIES, QUERY_A, QUERY_B
 
 ARXIV_API_URL = "https://export.arxiv.org/api/query"
 ATOM_NS = {"atom": "http://www.w3.org/2005/Atom"}
 
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ATOM_ENTRY = f"{_ATOM}entry"
+_ATOM_ID = f"{_ATOM}id"
+_ATOM_TITLE = f"{_ATOM}title"
+_ATOM_SUMMARY = f"{_ATOM}summary"
+_ATOM_PUBLISHED = f"{_ATOM}published"
+_ATOM_UPDATED = f"{_ATOM}updated"
+_ATOM_AUTHOR = f"{_ATOM}author"
+_ATOM_NAME = f"{_ATOM}name"
+_ATOM_CATEGORY = f"{_ATOM}category"
+_ATOM_LINK = f"{_ATOM}link"
+_OPENSEARCH_TOTAL = "{http://a9.com/-/spec/opensearch/1.1/}totalResults"
+
 
 def month_bounds(month: str) -> tuple[datetime, datetime]:
     year, mon = month.split("-")
@@ -35,35 +53,66 @@ def parse_arxiv_id(raw_id: str) -> tuple[str, int]:
 
 
 def parse_entry(entry: ET.Element) -> dict[str, Any]:
-    paper_id = entry.findtext("atom:id", default="", namespaces=ATOM_NS)
-    arxiv_id_base, version = parse_arxiv_id(paper_id)
-    categories = [el.attrib.get("term", "") for el in entry.findall("atom:category", ATOM_NS)]
-    links = {el.attrib.get("title", ""): el.attrib.get("href", "") for el in entry.findall("atom:link", ATOM_NS)}
+    # One pass over the entry's children instead of a findtext/findall per field.
+    text: dict[str, str] = {}
+    authors: list[str] = []
+    categories: list[str] = []
     pdf_link = ""
-    for el in entry.findall("atom:link", ATOM_NS):
-        if el.attrib.get("type") == "application/pdf":
-            pdf_link = el.attrib.get("href", "")
-            break
-    if not pdf_link:
-        pdf_link = links.get("pdf", "")
+    titled_pdf = ""
+    for child in entry:
+        tag = child.tag
+        if tag == _ATOM_AUTHOR:
+            authors.append(child.findtext(_ATOM_NAME, default=""))
+        elif tag == _ATOM_CATEGORY:
+            categories.append(child.attrib.get("term", ""))
+        elif tag == _ATOM_LINK:
+            if not pdf_link and child.attrib.get("type") == "application/pdf":
+                pdf_link = child.attrib.get("href", "")
+            if child.attrib.get("title", "") == "pdf":
+                titled_pdf = child.attrib.get("href", "")
+        elif tag not in text:
+            text[tag] = child.text or ""
+    paper_id = text.get(_ATOM_ID, "")
+    arxiv_id_base, version = parse_arxiv_id(paper_id)
 
     return {
         "arxiv_id": paper_id.rsplit("/", 1)[-1],
         "arxiv_id_base": arxiv_id_base,
         "version": version,
-        "title": " ".join((entry.findtext("atom:title", default="", namespaces=ATOM_NS)).split()),
-        "summary": " ".join((entry.findtext("atom:summary", default="", namespaces=ATOM_NS)).split()),
-        "authors": [a.findtext("atom:name", default="", namespaces=ATOM_NS) for a in entry.findall("atom:author", ATOM_NS)],
+        "title": " ".join(text.get(_ATOM_TITLE, "").split()),
+        "summary": " ".join(text.get(_ATOM_SUMMARY, "").split()),
+        "authors": authors,
         "categories": categories,
-        "published": entry.findtext("atom:published", default="", namespaces=ATOM_NS),
-        "updated": entry.findtext("atom:updated", default="", namespaces=ATOM_NS),
+        "published": text.get(_ATOM_PUBLISHED, ""),
+        "updated": text.get(_ATOM_UPDATED, ""),
         "links": {
             "abs": paper_id,
-            "pdf": pdf_link,
+            "pdf": pdf_link or titled_pdf,
         },
     }
 
 
+def iter_feed_entries(source: IO[bytes], meta: dict[str, Any] | None = None) -> Iterator[dict[str, Any]]:
+    """Incrementally parse an Atom feed, yielding entry dicts as each `<entry>` closes.
+
+    Finished entries are dropped from the tree, so memory stays flat in the number of
+    entries. `opensearch:totalResults` is stored in `meta["total"]` when present.
+    """
+    root: ET.Element | None = None
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if root is None:
+            root = elem
+            continue
+        if event != "end":
+            continue
+        if elem.tag == _ATOM_ENTRY:
+            yield parse_entry(elem)
+            root.clear()
+        elif elem.tag == _OPENSEARCH_TOTAL and meta is not None:
+            total = (elem.text or "").strip()
+            meta["total"] = int(total) if total.isdigit() else None
+
+
 def in_month(published: str, month: str) -> bool:
     dt = datetime.fromisoformat(published.replace("Z", "+00:00"))
     start, end = month_bounds(month)
@@ -83,6 +132,94 @@ def dedupe_latest(papers: list[dict[str, Any]]) -> list[dict[str, Any]]:
     return sorted(by_base.values(), key=lambda x: (x["published"], x["arxiv_id_base"]))
 
 
+def _new_client(connect_timeout_seconds: float, read_timeout_seconds: float) -> httpx.Client:
+    return httpx.Client(
+        timeout=httpx.Timeout(connect=connect_timeout_seconds, read=read_timeout_seconds, write=30.0, pool=30.0)
+    )
+
+
+def _interval_limiter(rate_limit_seconds: float) -> RateLimiter:
+    return RateLimiter(1.0 / rate_limit_seconds if rate_limit_seconds > 0 else 0.0)
+
+
+@dataclass(frozen=True)
+class _Session:
+    client: Any
+    limiter: RateLimiter
+    retries: int
+    retry_backoff_seconds: float
+    page_size: int
+    max_start: int
+
+
+def _fetch_page(
+    session: _Session,
+    query: str,
+    start: int,
+    max_results: int,
+) -> tuple[list[dict[str, Any]], int | None]:
+    params = {
+        "search_query": query,
+        "start": start,
+        "max_results": max_results,
+        "sortBy": "submittedDate",
+        "sortOrder": "descending",
+    }
+    attempt = 0
+    while True:
+        # Every request (retries included) takes a token, so queries sharing a limiter
+        # stay within arXiv's global rate limit however their pages interleave.
+        session.limiter.acquire()
+        try:
+            resp = session.client.get(ARXIV_API_URL, params=params)
+            resp.raise_for_status()
+            break
+        except httpx.HTTPStatusError as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            retryable = status == 429 or (status is not None and status >= 500)
+            attempt += 1
+            if (not retryable) or attempt > session.retries:
+                raise RuntimeError(
+                    f"arXiv request failed after {attempt} attempts "
+                    f"(status={status}, start={start}, max_results={max_results})"
+                ) from exc
+            time.sleep(session.retry_backoff_seconds * (2 ** (attempt - 1)))
+        except (httpx.ReadTimeout, httpx.TransportError) as exc:
+            attempt += 1
+            if attempt > session.retries:
+                raise RuntimeError(
+                    f"arXiv request failed after {attempt} attempts "
+                    f"(start={start}, max_results={max_results})"
+                ) from exc
+            time.sleep(session.retry_backoff_seconds * (2 ** (attempt - 1)))
+    meta: dict[str, Any] = {"total": None}
+    entries = list(iter_feed_entries(io.BytesIO(resp.content), meta))
+    return entries, meta["total"]
+
+
+def _page_through(
+    session: _Session,
+    query: str,
+    max_results: int,
+    first_page: list[dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    results: list[dict[str, Any]] = []
+    start = 0
+    if first_page is not None:
+        results.extend(first_page)
+        if len(first_page) < min(session.page_size, max_results):
+            return results
+        start = len(first_page)
+    while start <= session.max_start and len(results) < max_results:
+        chunk = min(session.page_size, max_results - len(results))
+        entries, _total = _fetch_page(session, query, start, chunk)
+        results.extend(entries)
+        if len(entries) < chunk:
+            break
+        start += chunk
+    return results
+
+
 def fetch_query(
     query: str,
     max_results: int,
@@ -94,86 +231,259 @@ def fetch_query(
     retries: int = 2,
     retry_backoff_seconds: float = 2.0,
     client: httpx.Client | None = None,
+    limiter: RateLimiter | None = None,
 ) -> list[dict[str, Any]]:
     created_client = client is None
-    client = client or httpx.Client(
-        timeout=httpx.Timeout(connect=connect_timeout_seconds, read=read_timeout_seconds, write=30.0, pool=30.0)
+    client = client or _new_client(connect_timeout_seconds, read_timeout_seconds)
+    session = _Session(
+        client=client,
+        limiter=limiter or _interval_limiter(rate_limit_seconds),
+        retries=retries,
+        retry_backoff_seconds=retry_backoff_seconds,
+        page_size=page_size,
+        max_start=max_start,
     )
-    results: list[dict[str, Any]] = []
     try:
-        start = 0
-        while start <= max_start and len(results) < max_results:
-            chunk = min(page_size, max_results - len(results))
-            params = {
-                "search_query": query,
-                "start": start,
-                "max_results": chunk,
-                "sortBy": "submittedDate",
-                "sortOrder": "descending",
-            }
-            attempt = 0
-            while True:
-                try:
-                    resp = client.get(ARXIV_API_URL, params=params)
-                    resp.raise_for_status()
-                    break
-                except httpx.HTTPStatusError as exc:
-                    status = exc.response.status_code if exc.response is not None else None
-                    retryable = status == 429 or (status is not None and status >= 500)
-                    attempt += 1
-                    if (not retryable) or attempt > retries:
-                        raise RuntimeError(
-                            f"arXiv request failed after {attempt} attempts "
-                            f"(status={status}, start={start}, max_results={chunk})"
-                        ) from exc
-                    time.sleep(retry_backoff_seconds * (2 ** (attempt - 1)))
-                except (httpx.ReadTimeout, httpx.TransportError) as exc:
-                    attempt += 1
-                    if attempt > retries:
-                        raise RuntimeError(
-                            f"arXiv request failed after {attempt} attempts "
-                            f"(start={start}, max_results={chunk})"
-                        ) from exc
-                    time.sleep(retry_backoff_seconds * (2 ** (attempt - 1)))
-            root = ET.fromstring(resp.text)
-            entries = root.findall("atom:entry", ATOM_NS)
-            parsed = [parse_entry(e) for e in entries]
-            results.extend(parsed)
-            if len(entries) < chunk:
-                break
-            start += chunk
-            time.sleep(rate_limit_seconds)
+        return _page_through(session, query, max_results)
     finally:
         if created_client:
             client.close()
-    return results
 
 
-def fetch_month_candidates(
-    max_candidates: int,
-    month: str,
+def submitted_date_clause(start: datetime, end: datetime) -> str:
+    # arXiv ranges are inclusive and minute-granular; `end` is exclusive like month_bounds.
+    last = end - timedelta(minutes=1)
+    return f"submittedDate:[{start:%Y%m%d%H%M} TO {last:%Y%m%d%H%M}]"
+
+
+def updated_since_clause(since: datetime, until: datetime) -> str:
+    # Inclusive on both ends: entries stamped in the watermark's minute are re-fetched and
+    # collapse again in dedupe_latest.
+    return f"lastUpdatedDate:[{since:%Y%m%d%H%M} TO {until:%Y%m%d%H%M}]"
+
+
+def windowed_query(query: str, start: datetime, end: datetime) -> str:
+    return f"({query}) AND {submitted_date_clause(start, end)}"
+
+
+def _fetch_window(
+    session: _Session,
+    query: str,
+    start: datetime,
+    end: datetime,
+    max_results: int,
+    min_window: timedelta,
+) -> list[dict[str, Any]]:
+    windowed = windowed_query(query, start, end)
+    first, total = _fetch_page(session, windowed, 0, min(session.page_size, max_results))
+    reachable = session.max_start + session.page_size
+    if total is not None and total > reachable and end - start > min_window:
+        # Too many hits to page through: split the window and fetch each half, newest first.
+        mid = (start + (end - start) / 2).replace(second=0, microsecond=0)
+        newer = _fetch_window(session, query, mid, end, max_results, min_window)
+        remaining = max_results - len(newer)
+        if remaining <= 0:
+            return newer
+        return newer + _fetch_window(session, query, start, mid, remaining, min_window)
+    return _page_through(session, windowed, max_results, first_page=first)
+
+
+def fetch_window(
+    query: str,
+    start: datetime,
+    end: datetime,
+    max_results: int,
     rate_limit_seconds: float,
+    page_size: int = 100,
+    max_start: int = 5000,
     connect_timeout_seconds: float = 10.0,
     read_timeout_seconds: float = 60.0,
     retries: int = 2,
     retry_backoff_seconds: float = 2.0,
+    client: httpx.Client | None = None,
+    limiter: RateLimiter | None = None,
+    min_window: timedelta = timedelta(hours=1),
 ) -> list[dict[str, Any]]:
-    combined = fetch_query(
-        QUERY_A,
-        max_candidates,
-        rate_limit_seconds,
-        connect_timeout_seconds=connect_timeout_seconds,
-        read_timeout_seconds=read_timeout_seconds,
-        retries=retries,
-        retry_backoff_seconds=retry_backoff_seconds,
-    ) + fetch_query(
-        QUERY_B,
-        max_candidates,
-        rate_limit_seconds,
-        connect_timeout_seconds=connect_timeout_seconds,
-        read_timeout_seconds=read_timeout_seconds,
+    """Fetch `query` restricted to submissions in `[start, end)`.
+
+    Windows whose hit count exceeds what paging can reach (`max_start + page_size`)
+    are split in half recursively, down to `min_window`.
+    """
+    created_client = client is None
+    client = client or _new_client(connect_timeout_seconds, read_timeout_seconds)
+    session = _Session(
+        client=client,
+        limiter=limiter or _interval_limiter(rate_limit_seconds),
         retries=retries,
         retry_backoff_seconds=retry_backoff_seconds,
+        page_size=page_size,
+        max_start=max_start,
     )
+    try:
+        return _fetch_window(session, query, start, end, max_results, min_window)
+    finally:
+        if created_client:
+            client.close()
+
+
+def fetch_month_candidates(
+    max_candidates: int,
+    month: str,
+    rate_limit_seconds: float,
+    connect_timeout_seconds: float = 10.0,
+    read_timeout_seconds: float = 60.0,
+    retries: int = 2,
+    retry_backoff_seconds: float = 2.0,
+) -> list[dict[str, Any]]:
+    queries = [QUERY_A, QUERY_B]
+    start, end = month_bounds(month)
+    limiter = _interval_limiter(rate_limit_seconds)
+    with _new_client(connect_timeout_seconds, read_timeout_seconds) as client:
+        per_query = map_ordered(
+            lambda query: fetch_window(
+                query,
+                start,
+                end,
+                max_candidates,
+                rate_limit_seconds,
+                retries=retries,
+                retry_backoff_seconds=retry_backoff_seconds,
+                client=client,
+                limiter=limiter,
+            ),
+            queries,
+            workers=len(queries),
+        )
+        combined = [row for rows in per_query for row in rows]
     filtered = [p for p in combined if category_match(p["categories"]) and in_month(p["published"], month)]
     return dedupe_latest(filtered)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def fetch_month_updates(
+    existing: list[dict[str, Any]],
+    watermarks: dict[str, str],
+    max_candidates: int,
+    month: str,
+    rate_limit_seconds: float,
+    connect_timeout_seconds: float = 10.0,
+    read_timeout_seconds: float = 60.0,
+    retries: int = 2,
+    retry_backoff_seconds: float = 2.0,
+    now: datetime | None = None,
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """Refresh a month's candidates, asking arXiv only for entries updated since each watermark.
+
+    `watermarks` maps query -> highest `updated` seen for that query; queries without one
+    get a full windowed fetch. New entries are merged into `existing` via dedupe_latest and
+    the merge keeps at most `max_candidates` rows, newest first, like a per-month fetch.
+    Returns the merged candidates and the advanced watermarks.
+    """
+    queries = [QUERY_A, QUERY_B]
+    start, end = month_bounds(month)
+    until = (now or datetime.now(timezone.utc)).astimezone(timezone.utc)
+    limiter = _interval_limiter(rate_limit_seconds)
+    with _new_client(connect_timeout_seconds, read_timeout_seconds) as client:
+
+        def fetch(query: str) -> list[dict[str, Any]]:
+            since = watermarks.get(query)
+            if since is not None:
+                query = f"{query} AND {updated_since_clause(_parse_timestamp(since), until)}"
+            return fetch_window(
+                query,
+                start,
+                end,
+                max_candidates if since is None else sys.maxsize,
+                rate_limit_seconds,
+                retries=retries,
+                retry_backoff_seconds=retry_backoff_seconds,
+                client=client,
+                limiter=limiter,
+            )
+
+        per_query = list(map_ordered(fetch, queries, workers=len(queries)))
+
+    advanced = dict(watermarks)
+    for query, rows in zip(queries, per_query):
+        stamps = [r["updated"] for r in rows if r.get("updated")]
+        if query in watermarks:
+            stamps.append(watermarks[query])
+        if stamps:
+            advanced[query] = max(stamps, key=_parse_timestamp)
+    fresh = [
+        p
+        for rows in per_query
+        for p in rows
+        if category_match(p["categories"]) and in_month(p["published"], month)
+    ]
+    return dedupe_latest(existing + fresh)[-max_candidates:], advanced
+
+
+def month_of(published: str) -> str:
+    dt = datetime.fromisoformat(published.replace("Z", "+00:00")).astimezone(timezone.utc)
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+
+def _contiguous_month_runs(months: list[str]) -> list[tuple[datetime, datetime]]:
+    runs: list[tuple[datetime, datetime]] = []
+    for month in sorted(set(months)):
+        start, end = month_bounds(month)
+        if runs and runs[-1][1] == start:
+            runs[-1] = (runs[-1][0], end)
+        else:
+            runs.append((start, end))
+    return runs
+
+
+def fetch_range_candidates(
+    months: list[str],
+    max_candidates: int,
+    rate_limit_seconds: float,
+    connect_timeout_seconds: float = 10.0,
+    read_timeout_seconds: float = 60.0,
+    retries: int = 2,
+    retry_backoff_seconds: float = 2.0,
+) -> dict[str, list[dict[str, Any]]]:
+    """Fetch candidates for many months with one set of windowed queries.
+
+    Consecutive months are merged into a single submittedDate window per query (split
+    automatically when large), and entries are bucketed back into months by `published`.
+    Each month keeps at most `max_candidates` rows, newest first, like a per-month fetch.
+    """
+    wanted = sorted(set(months))
+    runs = _contiguous_month_runs(wanted)
+    tasks = [(query, start, end) for query in (QUERY_A, QUERY_B) for start, end in runs]
+    limiter = _interval_limiter(rate_limit_seconds)
+    with _new_client(connect_timeout_seconds, read_timeout_seconds) as client:
+        per_task = map_ordered(
+            lambda task: fetch_window(
+                task[0],
+                task[1],
+                task[2],
+                sys.maxsize,
+                rate_limit_seconds,
+                retries=retries,
+                retry_backoff_seconds=retry_backoff_seconds,
+                client=client,
+                limiter=limiter,
+            ),
+            tasks,
+            workers=2,
+        )
+        combined = [row for rows in per_task for row in rows]
+
+    buckets: dict[str, list[dict[str, Any]]] = {month: [] for month in wanted}
+    for paper in combined:
+        if not category_match(paper["categories"]):
+            continue
+        bucket = buckets.get(month_of(paper["published"]))
+        if bucket is not None:
+            bucket.append(paper)
+    # dedupe_latest sorts oldest first, so the tail holds the newest candidates.
+    return {
+        month: dedupe_latest([p for p in rows if in_month(p["published"], month)])[-max_candidates:]
+        for month, rows in buckets.items()
+    }
@@ -1,30 +1,53 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
 import shutil
 import time
-from dataclasses import dataclass, replace
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Any
 
-import httpx
 from dotenv import load_dotenv
 
-from .arxiv import fetch_month_candidates
+from . import serde
+from .arxiv import fetch_month_candidates, fetch_month_updates, fetch_range_candidates
+from .batch_api import BatchRequest, OpenAIBatchBackend, run_batch_job
+from .concurrency import (
+    AdaptiveRateLimiter,
+    RateLimitedLLM,
+    RateLimitStop,
+    Stage,
+    map_ordered,
+    run_pipeline,
+)
 from .config import Config, load_config
-from .db import DigestDB
-from .llm_gemini import GeminiClient, LLMConfig, load_api_key
-from .pdf import download_pdf, extract_text, slice_paper_text
-from .render import build_digest, write_json, write_jsonl
+from .db import DigestDB, ResultVersion, result_version
+from .llm_cache import CachedLLM, cache_on_success, with_llm_cache
+from .llm_gemini import GeminiBatchBackend, GeminiClient, LLMConfig, load_api_key
+from .llm_openrouter import OpenRouterClient
+from .pdf import PdfDownloader, download_pdf, extract_text, slice_paper_text
+from .prefilter import Prefilter, load_triage_history, split_prefiltered, train_prefilter
+from .render import build_digest, iter_jsonl, write_json, write_jsonl
 from .site import update_home, write_month_site
 from .summarize import summarize_paper
-from .triage import load_schema, triage_paper
-
-
-class RateLimitStop(BaseException):
-    """Raised to stop batch execution when provider quota/rate limits are hit."""
+from .summary_pipeline import (
+    SummaryJob,
+    SummaryPipelineConfig,
+    empty_pdf_state,
+    make_pdf_extractor,
+    run_summary_pipeline,
+)
+from .tokens import TokenEstimator, calibrate, estimator_for
+from .triage import (
+    TRIAGE_JSON_ERROR,
+    load_schema,
+    triage_from_output,
+    triage_pack,
+    triage_paper,
+    triage_prompt,
+)
 
 
 @dataclass(frozen=True)
@@ -34,6 +57,7 @@ class BatchRunConfig:
     no_site: bool = False
     triage_force: bool = False
     summary_force: bool = False
+    rerun_stale: bool = False
     include_borderline: bool = False
     triage_provider: str = "gemini"
     triage_model: str = ""
@@ -41,6 +65,21 @@ class BatchRunConfig:
     summary_model: str = ""
     triage_sleep_seconds: float = 0.0
     summary_sleep_seconds: float = 0.0
+    triage_workers: int = 1
+    triage_pack_size: int = 1
+    prefilter_margin: float = 0.0
+    summary_workers: int = 1
+    max_attempts: int = 3
+    checkpoint_seconds: float = 30.0
+    fetch_mode: str = "per_month"
+    month_order: str = "newest_first"
+    triage_mode: str = "sync"
+    batch_backend: str = ""
+    batch_base_url: str = "https://api.openai.com/v1"
+    batch_poll_seconds: float = 60.0
+    batch_timeout_seconds: float = 86400.0
+    requests_per_minute: dict[str, float] = field(default_factory=dict)
+    max_requests_per_minute: dict[str, float] = field(default_factory=dict)
     stop_on_rate_limit: bool = True
     sync_cache_from_outputs: bool = True
     max_candidates: int | None = None
@@ -48,14 +87,40 @@ class BatchRunConfig:
     env_path: str = "~/2_cs_projects/env/.env"
 
 
+# Work ledger stages; see `DigestDB.set_work_state`.
+TRIAGE_STAGE = "triage"
+SUMMARY_STAGE = "summary"
+
+
+class _Checkpoint:
+    """Rewrites a month artifact while work completes, at most once per `interval` seconds."""
+
+    def __init__(
+        self,
+        write: Callable[[], None],
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._write = write
+        self._interval = interval
+        self._clock = clock
+        self._last = clock()
+
+    def tick(self) -> None:
+        if self._clock() - self._last >= self._interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self._write()
+        self._last = self._clock()
+
+
 def _load_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return serde.loads(path.read_bytes())
 
 
-def _load_jsonl(path: Path) -> list[dict[str, Any]]:
-    if not path.exists():
-        return []
-    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+def _load_jsonl(path: Path, fields: Iterable[str] | None = None) -> list[dict[str, Any]]:
+    return list(iter_jsonl(path, fields))
 
 
 def _discover_months_from_outputs(output_dir: Path) -> list[str]:
@@ -88,6 +153,7 @@ def _parse_batch_config(path: Path) -> BatchRunConfig:
         no_site=bool(raw.get("no_site", False)),
         triage_force=bool(raw.get("triage_force", False)),
         summary_force=bool(raw.get("summary_force", False)),
+        rerun_stale=bool(raw.get("rerun_stale", False)),
         include_borderline=bool(raw.get("include_borderline", False)),
         triage_provider=str(raw.get("triage_provider", raw.get("summary_provider", "gemini"))),
         triage_model=str(raw.get("triage_model", raw.get("summary_model", ""))),
@@ -95,6 +161,27 @@ def _parse_batch_config(path: Path) -> BatchRunConfig:
         summary_model=str(raw.get("summary_model", "")),
         triage_sleep_seconds=float(raw.get("triage_sleep_seconds", 0.0)),
         summary_sleep_seconds=float(raw.get("summary_sleep_seconds", 0.0)),
+        triage_workers=int(raw.get("triage_workers", 1)),
+        triage_pack_size=max(1, int(raw.get("triage_pack_size", 1))),
+        prefilter_margin=float(raw.get("prefilter_margin", 0.0)),
+        summary_workers=int(raw.get("summary_workers", 1)),
+        max_attempts=max(1, int(raw.get("max_attempts", 3))),
+        checkpoint_seconds=float(raw.get("checkpoint_seconds", 30.0)),
+        fetch_mode=str(raw.get("fetch_mode", "per_month")).strip().lower(),
+        month_order=str(raw.get("month_order", "newest_first")).strip().lower(),
+        triage_mode=str(raw.get("triage_mode", "sync")).strip().lower(),
+        batch_backend=str(raw.get("batch_backend", "")).strip().lower(),
+        batch_base_url=str(raw.get("batch_base_url", "https://api.openai.com/v1")),
+        batch_poll_seconds=float(raw.get("batch_poll_seconds", 60.0)),
+        batch_timeout_seconds=float(raw.get("batch_timeout_seconds", 86400.0)),
+        requests_per_minute={
+            str(provider).strip().lower(): float(rpm)
+            for provider, rpm in (raw.get("requests_per_minute") or {}).items()
+        },
+        max_requests_per_minute={
+            str(provider).strip().lower(): float(rpm)
+            for provider, rpm in (raw.get("max_requests_per_minute") or {}).items()
+        },
         stop_on_rate_limit=bool(raw.get("stop_on_rate_limit", True)),
         sync_cache_from_outputs=bool(raw.get("sync_cache_from_outputs", True)),
         max_candidates=int(raw["max_candidates"]) if raw.get("max_candidates") is not None else None,
@@ -129,29 +216,23 @@ def _triage_view(triage: dict[str, Any] | None) -> dict[str, Any]:
     }
 
 
-def _empty_pdf_state() -> dict[str, Any]:
-    return {
-        "downloaded": False,
-        "pdf_path": None,
-        "text_path": None,
-        "extract_meta": None,
-    }
-
-
 def _bootstrap_cache_from_outputs(db: DigestDB, month: str, month_out: Path) -> None:
-    for row in _load_jsonl(month_out / "triage.jsonl"):
-        db.upsert_triage(month, row)
-    for row in _load_jsonl(month_out / "papers.jsonl"):
-        db.upsert_summary(month, row)
     raw_path = month_out / "arxiv_raw.json"
-    if raw_path.exists():
-        for row in _load_json(raw_path):
-            db.upsert_paper(month, row)
+    with db.transaction():
+        db.upsert_triage_many(month, iter_jsonl(month_out / "triage.jsonl"))
+        db.upsert_summaries_many(month, iter_jsonl(month_out / "papers.jsonl"))
+        if raw_path.exists():
+            db.upsert_papers_many(month, _load_json(raw_path))
 
 
 def _triage_client_error_ids(month_out: Path) -> set[str]:
     ids: set[str] = set()
-    for row in _load_jsonl(month_out / "triage.jsonl"):
+    rows = iter_jsonl(
+        month_out / "triage.jsonl",
+        fields=("arxiv_id_base", "reasons"),
+        contains="triage_exception:ClientError",
+    )
+    for row in rows:
         reasons = row.get("reasons", [])
         if not isinstance(reasons, list):
             reasons = [str(reasons)]
@@ -162,71 +243,6 @@ def _triage_client_error_ids(month_out: Path) -> set[str]:
     return ids
 
 
-class OpenRouterClient:
-    def __init__(self, api_key: str, model: str, temperature: float, max_output_tokens: int):
-        self.api_key = api_key
-        self.model = model
-        self.temperature = temperature
-        self.max_output_tokens = max_output_tokens
-        self._client = httpx.Client(timeout=180)
-
-    def close(self) -> None:
-        self._client.close()
-
-    def count_tokens(self, content: str) -> int:
-        # Approximate token count for payload-routing heuristics.
-        return max(1, len(content) // 4)
-
-    def _extract_text(self, payload: dict[str, Any]) -> str:
-        choices = payload.get("choices") or []
-        if not choices:
-            return ""
-        msg = choices[0].get("message") or {}
-        content = msg.get("content")
-        if isinstance(content, str):
-            return content.strip()
-        if isinstance(content, list):
-            parts: list[str] = []
-            for item in content:
-                if isinstance(item, dict):
-                    text = item.get("text")
-                    if text:
-                        parts.append(str(text))
-                elif isinstance(item, str):
-                    parts.append(item)
-            return "".join(parts).strip()
-        return ""
-
-    def generate(self, prompt: str, schema: dict[str, Any] | None = None) -> str:
-        body: dict[str, Any] = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": self.temperature,
-            "max_tokens": self.max_output_tokens,
-            "reasoning": {"enabled": True},
-        }
-        if schema is not None:
-            body["response_format"] = {"type": "json_object"}
-
-        resp = self._client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-            },
-            json=body,
-        )
-        if resp.status_code in {402, 429}:
-            raise RateLimitStop(
-                f"openrouter_rate_limit_or_quota status={resp.status_code} body={resp.text[:220]}"
-            )
-        resp.raise_for_status()
-        text = self._extract_text(resp.json())
-        if not text:
-            raise RuntimeError("OpenRouter returned empty content")
-        return text
-
-
 def _normalize_triage_row(arxiv_id_base: str, result: dict[str, Any]) -> dict[str, Any]:
     reasons = result.get("reasons", [])
     if not isinstance(reasons, list):
@@ -239,17 +255,54 @@ def _normalize_triage_row(arxiv_id_base: str, result: dict[str, Any]) -> dict[st
     }
 
 
-def _run_triage_phase_for_month(
+def _prefetch_range(cfg: Config, run_cfg: BatchRunConfig, months: list[str]) -> set[str]:
+    """Write arxiv_raw.json for every month that needs fetching with one range retrieval."""
+    to_fetch = [
+        m for m in months if run_cfg.triage_force or not (cfg.output_dir / m / "arxiv_raw.json").exists()
+    ]
+    if not to_fetch:
+        return set()
+    print(f"[fetch] range retrieval for {len(to_fetch)} months: {to_fetch[0]}..{to_fetch[-1]}")
+    by_month = fetch_range_candidates(
+        to_fetch,
+        cfg.max_candidates,
+        cfg.arxiv_rate_limit_seconds,
+        connect_timeout_seconds=cfg.arxiv_connect_timeout_seconds,
+        read_timeout_seconds=cfg.arxiv_read_timeout_seconds,
+        retries=cfg.arxiv_retries,
+        retry_backoff_seconds=cfg.arxiv_retry_backoff_seconds,
+    )
+    for month, rows in by_month.items():
+        write_json(cfg.output_dir / month / "arxiv_raw.json", rows, compact=True)
+    return set(by_month)
+
+
+def _load_month_candidates(
     cfg: Config,
     run_cfg: BatchRunConfig,
     month: str,
     db: DigestDB,
-    llm: Any,
-) -> None:
+    prefetched: bool = False,
+) -> list[dict[str, Any]]:
     month_out = cfg.output_dir / month
     month_out.mkdir(parents=True, exist_ok=True)
     raw_path = month_out / "arxiv_raw.json"
-    if raw_path.exists() and not run_cfg.triage_force:
+    if run_cfg.fetch_mode == "incremental" and not prefetched:
+        resume = raw_path.exists() and not run_cfg.triage_force
+        candidates, watermarks = fetch_month_updates(
+            _load_json(raw_path) if resume else [],
+            db.get_arxiv_watermarks(month) if resume else {},
+            cfg.max_candidates,
+            month,
+            cfg.arxiv_rate_limit_seconds,
+            connect_timeout_seconds=cfg.arxiv_connect_timeout_seconds,
+            read_timeout_seconds=cfg.arxiv_read_timeout_seconds,
+            retries=cfg.arxiv_retries,
+            retry_backoff_seconds=cfg.arxiv_retry_backoff_seconds,
+        )
+        db.set_arxiv_watermarks(month, watermarks)
+        write_json(raw_path, candidates, compact=True)
+    elif raw_path.exists() and (prefetched or not run_cfg.triage_force):
         candidates = _load_json(raw_path)
     else:
         candidates = fetch_month_candidates(
@@ -261,58 +314,294 @@ def _run_triage_phase_for_month(
             retries=cfg.arxiv_retries,
             retry_backoff_seconds=cfg.arxiv_retry_backoff_seconds,
         )
-        write_json(raw_path, candidates)
-    for row in candidates:
-        db.upsert_paper(month, row)
+        write_json(raw_path, candidates, compact=True)
+    db.upsert_papers_many(month, candidates)
+    return candidates
 
-    triage_schema = load_schema(Path("schemas/triage.json"))
-    triage_prompt = Path("prompts/triage.md").read_text(encoding="utf-8")
-    repair_prompt = Path("prompts/repair_json.md").read_text(encoding="utf-8")
 
+def _split_cached_triage(
+    run_cfg: BatchRunConfig,
+    month: str,
+    db: DigestDB,
+    candidates: list[dict[str, Any]],
+    version: ResultVersion | None,
+    prefilter: Prefilter | None = None,
+    pack_version: ResultVersion | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """(rows reused from the cache or rejected by the pre-filter, candidates needing LLM triage).
+
+    Rows recorded under `version` or `pack_version` count as current for `rerun_stale`.
+    Pre-filter rejects are persisted without a result version, so `rerun_stale` scores them again.
+    Cached fallback rows the work ledger marks `failed` are retried until `max_attempts`.
+    """
     triage_rows: list[dict[str, Any]] = []
+    pending: list[dict[str, Any]] = []
+    candidate_ids = [p["arxiv_id_base"] for p in candidates]
+    cached_triage = {} if run_cfg.triage_force else db.get_triage_for_month(month, candidate_ids)
+    if run_cfg.rerun_stale and version is not None:
+        current = (version, pack_version) if pack_version is not None else (version,)
+        for aid in db.get_stale_triage_ids(cached_triage, *current):
+            del cached_triage[aid]
+    retry = [
+        aid
+        for aid, entry in db.get_work_states(month, TRIAGE_STAGE).items()
+        if entry.state == "failed" and entry.attempts < run_cfg.max_attempts and aid in cached_triage
+    ]
+    for aid in retry:
+        del cached_triage[aid]
+    if retry:
+        print(f"[triage] {month}: retrying failed={len(retry)}")
     for paper in candidates:
         aid = paper["arxiv_id_base"]
-        if run_cfg.triage_force:
-            cached = None
-        else:
-            cached = db.get_triage(aid)
+        cached = cached_triage.get(aid)
         if cached:
             triage_rows.append(_normalize_triage_row(aid, cached))
-            continue
-        try:
-            result = triage_paper(
+        else:
+            pending.append(paper)
+    rejected, pending = split_prefiltered(prefilter, pending)
+    if rejected:
+        with db.transaction():
+            db.upsert_triage_many(month, rejected)
+            db.set_work_state(month, TRIAGE_STAGE, [r["arxiv_id_base"] for r in rejected], "done")
+        triage_rows.extend(rejected)
+        print(f"[prefilter] {month}: rejected={len(rejected)} llm_pending={len(pending)}")
+    db.set_work_state(month, TRIAGE_STAGE, [p["arxiv_id_base"] for p in pending], "pending")
+    return triage_rows, pending
+
+
+def _guarded_triage_row(arxiv_id_base: str, triage: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    try:
+        return _normalize_triage_row(arxiv_id_base, triage())
+    except RateLimitStop:
+        raise
+    except Exception as exc:  # noqa: BLE001
+        return {
+            "arxiv_id_base": arxiv_id_base,
+            "decision": "reject",
+            "confidence": 0.0,
+            "reasons": [f"triage_exception:{type(exc).__name__}", "automatic_reject_fallback"],
+        }
+
+
+def _record_triage(
+    db: DigestDB, month: str, row: dict[str, Any], version: ResultVersion | None
+) -> None:
+    """Persist a triage row and its ledger state together; exception fallbacks count as failed."""
+    failed = "automatic_reject_fallback" in row["reasons"]
+    with db.transaction():
+        db.upsert_triage(month, row, version)
+        db.set_work_state(
+            month,
+            TRIAGE_STAGE,
+            [row["arxiv_id_base"]],
+            "failed" if failed else "done",
+            error=row["reasons"][0] if failed else None,
+        )
+
+
+def _write_triage_rows(month_out: Path, triage_rows: list[dict[str, Any]]) -> None:
+    write_jsonl(month_out / "triage.jsonl", sorted(triage_rows, key=lambda x: x["arxiv_id_base"]))
+
+
+def _run_triage_phase_for_month(
+    cfg: Config,
+    run_cfg: BatchRunConfig,
+    month: str,
+    db: DigestDB,
+    llm: Any,
+    prefetched: bool = False,
+    version: ResultVersion | None = None,
+    prefilter: Prefilter | None = None,
+    pack_llm: Any = None,
+    pack_version: ResultVersion | None = None,
+) -> None:
+    """Triage `month`; with `triage_pack_size > 1` pending papers go to `pack_llm` (default `llm`).
+
+    `version` stamps rows from the single-paper prompt, including pack fallbacks, and
+    `pack_version` rows that came back from a packed request.
+    """
+    candidates = _load_month_candidates(cfg, run_cfg, month, db, prefetched)
+
+    triage_schema = load_schema(Path("schemas/triage.json"))
+    triage_prompt = Path("prompts/triage.md").read_text(encoding="utf-8")
+    repair_prompt = Path("prompts/repair_json.md").read_text(encoding="utf-8")
+
+    def triage_one(paper: dict[str, Any]) -> dict[str, Any]:
+        row = _guarded_triage_row(
+            paper["arxiv_id_base"],
+            lambda: triage_paper(
                 paper=paper,
                 llm=llm,
                 prompt_template=triage_prompt,
                 repair_template=repair_prompt,
                 schema=triage_schema,
-            )
-            row = _normalize_triage_row(aid, result)
-        except RateLimitStop:
-            raise
-        except Exception as exc:
-            row = {
-                "arxiv_id_base": aid,
-                "decision": "reject",
-                "confidence": 0.0,
-                "reasons": [f"triage_exception:{type(exc).__name__}", "automatic_reject_fallback"],
-            }
-        triage_rows.append(row)
-        db.upsert_triage(month, row)
-        if run_cfg.triage_sleep_seconds > 0:
-            time.sleep(run_cfg.triage_sleep_seconds)
+            ),
+        )
+        return row
+
+    def run_one(paper: dict[str, Any]) -> dict[str, Any]:
+        db.set_work_state(month, TRIAGE_STAGE, [paper["arxiv_id_base"]], "running")
+        return triage_one(paper)
+
+    def run_pack(pack: list[dict[str, Any]]) -> list[tuple[dict[str, Any], bool]]:
+        db.set_work_state(month, TRIAGE_STAGE, [p["arxiv_id_base"] for p in pack], "running")
+        return triage_pack(
+            pack, pack_llm or llm, pack_prompt, repair_prompt, triage_schema, triage_one
+        )
 
-    triage_rows = sorted(triage_rows, key=lambda x: x["arxiv_id_base"])
-    write_jsonl(month_out / "triage.jsonl", triage_rows)
+    month_out = cfg.output_dir / month
+    triage_rows, pending = _split_cached_triage(
+        run_cfg, month, db, candidates, version, prefilter, pack_version
+    )
+
+    # Results arrive in candidate order; a RateLimitStop cancels the queued remainder
+    # after the rows completed so far have been persisted and flushed.
+    k = run_cfg.triage_pack_size
+    if k > 1:
+        pack_prompt = Path("prompts/triage_pack.md").read_text(encoding="utf-8")
+        packs = [pending[i : i + k] for i in range(0, len(pending), k)]
+        rows = (
+            (
+                _normalize_triage_row(row["arxiv_id_base"], row),
+                (pack_version or version) if packed else version,
+            )
+            for pack_rows in map_ordered(run_pack, packs, workers=run_cfg.triage_workers)
+            for row, packed in pack_rows
+        )
+    else:
+        rows = (
+            (row, version) for row in map_ordered(run_one, pending, workers=run_cfg.triage_workers)
+        )
+    checkpoint = _Checkpoint(
+        lambda: _write_triage_rows(month_out, triage_rows), run_cfg.checkpoint_seconds
+    )
+    try:
+        for row, row_version in rows:
+            triage_rows.append(row)
+            _record_triage(db, month, row, row_version)
+            checkpoint.tick()
+    finally:
+        checkpoint.flush()
     print(f"[triage] {month}: done candidates={len(candidates)} triage_rows={len(triage_rows)}")
 
 
+def _make_batch_backend(cfg: Config, run_cfg: BatchRunConfig, model: str, gemini_key: str | None) -> Any:
+    backend = run_cfg.batch_backend or (
+        "gemini" if run_cfg.triage_provider.strip().lower() == "gemini" else "openai"
+    )
+    if backend == "gemini":
+        return GeminiBatchBackend(
+            LLMConfig(
+                api_key=gemini_key or load_api_key(),
+                model=model,
+                temperature=cfg.llm_temperature_triage,
+                max_output_tokens=cfg.llm_max_output_tokens_triage,
+            )
+        )
+    if backend == "openai":
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise RuntimeError("Missing OPENAI_API_KEY in environment or env file.")
+        return OpenAIBatchBackend(
+            run_cfg.batch_base_url,
+            api_key,
+            model=model,
+            temperature=cfg.llm_temperature_triage,
+            max_output_tokens=cfg.llm_max_output_tokens_triage,
+        )
+    raise RuntimeError(f"Unsupported batch_backend={backend}. Use 'gemini' or 'openai'.")
+
+
+def _run_triage_batch_api(
+    cfg: Config,
+    run_cfg: BatchRunConfig,
+    months: list[str],
+    db: DigestDB,
+    llm: Any,
+    backend: Any,
+    prefetched: set[str],
+    version: ResultVersion | None = None,
+    prefilter: Prefilter | None = None,
+) -> None:
+    """Triage every month's uncached candidates through a single provider batch job.
+
+    Batch outputs go through the same parse/validate/repair path as synchronous calls
+    (repairs use `llm`). Prompts already in the LLM response cache, and any request the
+    job returned no output for, are triaged synchronously with `llm` instead.
+    """
+    triage_schema = load_schema(Path("schemas/triage.json"))
+    prompt_template = Path("prompts/triage.md").read_text(encoding="utf-8")
+    repair_prompt = Path("prompts/repair_json.md").read_text(encoding="utf-8")
+
+    plans: dict[str, tuple[int, list[dict[str, Any]], list[dict[str, Any]]]] = {}
+    requests: list[BatchRequest] = []
+    for month in months:
+        print(f"[triage] {month}: start")
+        candidates = _load_month_candidates(cfg, run_cfg, month, db, month in prefetched)
+        triage_rows, pending = _split_cached_triage(
+            run_cfg, month, db, candidates, version, prefilter
+        )
+        plans[month] = (len(candidates), triage_rows, pending)
+        for paper in pending:
+            prompt = triage_prompt(paper, prompt_template)
+            if isinstance(llm, CachedLLM) and llm.peek(prompt, triage_schema) is not None:
+                continue
+            requests.append(BatchRequest(f"{month}/{paper['arxiv_id_base']}", prompt))
+
+    for month, (_n, _rows, pending) in plans.items():
+        db.set_work_state(month, TRIAGE_STAGE, [p["arxiv_id_base"] for p in pending], "running")
+    results = run_batch_job(
+        backend,
+        requests,
+        triage_schema,
+        cfg.data_dir / "batch_jobs" / "triage.jsonl",
+        poll_seconds=run_cfg.batch_poll_seconds,
+        timeout_seconds=run_cfg.batch_timeout_seconds,
+    )
+    print(f"[batch-api] triage: requests={len(requests)} outputs={len(results)}")
+
+    for month, (n_candidates, triage_rows, pending) in plans.items():
+        for paper in pending:
+            aid = paper["arxiv_id_base"]
+            raw = results.get(f"{month}/{aid}")
+            if raw is None:
+                row = _guarded_triage_row(
+                    aid,
+                    lambda paper=paper: triage_paper(
+                        paper=paper,
+                        llm=llm,
+                        prompt_template=prompt_template,
+                        repair_template=repair_prompt,
+                        schema=triage_schema,
+                    ),
+                )
+            else:
+                # The batch output (and any repair) is cached only once it produced a valid row.
+                with cache_on_success(llm) as keep:
+                    row = _guarded_triage_row(
+                        aid,
+                        lambda paper=paper, raw=raw: triage_from_output(
+                            paper, raw, llm, repair_prompt, triage_schema
+                        ),
+                    )
+                    failed = {TRIAGE_JSON_ERROR, "automatic_reject_fallback"} & set(row["reasons"])
+                    if not failed and isinstance(llm, CachedLLM):
+                        keep()
+                        llm.store(triage_prompt(paper, prompt_template), triage_schema, raw)
+            triage_rows.append(row)
+            _record_triage(db, month, row, version)
+        _write_triage_rows(cfg.output_dir / month, triage_rows)
+        print(f"[triage] {month}: done candidates={n_candidates} triage_rows={len(triage_rows)}")
+
+
 def _run_summary_phase_for_month(
     cfg: Config,
     run_cfg: BatchRunConfig,
     month: str,
     db: DigestDB,
     llm: Any,
+    version: ResultVersion | None = None,
+    token_estimator: TokenEstimator | None = None,
 ) -> None:
     month_out = cfg.output_dir / month
     raw_path = month_out / "arxiv_raw.json"
@@ -338,82 +627,123 @@ def _run_summary_phase_for_month(
 
     existing_summaries = [] if run_cfg.summary_force else _load_jsonl(month_out / "papers.jsonl")
     summary_map: dict[str, dict[str, Any]] = {s["arxiv_id_base"]: s for s in existing_summaries}
+    exhausted: set[str] = set()
+    if not run_cfg.summary_force:
+        # Summaries the ledger marks done but an interrupted run never flushed to papers.jsonl.
+        ledger = db.get_work_states(month, SUMMARY_STAGE)
+        unflushed = [
+            p["arxiv_id_base"]
+            for p in accepted
+            if p["arxiv_id_base"] not in summary_map
+            and ledger.get(p["arxiv_id_base"]) is not None
+            and ledger[p["arxiv_id_base"]].state == "done"
+        ]
+        summary_map.update(db.get_summaries_for_ids(unflushed))
+        # Failed items are retried until `max_attempts`, like triage fallbacks.
+        exhausted = {
+            aid
+            for aid, entry in ledger.items()
+            if entry.state == "failed" and entry.attempts >= run_cfg.max_attempts
+        }
 
-    existing_backend = _load_jsonl(month_out / "backend_rows.jsonl")
     pdf_map: dict[str, dict[str, Any]] = {
-        row.get("arxiv_id_base", ""): row.get("pdf") or _empty_pdf_state() for row in existing_backend
+        row.get("arxiv_id_base", ""): row.get("pdf") or empty_pdf_state()
+        for row in iter_jsonl(month_out / "backend_rows.jsonl", fields=("arxiv_id_base", "pdf"))
     }
 
-    print(f"[summary] {month}: accepted={len(accepted)} cached={len(summary_map)}")
-
-    for paper in accepted:
-        aid = paper["arxiv_id_base"]
-        if aid in summary_map and not run_cfg.summary_force:
-            continue
+    # Stale summaries stay in summary_map until a regenerated one replaces them.
+    stale: set[str] = set()
+    if run_cfg.rerun_stale and version is not None:
+        cached_ids = [p["arxiv_id_base"] for p in accepted if p["arxiv_id_base"] in summary_map]
+        stale = db.get_stale_summary_ids(cached_ids, version)
+    print(f"[summary] {month}: accepted={len(accepted)} cached={len(summary_map) - len(stale)}")
+
+    jobs = [
+        SummaryJob(paper=paper, month_out=month_out)
+        for paper in accepted
+        if run_cfg.summary_force
+        or (paper["arxiv_id_base"] not in summary_map and paper["arxiv_id_base"] not in exhausted)
+        or paper["arxiv_id_base"] in stale
+    ]
+    skipped = sum(
+        1 for p in accepted if p["arxiv_id_base"] in exhausted and p["arxiv_id_base"] not in summary_map
+    )
+    if skipped:
+        print(f"[summary] {month}: skipped failed={skipped} (max_attempts={run_cfg.max_attempts})")
+    db.set_work_state(month, SUMMARY_STAGE, [job.arxiv_id_base for job in jobs], "pending")
+
+    def started(jobs: list[SummaryJob]) -> Iterator[SummaryJob]:
+        # An attempt starts when the pipeline picks the job up, so PDF download and
+        # extraction failures count towards `max_attempts` as well.
+        for job in jobs:
+            db.set_work_state(month, SUMMARY_STAGE, [job.arxiv_id_base], "running")
+            yield job
+
+    def summarize_job(job: SummaryJob) -> dict[str, Any]:
+        summary = summarize_paper(
+            paper=job.paper,
+            triage=triage_map.get(job.arxiv_id_base, {}),
+            raw_fulltext=job.raw_text,
+            fulltext_slices=slice_paper_text(
+                job.raw_text,
+                excerpt_chars=18_000,
+                tail_chars=cfg.text_tail_chars,
+            ),
+            used_fulltext=True,
+            notes=job.notes,
+            llm=llm,
+            prompt_template=summarize_prompt,
+            repair_template=repair_prompt,
+            schema=summary_schema,
+            max_input_tokens=cfg.summary_max_input_tokens,
+            token_estimator=token_estimator,
+        )
+        return summary
 
-        pdf_state = _empty_pdf_state()
-        raw_text = ""
-        notes = "summary_not_attempted"
-
-        if not paper.get("links", {}).get("pdf"):
-            notes = "summary_skipped:missing_pdf_link"
-            pdf_state = {
-                "downloaded": False,
-                "pdf_path": None,
-                "text_path": None,
-                "extract_meta": {"error": "missing_pdf_link"},
-            }
-        else:
-            pdf_path = month_out / "pdfs" / f"{aid}.pdf"
-            txt_path = month_out / "text" / f"{aid}.txt"
-            try:
-                download_pdf(paper["links"]["pdf"], pdf_path, cfg.pdf_rate_limit_seconds)
-                meta = extract_text(pdf_path, txt_path)
-                raw_text = txt_path.read_text(encoding="utf-8") if txt_path.exists() else ""
-                pdf_state = {
-                    "downloaded": True,
-                    "pdf_path": str(pdf_path),
-                    "text_path": str(txt_path),
-                    "extract_meta": meta,
-                }
-                notes = json.dumps(meta, sort_keys=True)
-            except Exception as exc:
-                notes = f"summary_skipped:pdf_failed:{type(exc).__name__}"
-                pdf_state = {
-                    "downloaded": False,
-                    "pdf_path": str(pdf_path),
-                    "text_path": str(txt_path),
-                    "extract_meta": {"error": f"download_or_extract_failed:{type(exc).__name__}"},
-                }
-
-        if raw_text.strip():
-            summary = summarize_paper(
-                paper=paper,
-                triage=triage_map.get(aid, {}),
-                raw_fulltext=raw_text,
-                fulltext_slices=slice_paper_text(
-                    raw_text,
-                    excerpt_chars=18_000,
-                    tail_chars=cfg.text_tail_chars,
-                ),
-                used_fulltext=True,
-                notes=notes,
-                llm=llm,
-                prompt_template=summarize_prompt,
-                repair_template=repair_prompt,
-                schema=summary_schema,
-                max_input_tokens=cfg.summary_max_input_tokens,
-            )
-            summary_map[aid] = summary
-            db.upsert_summary(month, summary)
-            print(f"[summary] {month}: summarized {aid}")
-            if run_cfg.summary_sleep_seconds > 0:
-                time.sleep(run_cfg.summary_sleep_seconds)
+    def write_summaries() -> list[dict[str, Any]]:
+        summaries = sorted(
+            summary_map.values(), key=lambda x: (x["published_date"], x["arxiv_id_base"])
+        )
+        write_jsonl(month_out / "papers.jsonl", summaries)
+        return summaries
 
-        pdf_map[aid] = pdf_state
+    checkpoint = _Checkpoint(write_summaries, run_cfg.checkpoint_seconds)
+    extractor = make_pdf_extractor(cfg)
+    downloader = PdfDownloader()
+    try:
+        for job in run_summary_pipeline(
+            started(jobs),
+            download=lambda url, path: download_pdf(url, path, 0.0, downloader=downloader),
+            extract=extractor.extract if extractor is not None else extract_text,
+            summarize=summarize_job,
+            config=SummaryPipelineConfig(
+                download_workers=cfg.pdf_download_workers,
+                extract_workers=cfg.pdf_extract_workers,
+                summary_workers=run_cfg.summary_workers,
+                queue_size=cfg.pipeline_queue_size,
+                pdf_rate_limit_seconds=cfg.pdf_rate_limit_seconds,
+            ),
+        ):
+            aid = job.arxiv_id_base
+            if job.summary:
+                summary_map[aid] = job.summary
+                with db.transaction():
+                    db.upsert_summary(month, job.summary, version)
+                    db.set_work_state(month, SUMMARY_STAGE, [aid], "done")
+                print(f"[summary] {month}: summarized {aid}")
+            else:
+                db.set_work_state(month, SUMMARY_STAGE, [aid], "failed", error=job.notes)
+            pdf_map[aid] = job.pdf_state
+            checkpoint.tick()
+    except BaseException:
+        checkpoint.flush()
+        raise
+    finally:
+        downloader.close()
+        if extractor is not None:
+            extractor.close()
 
-    summaries = sorted(summary_map.values(), key=lambda x: (x["published_date"], x["arxiv_id_base"]))
-    write_jsonl(month_out / "papers.jsonl", summaries)
+    summaries = write_summaries()
 
     backend_rows: list[dict[str, Any]] = []
     for paper in sorted(candidates, key=lambda x: (x["published"], x["arxiv_id_base"])):
@@ -432,7 +762,7 @@ def _run_summary_phase_for_month(
                 "links": paper["links"],
                 "triage": _triage_view(triage_map.get(aid)),
                 "paper_summary": summary_map.get(aid),
-                "pdf": pdf_map.get(aid, _empty_pdf_state()),
+                "pdf": pdf_map.get(aid, empty_pdf_state()),
             }
         )
     write_jsonl(month_out / "backend_rows.jsonl", backend_rows)
@@ -461,6 +791,27 @@ def _run_summary_phase_for_month(
     )
 
 
+def _initial_requests_per_minute(
+    run_cfg: BatchRunConfig, provider: str, triage_provider: str, summary_provider: str
+) -> float:
+    """Starting rate for `provider`; the legacy `*_sleep_seconds` keys seed it when no rpm is set."""
+    rpm = run_cfg.requests_per_minute.get(provider, 0.0)
+    if rpm > 0:
+        return rpm
+    legacy = [
+        60.0 / seconds
+        for seconds, phase_provider in (
+            (run_cfg.triage_sleep_seconds, triage_provider),
+            (run_cfg.summary_sleep_seconds, summary_provider),
+        )
+        if seconds > 0 and phase_provider == provider
+    ]
+    if not legacy:
+        return 0.0
+    print(f"[rate] {provider}: *_sleep_seconds is deprecated; starting at {min(legacy):.1f} rpm")
+    return min(legacy)
+
+
 def run_batch(config_path: Path) -> None:
     run_cfg = _parse_batch_config(config_path)
     cfg = load_config()
@@ -471,8 +822,20 @@ def run_batch(config_path: Path) -> None:
     if run_cfg.include_borderline:
         cfg = replace(cfg, include_borderline=True)
 
+    if run_cfg.month_order not in {"newest_first", "oldest_first"}:
+        raise RuntimeError(
+            f"Unsupported month_order={run_cfg.month_order}. Use 'newest_first' or 'oldest_first'."
+        )
     months = _effective_months(run_cfg, cfg)
+    if run_cfg.month_order == "newest_first":
+        months = months[::-1]
     print(f"[batch] months={months}")
+    if run_cfg.fetch_mode not in {"per_month", "range", "incremental"}:
+        raise RuntimeError(
+            f"Unsupported fetch_mode={run_cfg.fetch_mode}. Use 'per_month', 'range' or 'incremental'."
+        )
+    if run_cfg.triage_mode not in {"sync", "batch_api"}:
+        raise RuntimeError(f"Unsupported triage_mode={run_cfg.triage_mode}. Use 'sync' or 'batch_api'.")
 
     # Load API keys for providers from configured env file.
     load_dotenv(Path(run_cfg.env_path).expanduser())
@@ -493,70 +856,217 @@ def run_batch(config_path: Path) -> None:
     if triage_provider == "gemini" or summary_provider == "gemini":
         gemini_key = load_api_key()
 
+    # One adaptive limiter per provider, shared by the triage and summary clients. The
+    # configured rate is also the ceiling unless `max_requests_per_minute` raises it.
+    limiters: dict[str, AdaptiveRateLimiter] = {}
+    for provider in {triage_provider, summary_provider}:
+        rpm = _initial_requests_per_minute(run_cfg, provider, triage_provider, summary_provider)
+        limiters[provider] = AdaptiveRateLimiter(
+            rpm, max_per_minute=run_cfg.max_requests_per_minute.get(provider, rpm)
+        )
+
     db = DigestDB(cfg.data_dir / "digest.sqlite")
     try:
+        requeued = db.requeue_running_work()
+        if requeued:
+            print(f"[ledger] requeued {requeued} items left running by an interrupted run")
         if triage_provider == "gemini":
-            triage_llm: Any = GeminiClient(
-                LLMConfig(
-                    api_key=gemini_key or load_api_key(),
-                    model=run_cfg.triage_model or cfg.gemini_model_triage,
+            triage_model = run_cfg.triage_model or cfg.gemini_model_triage
+        else:
+            triage_model = run_cfg.triage_model or "arcee-ai/trinity-large-preview:free"
+        triage_closers: list[Callable[[], None]] = []
+
+        def triage_client(max_output_tokens: int) -> Any:
+            if triage_provider == "gemini":
+                client: Any = GeminiClient(
+                    LLMConfig(
+                        api_key=gemini_key or load_api_key(),
+                        model=triage_model,
+                        temperature=cfg.llm_temperature_triage,
+                        max_output_tokens=max_output_tokens,
+                    )
+                )
+            else:
+                client = OpenRouterClient(
+                    api_key=openrouter_key or "",
+                    model=triage_model,
                     temperature=cfg.llm_temperature_triage,
-                    max_output_tokens=cfg.llm_max_output_tokens_triage,
+                    max_output_tokens=max_output_tokens,
                 )
-            )
-            triage_close = lambda: None
-        else:
-            triage_llm = OpenRouterClient(
-                api_key=openrouter_key or "",
-                model=run_cfg.triage_model or "arcee-ai/trinity-large-preview:free",
+                triage_closers.append(client.close)
+            return with_llm_cache(
+                RateLimitedLLM(client, limiters[triage_provider]),
+                db,
+                model=triage_model,
                 temperature=cfg.llm_temperature_triage,
-                max_output_tokens=cfg.llm_max_output_tokens_triage,
+                max_mb=cfg.llm_cache_max_mb,
+                refresh=run_cfg.triage_force,
             )
-            triage_close = triage_llm.close
 
-        # Phase 1: triage all months first.
-        try:
-            for month in months:
-                month_out = cfg.output_dir / month
-                month_out.mkdir(parents=True, exist_ok=True)
-                if run_cfg.sync_cache_from_outputs:
-                    _bootstrap_cache_from_outputs(db, month, month_out)
-                print(f"[triage] {month}: start")
-                _run_triage_phase_for_month(cfg, run_cfg, month, db, triage_llm)
-        finally:
-            triage_close()
+        # Only the packed request answers for several papers; fallbacks and their repairs get
+        # the single-paper output budget. Each row records the prompt that produced it.
+        triage_llm = triage_client(cfg.llm_max_output_tokens_triage)
+        triage_version = result_version(
+            Path("prompts/triage.md"), Path("schemas/triage.json"), triage_model
+        )
+        triage_pack_llm: Any = None
+        triage_pack_version: ResultVersion | None = None
+        if run_cfg.triage_pack_size > 1 and run_cfg.triage_mode == "sync":
+            triage_pack_llm = triage_client(
+                cfg.llm_max_output_tokens_triage * run_cfg.triage_pack_size
+            )
+            triage_pack_version = result_version(
+                Path("prompts/triage_pack.md"), Path("schemas/triage.json"), triage_model
+            )
 
-        # Phase 2: summarize accepted for all months.
+        # Summary client and settings are built up front: a month's summaries start as soon as
+        # its triage finishes, while later months are still being triaged.
         if summary_provider == "gemini":
+            summary_model = run_cfg.summary_model or cfg.gemini_model_summary
             summary_llm: Any = GeminiClient(
                 LLMConfig(
                     api_key=gemini_key or load_api_key(),
-                    model=run_cfg.summary_model or cfg.gemini_model_summary,
+                    model=summary_model,
                     temperature=cfg.llm_temperature_summary,
                     max_output_tokens=cfg.llm_max_output_tokens_summary,
                 )
             )
-            for month in months:
-                _run_summary_phase_for_month(cfg, run_cfg, month, db, summary_llm)
+            summary_close = lambda: None
         else:
+            summary_model = run_cfg.summary_model or "arcee-ai/trinity-large-preview:free"
             summary_llm = OpenRouterClient(
                 api_key=openrouter_key or "",
-                model=run_cfg.summary_model or "arcee-ai/trinity-large-preview:free",
+                model=summary_model,
                 temperature=cfg.llm_temperature_summary,
                 max_output_tokens=cfg.llm_max_output_tokens_summary,
             )
-            try:
+            summary_close = summary_llm.close
+        summary_version = result_version(
+            Path("prompts/summarize.md"), Path("schemas/summary.json"), summary_model
+        )
+        summary_estimator = estimator_for(summary_model, calibrate(db.get_summary_notes()))
+        summary_llm = with_llm_cache(
+            RateLimitedLLM(summary_llm, limiters[summary_provider]),
+            db,
+            model=summary_model,
+            temperature=cfg.llm_temperature_summary,
+            max_mb=cfg.llm_cache_max_mb,
+            refresh=run_cfg.summary_force,
+        )
+
+        try:
+            prefetched = (
+                _prefetch_range(cfg, run_cfg, sorted(months)) if run_cfg.fetch_mode == "range" else set()
+            )
+            if run_cfg.sync_cache_from_outputs:
                 for month in months:
-                    _run_summary_phase_for_month(cfg, run_cfg, month, db, summary_llm)
-            finally:
-                summary_llm.close()
+                    month_out = cfg.output_dir / month
+                    month_out.mkdir(parents=True, exist_ok=True)
+                    _bootstrap_cache_from_outputs(db, month, month_out)
+            prefilter = None
+            if run_cfg.prefilter_margin > 0:
+                # Train only on months before every month in this run, so no month is
+                # pre-filtered by a model that has seen its own (or later) decisions.
+                prefilter = train_prefilter(
+                    *load_triage_history(cfg.output_dir, before=min(months)),
+                    margin=run_cfg.prefilter_margin,
+                )
+                if prefilter is None:
+                    print("[prefilter] too few accepted papers in outputs; disabled")
+                else:
+                    print(f"[prefilter] threshold={prefilter.threshold:.4f}")
+
+            failed: dict[str, str] = {}
+
+            def isolated(stage: str, run: Callable[[str], None]) -> Callable[[str | None], str | None]:
+                # A failing month is logged and dropped so queued months still publish;
+                # RateLimitStop is a BaseException and still stops the whole run.
+                def wrapped(month: str | None) -> str | None:
+                    if month is None:
+                        return None
+                    try:
+                        run(month)
+                    except Exception as exc:  # noqa: BLE001
+                        failed[month] = f"{stage}: {type(exc).__name__}: {exc}"
+                        print(f"[batch] {month}: {stage} failed ({type(exc).__name__}: {exc})")
+                        return None
+                    return month
+
+                return wrapped
+
+            def triage_month(month: str) -> None:
+                print(f"[triage] {month}: start")
+                _run_triage_phase_for_month(
+                    cfg,
+                    run_cfg,
+                    month,
+                    db,
+                    triage_llm,
+                    prefetched=month in prefetched,
+                    version=triage_version,
+                    prefilter=prefilter,
+                    pack_llm=triage_pack_llm,
+                    pack_version=triage_pack_version,
+                )
+
+            def summarize_month(month: str) -> None:
+                _run_summary_phase_for_month(
+                    cfg,
+                    run_cfg,
+                    month,
+                    db,
+                    summary_llm,
+                    version=summary_version,
+                    token_estimator=summary_estimator,
+                )
+
+            stages = [Stage("summary", isolated("summary", summarize_month))]
+            if run_cfg.triage_mode == "batch_api":
+                backend = _make_batch_backend(cfg, run_cfg, triage_model, gemini_key)
+                try:
+                    _run_triage_batch_api(
+                        cfg,
+                        run_cfg,
+                        months,
+                        db,
+                        triage_llm,
+                        backend,
+                        prefetched,
+                        version=triage_version,
+                        prefilter=prefilter,
+                    )
+                finally:
+                    if hasattr(backend, "close"):
+                        backend.close()
+            else:
+                stages.insert(0, Stage("triage", isolated("triage", triage_month)))
+            # Months flow through triage then summary in priority order, one thread per stage;
+            # the summary queue holds every month so triage never waits on summaries.
+            for month in run_pipeline(months, stages, queue_size=len(months)):
+                if month is not None:
+                    print(f"[batch] {month}: published")
+        finally:
+            for close in triage_closers:
+                close()
+            summary_close()
+        if failed:
+            raise RuntimeError(
+                "Months failed: " + "; ".join(f"{m} ({why})" for m, why in sorted(failed.items()))
+            )
+        for phase, llm in (
+            ("triage", triage_llm),
+            ("triage-pack", triage_pack_llm),
+            ("summary", summary_llm),
+        ):
+            if isinstance(llm, CachedLLM):
+                print(f"[llm-cache] {phase}: hits={llm.hits} misses={llm.misses}")
     finally:
         db.close()
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
-        description="Batch runner: triage all configured months, then summarize accepted papers."
+        description="Batch runner: triage configured months and summarize accepted papers, month by month."
     )
     parser.add_argument(
         "--config",
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+# Normalized job states returned by every backend's `status`.
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class BatchJobError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class BatchRequest:
+    custom_id: str
+    prompt: str
+
+
+def chat_completion_text(payload: dict[str, Any]) -> str:
+    """Assistant text from an OpenAI-style chat completion body."""
+    choices = payload.get("choices") or []
+    if not choices:
+        return ""
+    msg = choices[0].get("message") or {}
+    content = msg.get("content")
+    if isinstance(content, str):
+        return content.strip()
+    if isinstance(content, list):
+        parts: list[str] = []
+        for item in content:
+            if isinstance(item, dict):
+                text = item.get("text")
+                if text:
+                    parts.append(str(text))
+            elif isinstance(item, str):
+                parts.append(item)
+        return "".join(parts).strip()
+    return ""
+
+
+def write_job_file(path: Path, lines: list[dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+class OpenAIBatchBackend:
+    """OpenAI-compatible Files + Batches API (`/files`, `/batches`) for chat completions.
+
+    A backend provides `job_line`, `submit`, `status` and `results`; see `run_batch_job`.
+    """
+
+    name = "openai"
+    endpoint = "/v1/chat/completions"
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        temperature: float,
+        max_output_tokens: int,
+        client: httpx.Client | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self._client = client or httpx.Client(timeout=180)
+        self._headers = {"Authorization": f"Bearer {api_key}"}
+
+    def close(self) -> None:
+        self._client.close()
+
+    def job_line(self, request: BatchRequest, schema: dict[str, Any] | None) -> dict[str, Any]:
+        body: dict[str, Any] = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": request.prompt}],
+            "temperature": self.temperature,
+            "max_tokens": self.max_output_tokens,
+        }
+        if schema is not None:
+            body["response_format"] = {"type": "json_object"}
+        return {"custom_id": request.custom_id, "method": "POST", "url": self.endpoint, "body": body}
+
+    def _json(self, resp: httpx.Response) -> dict[str, Any]:
+        resp.raise_for_status()
+        return resp.json()
+
+    def submit(self, job_path: Path) -> str:
+        uploaded = self._json(
+            self._client.post(
+                f"{self.base_url}/files",
+                headers=self._headers,
+                data={"purpose": "batch"},
+                files={"file": (job_path.name, job_path.read_bytes(), "application/jsonl")},
+            )
+        )
+        batch = self._json(
+            self._client.post(
+                f"{self.base_url}/batches",
+                headers=self._headers,
+                json={
+                    "input_file_id": uploaded["id"],
+                    "endpoint": self.endpoint,
+                    "completion_window": "24h",
+                },
+            )
+        )
+        return str(batch["id"])
+
+    def _batch(self, job_id: str) -> dict[str, Any]:
+        return self._json(self._client.get(f"{self.base_url}/batches/{job_id}", headers=self._headers))
+
+    def status(self, job_id: str) -> str:
+        state = self._batch(job_id).get("status")
+        if state == "completed":
+            return SUCCEEDED
+        if state in {"failed", "expired", "cancelled", "cancelling"}:
+            return FAILED
+        return RUNNING
+
+    def results(self, job_id: str) -> dict[str, str]:
+        output_file_id = self._batch(job_id).get("output_file_id")
+        if not output_file_id:
+            return {}
+        resp = self._client.get(
+            f"{self.base_url}/files/{output_file_id}/content", headers=self._headers
+        )
+        resp.raise_for_status()
+        out: dict[str, str] = {}
+        for line in resp.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if item.get("error") or response.get("status_code") != 200:
+                continue
+            text = chat_completion_text(response.get("body") or {})
+            if text:
+                out[str(item["custom_id"])] = text
+        return out
+
+
+def run_batch_job(
+    backend: Any,
+    requests: list[BatchRequest],
+    schema: dict[str, Any] | None,
+    job_path: Path,
+    poll_seconds: float = 60.0,
+    timeout_seconds: float = 86400.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> dict[str, str]:
+    """Submit `requests` as one provider batch job and wait for its raw outputs.
+
+    Returns `{custom_id: raw_text}` for the requests that produced output; failed or
+    missing items are simply absent. The submitted job id is recorded next to the job
+    file, so a run interrupted while polling resumes the same job instead of resubmitting.
+    """
+    if not requests:
+        return {}
+    state_path = job_path.with_suffix(".state.json")
+    custom_ids = sorted(r.custom_id for r in requests)
+    job_id: str | None = None
+    if state_path.exists():
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        if state.get("backend") == backend.name and state.get("custom_ids") == custom_ids:
+            job_id = str(state["job_id"])
+            print(f"[batch-api] resuming {backend.name} job {job_id}")
+    if job_id is None:
+        write_job_file(job_path, [backend.job_line(r, schema) for r in requests])
+        job_id = backend.submit(job_path)
+        state_path.write_text(
+            json.dumps({"backend": backend.name, "job_id": job_id, "custom_ids": custom_ids}),
+            encoding="utf-8",
+        )
+        print(f"[batch-api] submitted {backend.name} job {job_id} with {len(requests)} requests")
+
+    waited = 0.0
+    while True:
+        status = backend.status(job_id)
+        if status == SUCCEEDED:
+            break
+        if status == FAILED:
+            state_path.unlink(missing_ok=True)
+            raise BatchJobError(f"{backend.name} batch job {job_id} failed")
+        if waited >= timeout_seconds:
+            raise BatchJobError(
+                f"{backend.name} batch job {job_id} still running after "
+                f"{timeout_seconds:.0f}s; rerun to resume"
+            )
+        sleep(poll_seconds)
+        waited += poll_seconds
+
+    results = backend.results(job_id)
+    state_path.unlink(missing_ok=True)
+    return results
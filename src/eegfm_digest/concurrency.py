@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import email.utils
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimitStop(BaseException):
+    """Raised to stop batch execution when provider quota/rate limits are hit."""
+
+
+class RateLimited(Exception):
+    """The provider throttled a request (HTTP 429); RateLimitedLLM backs off and retries it."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Parse a `Retry-After` header given either as delta-seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RateLimiter:
+    """Thread-safe token bucket; a non-positive rate disables limiting."""
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate_per_second = rate_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute: float, burst: int = 1) -> RateLimiter:
+        return cls(requests_per_minute / 60.0 if requests_per_minute > 0 else 0.0, burst=burst)
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_second > 0
+
+    def reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            blocked = max(0.0, self._blocked_until - now)
+            if not self.enabled:
+                return blocked
+            self._tokens = min(float(self.burst), self._tokens + (now - self._last) * self.rate_per_second)
+            self._last = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return blocked
+            return max(blocked, -self._tokens / self.rate_per_second)
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self) -> None:
+        pass
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        """Hold every caller back for `retry_after` seconds (1s when the provider gave none)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + (retry_after or 1.0))
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """AIMD token bucket that tracks the provider's actual limit.
+
+    Successes raise the rate by `increase_per_minute` per minute (up to `max_per_minute`):
+    each success adds its share of that step, so the ramp is linear rather than compounding
+    with the rate. Each throttled request halves it (down to `min_per_minute`) and honours
+    `Retry-After`.
+    A limiter that starts disabled stays unthrottled until the first 429, then starts
+    from half the throughput observed over the last minute.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0.0,
+        min_per_minute: float = 1.0,
+        max_per_minute: float | None = None,
+        increase_per_minute: float = 1.0,
+        decrease_factor: float = 0.5,
+        burst: int = 1,
+    ):
+        super().__init__(requests_per_minute / 60.0 if requests_per_minute > 0 else 0.0, burst=burst)
+        self.min_rate = min_per_minute / 60.0
+        self.max_rate = max_per_minute / 60.0 if max_per_minute else None
+        self.increase = increase_per_minute / 60.0
+        self.decrease_factor = decrease_factor
+        self._recent: deque[float] = deque()
+
+    @property
+    def requests_per_minute(self) -> float:
+        return self.rate_per_second * 60.0
+
+    def on_success(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._recent.append(now)
+            while self._recent and self._recent[0] < now - 60.0:
+                self._recent.popleft()
+            if self.enabled:
+                # ~rate*60 successes arrive per minute, so together they add one `increase`.
+                rate = self.rate_per_second + self.increase / (self.rate_per_second * 60.0)
+                self.rate_per_second = min(rate, self.max_rate) if self.max_rate else rate
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self.enabled:
+                rate = self.rate_per_second
+            else:
+                span = now - self._recent[0] if len(self._recent) > 1 else 60.0
+                rate = len(self._recent) / max(span, 1.0)
+                self._last = now
+            self.rate_per_second = max(self.min_rate, rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0.0)
+            pause = retry_after if retry_after is not None else 1.0 / self.rate_per_second
+            self._blocked_until = max(self._blocked_until, now + pause)
+
+
+class RateLimitedLLM:
+    """Proxy that makes every `generate` call on the wrapped client take a limiter token.
+
+    Throttled calls (`RateLimited`) are reported to the limiter and retried up to
+    `max_retries` times; after that the run stops with RateLimitStop.
+    """
+
+    def __init__(self, llm: Any, limiter: RateLimiter, max_retries: int = 8):
+        self.llm = llm
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def _give_up(self, exc: RateLimited) -> RateLimitStop:
+        return RateLimitStop(f"still rate limited after {self.max_retries} retries: {exc}")
+
+    def generate(self, prompt: str, schema: dict[str, Any] | None = None) -> str:
+        retries = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                text = self.llm.generate(prompt, schema=schema)
+            except RateLimited as exc:
+                self.limiter.on_throttle(exc.retry_after)
+                retries += 1
+                if retries > self.max_retries:
+                    raise self._give_up(exc) from exc
+                continue
+            self.limiter.on_success()
+            return text
+
+
+def map_ordered(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    workers: int = 1,
+) -> Iterator[R]:
+    """Run `fn` over `items` on a bounded thread pool and yield results in input order.
+
+    The first exception (including BaseException subclasses such as RateLimitStop)
+    cancels every task that has not started yet and is re-raised to the caller.
+    """
+    items = list(items)
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures: list[Future[R]] = []
+    try:
+        futures = [executor.submit(fn, item) for item in items]
+        for future in futures:
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+
+
+_DONE = object()
+
+
+def run_pipeline(items: Iterable[Any], stages: list[Stage], queue_size: int = 4) -> Iterator[Any]:
+    """Stream `items` through `stages`, each on its own thread pool, yielding in completion order.
+
+    Stages are joined by bounded queues, so a slow stage applies backpressure upstream
+    instead of letting work pile up in memory. The first exception raised by any stage
+    stops the pipeline; remaining items are drained without processing and the
+    exception is re-raised here.
+    """
+    queues: list[queue.Queue[Any]] = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    queues.append(queue.Queue(maxsize=max(1, queue_size)))
+    stop = threading.Event()
+    failures: list[BaseException] = []
+    remaining = [max(1, stage.workers) for stage in stages]
+    lock = threading.Lock()
+
+    def fail(exc: BaseException) -> None:
+        with lock:
+            if not failures:
+                failures.append(exc)
+        stop.set()
+
+    def feed() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                queues[0].put(item)
+        except BaseException as exc:  # noqa: BLE001
+            fail(exc)
+        finally:
+            for _ in range(remaining[0]):
+                queues[0].put(_DONE)
+
+    def work(index: int) -> None:
+        stage = stages[index]
+        inbox, outbox = queues[index], queues[index + 1]
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if stop.is_set():
+                continue
+            try:
+                outbox.put(stage.fn(item))
+            except BaseException as exc:  # noqa: BLE001
+                fail(exc)
+        with lock:
+            remaining[index] -= 1
+            last = remaining[index] == 0
+        if last:
+            downstream = remaining[index + 1] if index + 1 < len(stages) else 1
+            for _ in range(downstream):
+                outbox.put(_DONE)
+
+    threads = [threading.Thread(target=feed, name="pipeline-feed", daemon=True)]
+    for index, stage in enumerate(stages):
+        threads.extend(
+            threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+            for n in range(remaining[index])
+        )
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                break
+            if not stop.is_set():
+                yield item
+    finally:
+        stop.set()
+        # Keep draining so blocked producers can observe `stop` and exit.
+        while any(thread.is_alive() for thread in threads):
+            try:
+                queues[-1].get(timeout=0.05)
+            except queue.Empty:
+                pass
+        for thread in threads:
+            thread.join()
+    if failures:
+        raise failures[0]
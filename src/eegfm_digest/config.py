@@ -1,8 +1,8 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from pathlib import Path
-import os
 
 
 @dataclass(frozen=True)
@@ -14,6 +14,7 @@ class Config:
     arxiv_read_timeout_seconds: float = 60.0
     arxiv_retries: int = 2
     arxiv_retry_backoff_seconds: float = 2.0
+    arxiv_incremental: bool = False
     pdf_rate_limit_seconds: float = 5.0
     output_dir: Path = Path("outputs")
     data_dir: Path = Path("data")
@@ -29,6 +30,20 @@ class Config:
     llm_temperature_summary: float = 0.2
     llm_max_output_tokens_triage: int = 1024
     llm_max_output_tokens_summary: int = 2048
+    triage_workers: int = 1
+    triage_pack_size: int = 1
+    prefilter_margin: float = 0.0
+    llm_requests_per_minute: float = 0.0
+    llm_max_requests_per_minute: float = 0.0
+    llm_cache_max_mb: float = 256.0
+    pdf_download_workers: int = 2
+    pdf_extract_workers: int = 2
+    summary_workers: int = 1
+    pipeline_queue_size: int = 4
+    pdf_extract_mode: str = "inline"
+    pdf_extract_timeout_seconds: float = 120.0
+    pdf_extract_max_memory_mb: int = 2048
+    pdf_extract_max_tasks_per_worker: int = 25
 
 
 def load_config() -> Config:
@@ -40,6 +55,7 @@ def load_config() -> Config:
         arxiv_read_timeout_seconds=float(os.environ.get("ARXIV_READ_TIMEOUT_SECONDS", "60")),
         arxiv_retries=int(os.environ.get("ARXIV_RETRIES", "2")),
         arxiv_retry_backoff_seconds=float(os.environ.get("ARXIV_RETRY_BACKOFF_SECONDS", "2")),
+        arxiv_incremental=os.environ.get("ARXIV_INCREMENTAL", "false").lower() in {"1", "true", "yes"},
         pdf_rate_limit_seconds=float(os.environ.get("PDF_RATE_LIMIT_SECONDS", "5")),
         output_dir=Path(os.environ.get("OUTPUT_DIR", "outputs")),
         data_dir=Path(os.environ.get("DATA_DIR", "data")),
@@ -55,4 +71,18 @@ def load_config() -> Config:
         llm_temperature_summary=float(os.environ.get("LLM_TEMPERATURE_SUMMARY", "0.2")),
         llm_max_output_tokens_triage=int(os.environ.get("LLM_MAX_OUTPUT_TOKENS_TRIAGE", "1024")),
         llm_max_output_tokens_summary=int(os.environ.get("LLM_MAX_OUTPUT_TOKENS_SUMMARY", "2048")),
+        triage_workers=int(os.environ.get("TRIAGE_WORKERS", "1")),
+        triage_pack_size=max(1, int(os.environ.get("TRIAGE_PACK_SIZE", "1"))),
+        prefilter_margin=float(os.environ.get("PREFILTER_MARGIN", "0")),
+        llm_requests_per_minute=float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "0")),
+        llm_max_requests_per_minute=float(os.environ.get("LLM_MAX_REQUESTS_PER_MINUTE", "0")),
+        llm_cache_max_mb=float(os.environ.get("LLM_CACHE_MAX_MB", "256")),
+        pdf_download_workers=int(os.environ.get("PDF_DOWNLOAD_WORKERS", "2")),
+        pdf_extract_workers=int(os.environ.get("PDF_EXTRACT_WORKERS", "2")),
+        summary_workers=int(os.environ.get("SUMMARY_WORKERS", "1")),
+        pipeline_queue_size=int(os.environ.get("PIPELINE_QUEUE_SIZE", "4")),
+        pdf_extract_mode=os.environ.get("PDF_EXTRACT_MODE", "inline").strip().lower(),
+        pdf_extract_timeout_seconds=float(os.environ.get("PDF_EXTRACT_TIMEOUT_SECONDS", "120")),
+        pdf_extract_max_memory_mb=int(os.environ.get("PDF_EXTRACT_MAX_MEMORY_MB", "2048")),
+        pdf_extract_max_tasks_per_worker=int(os.environ.get("PDF_EXTRACT_MAX_TASKS_PER_WORKER", "25")),
     )
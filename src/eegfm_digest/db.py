@@ -1,19 +1,162 @@
 from __future__ import annotations
 
-import json
+import hashlib
 import sqlite3
+import threading
+import time
+import weakref
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
+from . import serde
+
+BUSY_TIMEOUT_MS = 30_000
+_MAX_SQL_VARIABLES = 900
+
+_VERSION_COLUMNS = ("prompt_sha", "schema_sha", "model")
+
+_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    f"busy_timeout={BUSY_TIMEOUT_MS}",
+    "cache_size=-65536",
+    "mmap_size=268435456",
+    "temp_store=MEMORY",
+)
+
+_UPSERT_PAPER = """
+INSERT INTO papers(arxiv_id_base, month, metadata_json)
+VALUES (?, ?, ?)
+ON CONFLICT(arxiv_id_base) DO UPDATE SET
+  month=excluded.month,
+  metadata_json=excluded.metadata_json,
+  updated_at=CURRENT_TIMESTAMP
+"""
+
+# Rows written without a version (e.g. bootstrapped from outputs) keep the recorded one.
+_UPSERT_TRIAGE = """
+INSERT INTO triage(arxiv_id_base, month, triage_json, prompt_sha, schema_sha, model)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(arxiv_id_base) DO UPDATE SET
+  month=excluded.month,
+  triage_json=excluded.triage_json,
+  prompt_sha=COALESCE(excluded.prompt_sha, triage.prompt_sha),
+  schema_sha=COALESCE(excluded.schema_sha, triage.schema_sha),
+  model=COALESCE(excluded.model, triage.model),
+  updated_at=CURRENT_TIMESTAMP
+"""
+
+_UPSERT_SUMMARY = """
+INSERT INTO summaries(arxiv_id_base, month, summary_json, prompt_sha, schema_sha, model)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(arxiv_id_base) DO UPDATE SET
+  month=excluded.month,
+  summary_json=excluded.summary_json,
+  prompt_sha=COALESCE(excluded.prompt_sha, summaries.prompt_sha),
+  schema_sha=COALESCE(excluded.schema_sha, summaries.schema_sha),
+  model=COALESCE(excluded.model, summaries.model),
+  updated_at=CURRENT_TIMESTAMP
+"""
+
+
+@dataclass(frozen=True)
+class ResultVersion:
+    """What produced a triage/summary row: prompt and schema file hashes plus model name."""
+
+    prompt_sha: str
+    schema_sha: str
+    model: str
+
+    def params(self) -> tuple[str, str, str]:
+        return (self.prompt_sha, self.schema_sha, self.model)
+
+
+def result_version(prompt_path: Path, schema_path: Path, model: str) -> ResultVersion:
+    return ResultVersion(
+        prompt_sha=hashlib.sha256(prompt_path.read_bytes()).hexdigest(),
+        schema_sha=hashlib.sha256(schema_path.read_bytes()).hexdigest(),
+        model=model,
+    )
+
+
+_NO_VERSION = (None, None, None)
+
+LLM_TOUCH_BATCH = 256
+
+LEDGER_STATES = ("pending", "running", "done", "failed")
+
+# Entering "running" counts an attempt; other transitions keep the count.
+_UPSERT_LEDGER = """
+INSERT INTO work_ledger(month, stage, arxiv_id_base, state, attempts, error)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(month, stage, arxiv_id_base) DO UPDATE SET
+  state=excluded.state,
+  attempts=work_ledger.attempts + excluded.attempts,
+  error=excluded.error,
+  updated_at=CURRENT_TIMESTAMP
+"""
+
+
+@dataclass(frozen=True)
+class LedgerEntry:
+    state: str
+    attempts: int
+    error: str | None = None
+
 
 class DigestDB:
     def __init__(self, db_path: Path):
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+        # One connection per thread: workers read caches and persist results concurrently,
+        # and WAL lets readers proceed while a single writer commits.
+        self._connections: weakref.WeakKeyDictionary[threading.Thread, sqlite3.Connection] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Cache hits record `last_used_at` here and write it in batches (see flush_llm_touches).
+        self._llm_touches: dict[str, float] = {}
+        self._llm_hits_pending = 0
         self._init_schema()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        thread = threading.current_thread()
+        with self._lock:
+            conn = self._connections.get(thread)
+            if conn is None:
+                conn = self._connect()
+                self._connections[thread] = conn
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False only so close() can release every thread's connection;
+        # each connection is still used by the thread that opened it.
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers wait on
+            # busy_timeout instead of failing on a read-to-write lock upgrade.
+            isolation_level="IMMEDIATE",
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in _PRAGMAS:
+            conn.execute(f"PRAGMA {pragma}")
+        return conn
+
+    @property
+    def _tx_depth(self) -> int:
+        return getattr(self._local, "tx_depth", 0)
+
+    @_tx_depth.setter
+    def _tx_depth(self, value: int) -> None:
+        self._local.tx_depth = value
+
     def _init_schema(self) -> None:
         self.conn.executescript(
             """
@@ -35,6 +178,31 @@ class DigestDB:
               summary_json TEXT NOT NULL,
               updated_at TEXT DEFAULT CURRENT_TIMESTAMP
             );
+            CREATE TABLE IF NOT EXISTS arxiv_sync (
+              month TEXT NOT NULL,
+              query TEXT NOT NULL,
+              watermark TEXT NOT NULL,
+              updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+              PRIMARY KEY (month, query)
+            );
+            CREATE TABLE IF NOT EXISTS llm_cache (
+              cache_key TEXT PRIMARY KEY,
+              model TEXT NOT NULL,
+              response TEXT NOT NULL,
+              size_bytes INTEGER NOT NULL,
+              last_used_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used_at);
+            CREATE TABLE IF NOT EXISTS work_ledger (
+              month TEXT NOT NULL,
+              stage TEXT NOT NULL,
+              arxiv_id_base TEXT NOT NULL,
+              state TEXT NOT NULL,
+              attempts INTEGER NOT NULL DEFAULT 0,
+              error TEXT,
+              updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+              PRIMARY KEY (month, stage, arxiv_id_base)
+            );
             CREATE TABLE IF NOT EXISTS runs (
               month TEXT PRIMARY KEY,
               stats_json TEXT NOT NULL,
@@ -42,61 +210,149 @@ class DigestDB:
             );
             """
         )
+        for table in ("triage", "summaries"):
+            existing = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for column in _VERSION_COLUMNS:
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
         self.conn.commit()
 
+    @contextmanager
+    def transaction(self) -> Iterator[DigestDB]:
+        """Group writes into one commit; nested blocks join the outermost transaction."""
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            if self._tx_depth == 0:
+                self.conn.rollback()
+            raise
+        self._tx_depth -= 1
+        if self._tx_depth == 0:
+            self.conn.commit()
+
+    def _commit(self) -> None:
+        if self._tx_depth == 0:
+            self.conn.commit()
+
+    def _upsert_many(self, sql: str, rows: Iterable[tuple[Any, ...]]) -> None:
+        with self.transaction():
+            self.conn.executemany(sql, rows)
+
     def upsert_paper(self, month: str, paper: dict[str, Any]) -> None:
-        self.conn.execute(
-            """
-            INSERT INTO papers(arxiv_id_base, month, metadata_json)
-            VALUES (?, ?, ?)
-            ON CONFLICT(arxiv_id_base) DO UPDATE SET
-              month=excluded.month,
-              metadata_json=excluded.metadata_json,
-              updated_at=CURRENT_TIMESTAMP
-            """,
-            (paper["arxiv_id_base"], month, json.dumps(paper, ensure_ascii=False)),
+        self.upsert_papers_many(month, [paper])
+
+    def upsert_papers_many(self, month: str, papers: Iterable[dict[str, Any]]) -> None:
+        self._upsert_many(
+            _UPSERT_PAPER,
+            ((p["arxiv_id_base"], month, serde.dumps(p, sort_keys=False)) for p in papers),
         )
-        self.conn.commit()
 
     def get_triage(self, arxiv_id_base: str) -> dict[str, Any] | None:
         row = self.conn.execute(
             "SELECT triage_json FROM triage WHERE arxiv_id_base=?", (arxiv_id_base,)
         ).fetchone()
-        return json.loads(row["triage_json"]) if row else None
+        return serde.loads(row["triage_json"]) if row else None
 
-    def upsert_triage(self, month: str, triage: dict[str, Any]) -> None:
-        self.conn.execute(
-            """
-            INSERT INTO triage(arxiv_id_base, month, triage_json)
-            VALUES (?, ?, ?)
-            ON CONFLICT(arxiv_id_base) DO UPDATE SET
-              month=excluded.month,
-              triage_json=excluded.triage_json,
-              updated_at=CURRENT_TIMESTAMP
-            """,
-            (triage["arxiv_id_base"], month, json.dumps(triage, ensure_ascii=False)),
+    def get_triage_for_month(
+        self, month: str, arxiv_id_bases: Iterable[str] = ()
+    ) -> dict[str, dict[str, Any]]:
+        """All triage rows stored under `month`, plus any of `arxiv_id_bases` stored elsewhere."""
+        rows = self.conn.execute(
+            "SELECT arxiv_id_base, triage_json FROM triage WHERE month=?", (month,)
+        ).fetchall()
+        out = {row["arxiv_id_base"]: serde.loads(row["triage_json"]) for row in rows}
+        missing = [aid for aid in arxiv_id_bases if aid not in out]
+        out.update(self._get_json_for_ids("triage", "triage_json", missing))
+        return out
+
+    def upsert_triage(
+        self, month: str, triage: dict[str, Any], version: ResultVersion | None = None
+    ) -> None:
+        self.upsert_triage_many(month, [triage], version)
+
+    def upsert_triage_many(
+        self, month: str, rows: Iterable[dict[str, Any]], version: ResultVersion | None = None
+    ) -> None:
+        tag = version.params() if version else _NO_VERSION
+        self._upsert_many(
+            _UPSERT_TRIAGE,
+            ((t["arxiv_id_base"], month, serde.dumps(t, sort_keys=False), *tag) for t in rows),
         )
-        self.conn.commit()
+
+    def get_stale_triage_ids(
+        self, arxiv_id_bases: Iterable[str], version: ResultVersion, *also_current: ResultVersion
+    ) -> set[str]:
+        """Ids recorded under none of `version` and `also_current` (e.g. the packed prompt)."""
+        return self._stale_ids("triage", arxiv_id_bases, version, *also_current)
 
     def get_summary(self, arxiv_id_base: str) -> dict[str, Any] | None:
         row = self.conn.execute(
             "SELECT summary_json FROM summaries WHERE arxiv_id_base=?", (arxiv_id_base,)
         ).fetchone()
-        return json.loads(row["summary_json"]) if row else None
+        return serde.loads(row["summary_json"]) if row else None
 
-    def upsert_summary(self, month: str, summary: dict[str, Any]) -> None:
-        self.conn.execute(
-            """
-            INSERT INTO summaries(arxiv_id_base, month, summary_json)
-            VALUES (?, ?, ?)
-            ON CONFLICT(arxiv_id_base) DO UPDATE SET
-              month=excluded.month,
-              summary_json=excluded.summary_json,
-              updated_at=CURRENT_TIMESTAMP
-            """,
-            (summary["arxiv_id_base"], month, json.dumps(summary, ensure_ascii=False)),
+    def get_summaries_for_ids(self, arxiv_id_bases: Iterable[str]) -> dict[str, dict[str, Any]]:
+        return self._get_json_for_ids("summaries", "summary_json", arxiv_id_bases)
+
+    def get_summary_notes(self) -> list[tuple[str | None, str]]:
+        """(model, notes) for every stored summary; used to calibrate token estimates."""
+        rows = self.conn.execute(
+            "SELECT model, json_extract(summary_json, '$.notes') AS notes FROM summaries"
+        ).fetchall()
+        return [(row["model"], row["notes"]) for row in rows if isinstance(row["notes"], str)]
+
+    def get_stale_summary_ids(self, arxiv_id_bases: Iterable[str], version: ResultVersion) -> set[str]:
+        return self._stale_ids("summaries", arxiv_id_bases, version)
+
+    def _select_for_ids(
+        self, sql: str, arxiv_id_bases: Iterable[str], params: tuple[Any, ...] = ()
+    ) -> Iterator[sqlite3.Row]:
+        """Run `sql` (with an `{ids}` placeholder) over `arxiv_id_bases` in chunks."""
+        ids = list(dict.fromkeys(arxiv_id_bases))
+        # Stay under SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds.
+        for i in range(0, len(ids), _MAX_SQL_VARIABLES):
+            chunk = ids[i : i + _MAX_SQL_VARIABLES]
+            yield from self.conn.execute(sql.format(ids=",".join("?" * len(chunk))), (*chunk, *params))
+
+    def _get_json_for_ids(
+        self, table: str, column: str, arxiv_id_bases: Iterable[str]
+    ) -> dict[str, dict[str, Any]]:
+        rows = self._select_for_ids(
+            f"SELECT arxiv_id_base, {column} FROM {table} WHERE arxiv_id_base IN ({{ids}})",
+            arxiv_id_bases,
+        )
+        return {row["arxiv_id_base"]: serde.loads(row[column]) for row in rows}
+
+    def _stale_ids(
+        self, table: str, arxiv_id_bases: Iterable[str], *versions: ResultVersion
+    ) -> set[str]:
+        # Rows recorded before versions were tracked (NULL columns) count as stale.
+        current = " OR ".join(
+            ["(prompt_sha IS ? AND schema_sha IS ? AND model IS ?)"] * len(versions)
+        )
+        rows = self._select_for_ids(
+            f"SELECT arxiv_id_base FROM {table} WHERE arxiv_id_base IN ({{ids}}) "
+            f"AND NOT ({current})",
+            arxiv_id_bases,
+            tuple(param for version in versions for param in version.params()),
+        )
+        return {row["arxiv_id_base"] for row in rows}
+
+    def upsert_summary(
+        self, month: str, summary: dict[str, Any], version: ResultVersion | None = None
+    ) -> None:
+        self.upsert_summaries_many(month, [summary], version)
+
+    def upsert_summaries_many(
+        self, month: str, rows: Iterable[dict[str, Any]], version: ResultVersion | None = None
+    ) -> None:
+        tag = version.params() if version else _NO_VERSION
+        self._upsert_many(
+            _UPSERT_SUMMARY,
+            ((r["arxiv_id_base"], month, serde.dumps(r, sort_keys=False), *tag) for r in rows),
         )
-        self.conn.commit()
 
     def upsert_run(self, month: str, stats: dict[str, Any]) -> None:
         self.conn.execute(
@@ -107,9 +363,127 @@ class DigestDB:
               stats_json=excluded.stats_json,
               updated_at=CURRENT_TIMESTAMP
             """,
-            (month, json.dumps(stats, ensure_ascii=False)),
+            (month, serde.dumps(stats, sort_keys=False)),
         )
-        self.conn.commit()
+        self._commit()
+
+    def get_arxiv_watermarks(self, month: str) -> dict[str, str]:
+        rows = self.conn.execute(
+            "SELECT query, watermark FROM arxiv_sync WHERE month=?", (month,)
+        ).fetchall()
+        return {row["query"]: row["watermark"] for row in rows}
+
+    def set_arxiv_watermarks(self, month: str, watermarks: dict[str, str]) -> None:
+        self.conn.executemany(
+            """
+            INSERT INTO arxiv_sync(month, query, watermark)
+            VALUES (?, ?, ?)
+            ON CONFLICT(month, query) DO UPDATE SET
+              watermark=excluded.watermark,
+              updated_at=CURRENT_TIMESTAMP
+            """,
+            [(month, query, watermark) for query, watermark in watermarks.items()],
+        )
+        self._commit()
+
+    def set_work_state(
+        self,
+        month: str,
+        stage: str,
+        arxiv_id_bases: Iterable[str],
+        state: str,
+        error: str | None = None,
+    ) -> None:
+        """Record `state` for each paper's (month, stage) item in the work ledger."""
+        if state not in LEDGER_STATES:
+            raise ValueError(f"Unknown work state {state!r}")
+        attempt = 1 if state == "running" else 0
+        self._upsert_many(
+            _UPSERT_LEDGER, [(month, stage, aid, state, attempt, error) for aid in arxiv_id_bases]
+        )
+
+    def get_work_states(self, month: str, stage: str) -> dict[str, LedgerEntry]:
+        rows = self.conn.execute(
+            "SELECT arxiv_id_base, state, attempts, error FROM work_ledger WHERE month=? AND stage=?",
+            (month, stage),
+        ).fetchall()
+        return {
+            row["arxiv_id_base"]: LedgerEntry(row["state"], row["attempts"], row["error"]) for row in rows
+        }
+
+    def count_work_states(self, month: str, stage: str) -> dict[str, int]:
+        rows = self.conn.execute(
+            "SELECT state, COUNT(*) AS n FROM work_ledger WHERE month=? AND stage=? GROUP BY state",
+            (month, stage),
+        ).fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def requeue_running_work(self) -> int:
+        """Reset items left `running` by a process that died back to `pending`; returns the count."""
+        cur = self.conn.execute(
+            "UPDATE work_ledger SET state='pending', updated_at=CURRENT_TIMESTAMP WHERE state='running'"
+        )
+        self._commit()
+        return cur.rowcount
+
+    def get_llm_response(self, cache_key: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT response FROM llm_cache WHERE cache_key=?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._llm_touches[cache_key] = time.time()
+            self._llm_hits_pending += 1
+            full = self._llm_hits_pending >= LLM_TOUCH_BATCH
+        if full:
+            self.flush_llm_touches()
+        return row["response"]
+
+    def flush_llm_touches(self) -> None:
+        """Write pending cache-hit recency updates in one transaction."""
+        with self._lock:
+            touches, self._llm_touches = self._llm_touches, {}
+            self._llm_hits_pending = 0
+        if touches:
+            self._upsert_many(
+                "UPDATE llm_cache SET last_used_at=MAX(last_used_at, ?) WHERE cache_key=?",
+                [(used, key) for key, used in touches.items()],
+            )
+
+    def put_llm_response(self, cache_key: str, model: str, response: str, max_bytes: int) -> None:
+        """Store a response, then evict least-recently-used entries beyond `max_bytes` in total."""
+        with self.transaction():
+            # Eviction must see recent hits, or it could drop entries that are still in use.
+            self.flush_llm_touches()
+            self.conn.execute(
+                """
+                INSERT INTO llm_cache(cache_key, model, response, size_bytes, last_used_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                  response=excluded.response,
+                  size_bytes=excluded.size_bytes,
+                  last_used_at=excluded.last_used_at
+                """,
+                (cache_key, model, response, len(response.encode("utf-8")), time.time()),
+            )
+            self.conn.execute(
+                """
+                DELETE FROM llm_cache WHERE cache_key IN (
+                  SELECT cache_key FROM (
+                    SELECT cache_key,
+                           SUM(size_bytes) OVER (ORDER BY last_used_at DESC, cache_key) AS running
+                    FROM llm_cache
+                  ) WHERE running > ?
+                )
+                """,
+                (max_bytes,),
+            )
 
     def close(self) -> None:
-        self.conn.close()
+        self.flush_llm_touches()
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
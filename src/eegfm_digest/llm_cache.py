@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from .db import DigestDB
+
+
+def llm_cache_key(prompt: str, model: str, temperature: float, schema: dict[str, Any] | None) -> str:
+    payload = json.dumps(
+        {"model": model, "temperature": temperature, "schema": schema, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedLLM:
+    """Proxy that answers repeated `generate` calls from the SQLite `llm_cache` table.
+
+    Entries are keyed by the rendered prompt, model, temperature and schema, so editing a
+    prompt or switching models misses naturally while identical requests are free.
+    Wrap outside RateLimitedLLM so cache hits do not consume rate-limit tokens.
+    With `refresh`, lookups are skipped (forced reruns) but new responses are still stored.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        db: DigestDB,
+        model: str,
+        temperature: float,
+        max_bytes: int,
+        refresh: bool = False,
+    ):
+        self.llm = llm
+        self.db = db
+        self.model = model
+        self.temperature = temperature
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Context-local rather than thread-local, so calls interleaved on one thread (e.g.
+        # tasks on an event loop) each keep only their own responses.
+        self._pending: ContextVar[list[tuple[str, str]] | None] = ContextVar(
+            f"llm_cache_pending_{id(self)}", default=None
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+    def _lookup(self, prompt: str, schema: dict[str, Any] | None) -> tuple[str, str | None]:
+        key = llm_cache_key(prompt, self.model, self.temperature, schema)
+        cached = None if self.refresh else self.db.get_llm_response(key)
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return key, cached
+
+    def peek(self, prompt: str, schema: dict[str, Any] | None = None) -> str | None:
+        """Cached response for `prompt`, without counting a hit or miss."""
+        if self.refresh:
+            return None
+        return self.db.get_llm_response(llm_cache_key(prompt, self.model, self.temperature, schema))
+
+    def store(self, prompt: str, schema: dict[str, Any] | None, text: str) -> None:
+        """Record a response obtained outside `generate` (e.g. from a provider batch job)."""
+        key = llm_cache_key(prompt, self.model, self.temperature, schema)
+        self.db.put_llm_response(key, self.model, text, self.max_bytes)
+
+    @contextmanager
+    def deferred(self) -> Iterator[Callable[[], None]]:
+        """Hold responses fetched in this context inside the block until `keep()` is called.
+
+        Callers keep them once the output parsed and validated, so a response that ended in
+        a JSON-error fallback is never replayed by later runs.
+        """
+        pending: list[tuple[str, str]] = []
+        token = self._pending.set(pending)
+
+        def keep() -> None:
+            for key, text in pending:
+                self.db.put_llm_response(key, self.model, text, self.max_bytes)
+            pending.clear()
+
+        try:
+            yield keep
+        finally:
+            self._pending.reset(token)
+
+    def _remember(self, key: str, text: str) -> None:
+        pending = self._pending.get()
+        if pending is None:
+            self.db.put_llm_response(key, self.model, text, self.max_bytes)
+        else:
+            pending.append((key, text))
+
+    def generate(self, prompt: str, schema: dict[str, Any] | None = None) -> str:
+        key, cached = self._lookup(prompt, schema)
+        if cached is not None:
+            return cached
+        text = self.llm.generate(prompt, schema=schema)
+        self._remember(key, text)
+        return text
+
+
+@contextmanager
+def cache_on_success(llm: Any) -> Iterator[Callable[[], None]]:
+    """`CachedLLM.deferred` for `llm` when it is cached; otherwise `keep()` does nothing."""
+    if isinstance(llm, CachedLLM):
+        with llm.deferred() as keep:
+            yield keep
+    else:
+        yield lambda: None
+
+
+def with_llm_cache(
+    llm: Any,
+    db: DigestDB,
+    model: str,
+    temperature: float,
+    max_mb: float,
+    refresh: bool = False,
+) -> Any:
+    """Wrap `llm` in CachedLLM unless the cache is disabled (`max_mb <= 0`)."""
+    if max_mb <= 0:
+        return llm
+    return CachedLLM(
+        llm,
+        db,
+        model=model,
+        temperature=temperature,
+        max_bytes=int(max_mb * 1024 * 1024),
+        refresh=refresh,
+    )
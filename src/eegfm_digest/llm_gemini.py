@@ -2,9 +2,13 @@ from __future__ import annotations
 
 import json
 import os
+import threading
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any
 
+from .concurrency import RateLimited
+
 
 @dataclass(frozen=True)
 class LLMConfig:
@@ -29,14 +33,62 @@ def _extract_text(resp: Any) -> str:
     return str(resp)
 
 
+def _token_count(resp: Any) -> int:
+    for key in ("total_tokens", "token_count", "total_token_count"):
+        value = getattr(resp, key, None)
+        if value is not None:
+            return int(value)
+    if isinstance(resp, dict):
+        for key in ("total_tokens", "token_count", "total_token_count"):
+            if key in resp:
+                return int(resp[key])
+    raise RuntimeError("Unable to read token count from Gemini count_tokens response")
+
+
+def _retry_delay(details: Any) -> float | None:
+    # 429 bodies carry google.rpc.RetryInfo, e.g. {"retryDelay": "37s"}.
+    error = details.get("error", details) if isinstance(details, dict) else {}
+    for item in error.get("details") or []:
+        delay = item.get("retryDelay") if isinstance(item, dict) else None
+        if isinstance(delay, str) and delay.endswith("s"):
+            try:
+                return float(delay[:-1])
+            except ValueError:
+                return None
+    return None
+
+
+def _as_rate_limited(exc: Exception) -> Exception:
+    """Map the SDK's 429 RESOURCE_EXHAUSTED error onto RateLimited; pass others through."""
+    if getattr(exc, "code", None) != 429:
+        return exc
+    retry_after = _retry_delay(getattr(exc, "details", None))
+    return RateLimited(f"gemini_rate_limited {exc}", retry_after=retry_after)
+
+
+_SHARED_CLIENTS: dict[str, Any] = {}
+_SHARED_CLIENTS_LOCK = threading.Lock()
+
+
+def _shared_genai_client(api_key: str) -> Any:
+    # One genai.Client per key: its transport (and connection pool) is shared by every
+    # GeminiClient, e.g. the triage and summary models.
+    with _SHARED_CLIENTS_LOCK:
+        client = _SHARED_CLIENTS.get(api_key)
+        if client is None:
+            from google import genai
+
+            client = genai.Client(api_key=api_key)
+            _SHARED_CLIENTS[api_key] = client
+        return client
+
+
 class GeminiClient:
     def __init__(self, config: LLMConfig):
         self.config = config
-        from google import genai
+        self._client = _shared_genai_client(config.api_key)
 
-        self._client = genai.Client(api_key=config.api_key)
-
-    def generate(self, prompt: str, schema: dict[str, Any] | None = None) -> str:
+    def _generate_config(self, schema: dict[str, Any] | None) -> dict[str, Any]:
         cfg: dict[str, Any] = {
             "temperature": self.config.temperature,
             "max_output_tokens": self.config.max_output_tokens,
@@ -44,11 +96,17 @@ class GeminiClient:
         if schema is not None:
             cfg["response_mime_type"] = "application/json"
             cfg["response_json_schema"] = schema
-        resp = self._client.models.generate_content(
-            model=self.config.model,
-            contents=prompt,
-            config=cfg,
-        )
+        return cfg
+
+    def generate(self, prompt: str, schema: dict[str, Any] | None = None) -> str:
+        try:
+            resp = self._client.models.generate_content(
+                model=self.config.model,
+                contents=prompt,
+                config=self._generate_config(schema),
+            )
+        except Exception as exc:
+            raise _as_rate_limited(exc) from exc
         return _extract_text(resp).strip()
 
     def count_tokens(self, content: str) -> int:
@@ -56,15 +114,78 @@ class GeminiClient:
             model=self.config.model,
             contents=content,
         )
-        for key in ("total_tokens", "token_count", "total_token_count"):
-            value = getattr(resp, key, None)
-            if value is not None:
-                return int(value)
-        if isinstance(resp, dict):
-            for key in ("total_tokens", "token_count", "total_token_count"):
-                if key in resp:
-                    return int(resp[key])
-        raise RuntimeError("Unable to read token count from Gemini count_tokens response")
+        return _token_count(resp)
+
+
+class GeminiBatchBackend:
+    """Gemini Batch API backend for `batch_api.run_batch_job` (JSONL file in, JSONL file out)."""
+
+    name = "gemini"
+
+    def __init__(self, config: LLMConfig, client: Any | None = None):
+        self.config = config
+        self._client = client or _shared_genai_client(config.api_key)
+
+    def job_line(self, request: Any, schema: dict[str, Any] | None) -> dict[str, Any]:
+        generation_config: dict[str, Any] = {
+            "temperature": self.config.temperature,
+            "max_output_tokens": self.config.max_output_tokens,
+        }
+        if schema is not None:
+            generation_config["response_mime_type"] = "application/json"
+            generation_config["response_json_schema"] = schema
+        return {
+            "key": request.custom_id,
+            "request": {
+                "contents": [{"role": "user", "parts": [{"text": request.prompt}]}],
+                "generation_config": generation_config,
+            },
+        }
+
+    def submit(self, job_path: Path) -> str:
+        uploaded = self._client.files.upload(
+            file=str(job_path),
+            config={"display_name": job_path.name, "mime_type": "jsonl"},
+        )
+        job = self._client.batches.create(
+            model=self.config.model,
+            src=uploaded.name,
+            config={"display_name": job_path.stem},
+        )
+        return str(job.name)
+
+    def status(self, job_id: str) -> str:
+        state = self._client.batches.get(name=job_id).state
+        state = getattr(state, "name", str(state))
+        if state == "JOB_STATE_SUCCEEDED":
+            return "succeeded"
+        if state in {"JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}:
+            return "failed"
+        return "running"
+
+    def results(self, job_id: str) -> dict[str, str]:
+        job = self._client.batches.get(name=job_id)
+        file_name = getattr(getattr(job, "dest", None), "file_name", None)
+        if not file_name:
+            return {}
+        content = self._client.files.download(file=file_name)
+        out: dict[str, str] = {}
+        for line in content.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response")
+            if item.get("error") or not response:
+                continue
+            text = "\n".join(
+                part["text"]
+                for candidate in response.get("candidates") or []
+                for part in (candidate.get("content") or {}).get("parts") or []
+                if part.get("text")
+            ).strip()
+            if text:
+                out[str(item["key"])] = text
+        return out
 
 
 def load_api_key() -> str:
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Any
+
+import httpx
+
+from .batch_api import chat_completion_text
+from .concurrency import RateLimited, RateLimitStop, retry_after_seconds
+
+OPENROUTER_CHAT_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+
+class OpenRouterClient:
+    """OpenRouter chat completions over one pooled `httpx.Client`.
+
+    There is no `count_tokens`: OpenRouter has no count endpoint, so summaries route on the
+    calibrated local estimate instead.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        temperature: float,
+        max_output_tokens: int,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.max_output_tokens = max_output_tokens
+        self._client = httpx.Client(timeout=180)
+
+    def close(self) -> None:
+        self._client.close()
+
+    def _request(self, prompt: str, schema: dict[str, Any] | None) -> dict[str, Any]:
+        body: dict[str, Any] = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": self.max_output_tokens,
+            "reasoning": {"enabled": True},
+        }
+        if schema is not None:
+            body["response_format"] = {"type": "json_object"}
+        return {
+            "url": OPENROUTER_CHAT_URL,
+            "headers": {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            "json": body,
+        }
+
+    def _handle_response(self, resp: httpx.Response) -> str:
+        if resp.status_code == 402:
+            raise RateLimitStop(f"openrouter_quota_exhausted status=402 body={resp.text[:220]}")
+        if resp.status_code == 429:
+            raise RateLimited(
+                f"openrouter_rate_limited status=429 body={resp.text[:220]}",
+                retry_after=retry_after_seconds(resp.headers.get("Retry-After")),
+            )
+        resp.raise_for_status()
+        text = chat_completion_text(resp.json())
+        if not text:
+            raise RuntimeError("OpenRouter returned empty content")
+        return text
+
+    def generate(self, prompt: str, schema: dict[str, Any] | None = None) -> str:
+        return self._handle_response(self._client.post(**self._request(prompt, schema)))
@@ -1,49 +1,339 @@
 from __future__ import annotations
 
+import importlib.util
+import multiprocessing
+import os
 import re
+import signal
+import threading
 import time
+from collections.abc import Callable
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 import httpx
 
+if TYPE_CHECKING:
+    from typing_extensions import Self
 
-def download_pdf(pdf_url: str, out_path: Path, rate_limit_seconds: float) -> Path:
-    out_path.parent.mkdir(parents=True, exist_ok=True)
+
+class IncompleteDownloadError(RuntimeError):
+    pass
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _expected_total(resp: httpx.Response, offset: int) -> int | None:
+    if resp.headers.get("Content-Encoding", "identity").lower() not in {"", "identity"}:
+        # Content-Length counts encoded bytes; the decoded file size cannot be checked.
+        return None
+    content_range = resp.headers.get("Content-Range", "")
+    if resp.status_code == 206 and "/" in content_range:
+        total = content_range.rsplit("/", 1)[-1].strip()
+        if total.isdigit():
+            return int(total)
+    length = resp.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return int(length) + (offset if resp.status_code == 206 else 0)
+    return None
+
+
+class PdfDownloader:
+    """Streams PDFs through one pooled client into `<name>.part`, then renames into place.
+
+    An interrupted transfer leaves only the `.part` file, which the next attempt resumes
+    with a Range request; `out_path` exists only once the body matched Content-Length.
+    """
+
+    def __init__(
+        self,
+        timeout_seconds: float = 60.0,
+        max_connections: int = 8,
+        chunk_size: int = 64 * 1024,
+        client: httpx.Client | None = None,
+    ):
+        self.chunk_size = chunk_size
+        self._owns_client = client is None
+        self._client = client or httpx.Client(
+            timeout=timeout_seconds,
+            http2=_http2_available(),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns_client:
+            self._client.close()
+
+    def download(self, pdf_url: str, out_path: Path) -> Path:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        if out_path.exists():
+            return out_path
+        part_path = out_path.with_name(f"{out_path.name}.part")
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        with self._client.stream("GET", pdf_url, headers=headers) as resp:
+            if resp.status_code == 416 and offset:
+                # The partial file no longer lines up with the remote body; start over.
+                part_path.unlink()
+                return self.download(pdf_url, out_path)
+            resp.raise_for_status()
+            if resp.status_code != 206:
+                offset = 0
+            expected = _expected_total(resp, offset)
+            with part_path.open("ab" if offset else "wb") as fh:
+                for chunk in resp.iter_bytes(self.chunk_size):
+                    fh.write(chunk)
+                fh.flush()
+                os.fsync(fh.fileno())
+
+        size = part_path.stat().st_size
+        if expected is not None and size != expected:
+            raise IncompleteDownloadError(f"{pdf_url}: got {size} of {expected} bytes")
+        os.replace(part_path, out_path)
+        return out_path
+
+
+def download_pdf(
+    pdf_url: str,
+    out_path: Path,
+    rate_limit_seconds: float,
+    downloader: PdfDownloader | None = None,
+) -> Path:
     if out_path.exists():
         return out_path
-    with httpx.Client(timeout=60) as client:
-        resp = client.get(pdf_url)
-        resp.raise_for_status()
-        out_path.write_bytes(resp.content)
-    time.sleep(rate_limit_seconds)
+    if downloader is None:
+        with PdfDownloader() as transient:
+            transient.download(pdf_url, out_path)
+    else:
+        downloader.download(pdf_url, out_path)
+    if rate_limit_seconds > 0:
+        time.sleep(rate_limit_seconds)
     return out_path
 
 
-def extract_text(pdf_path: Path, text_path: Path) -> dict[str, Any]:
-    text_path.parent.mkdir(parents=True, exist_ok=True)
-    if text_path.exists():
-        txt = text_path.read_text(encoding="utf-8")
-        return {"tool": "cached", "pages": None, "chars": len(txt), "error": None}
+def _write_text_atomic(text_path: Path, text: str) -> None:
+    tmp_path = text_path.with_name(f".{text_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, text_path)
 
+
+def _extract_pdf_text(pdf_path: Path) -> tuple[str, dict[str, Any]]:
+    # MemoryError is re-raised so callers can report it separately from parse failures.
     try:
         from pypdf import PdfReader
 
         reader = PdfReader(str(pdf_path))
         chunks = [p.extract_text() or "" for p in reader.pages]
         text = "\n".join(chunks)
-        text_path.write_text(text, encoding="utf-8")
-        return {"tool": "pypdf", "pages": len(reader.pages), "chars": len(text), "error": None}
+        return text, {"tool": "pypdf", "pages": len(reader.pages), "chars": len(text), "error": None}
+    except MemoryError:
+        raise
     except Exception as exc:
         try:
             from pdfminer.high_level import extract_text as pm_extract_text
 
             text = pm_extract_text(str(pdf_path))
-            text_path.write_text(text, encoding="utf-8")
-            return {"tool": "pdfminer", "pages": None, "chars": len(text), "error": f"pypdf_failed:{exc}"}
+            return text, {
+                "tool": "pdfminer",
+                "pages": None,
+                "chars": len(text),
+                "error": f"pypdf_failed:{exc}",
+            }
+        except MemoryError:
+            raise
         except Exception as exc2:
-            text_path.write_text("", encoding="utf-8")
-            return {"tool": "none", "pages": None, "chars": 0, "error": f"extract_failed:{exc2}"}
+            return "", {"tool": "none", "pages": None, "chars": 0, "error": f"extract_failed:{exc2}"}
+
+
+def _oom_meta(detail: str) -> dict[str, Any]:
+    return {"tool": "oom", "pages": None, "chars": 0, "error": f"extract_oom:{detail}"}
+
+
+def extract_text(pdf_path: Path, text_path: Path) -> dict[str, Any]:
+    text_path.parent.mkdir(parents=True, exist_ok=True)
+    if text_path.exists():
+        txt = text_path.read_text(encoding="utf-8")
+        return {"tool": "cached", "pages": None, "chars": len(txt), "error": None}
+
+    try:
+        text, meta = _extract_pdf_text(pdf_path)
+    except MemoryError:
+        # Leave no text file behind so a later run can retry with more headroom.
+        return _oom_meta("memory_error")
+    _write_text_atomic(text_path, text)
+    return meta
+
+
+def _extract_worker_main(
+    conn: Any,
+    max_memory_bytes: int,
+    extract_fn: Callable[[Path, Path], dict[str, Any]],
+) -> None:
+    if max_memory_bytes > 0:
+        try:
+            import resource
+
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory_bytes, max_memory_bytes))
+        except (ImportError, ValueError, OSError):
+            pass
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        pdf_path, text_path = task
+        try:
+            meta = extract_fn(Path(pdf_path), Path(text_path))
+        except MemoryError:
+            meta = _oom_meta("memory_error")
+        except Exception as exc:  # noqa: BLE001
+            meta = {"tool": "none", "pages": None, "chars": 0, "error": f"extract_failed:{exc}"}
+        conn.send(meta)
+
+
+class _ExtractWorker:
+    def __init__(
+        self,
+        ctx: Any,
+        max_memory_bytes: int,
+        extract_fn: Callable[[Path, Path], dict[str, Any]],
+    ):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_extract_worker_main,
+            args=(child_conn, max_memory_bytes, extract_fn),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks_done = 0
+
+    def run(self, pdf_path: Path, text_path: Path, timeout_seconds: float) -> dict[str, Any] | None:
+        """Return the worker's meta, or None when the worker did not answer in time."""
+        self.conn.send((str(pdf_path), str(text_path)))
+        if not self.conn.poll(timeout_seconds):
+            return None
+        self.tasks_done += 1
+        return self.conn.recv()
+
+    def stop(self, kill: bool = False) -> None:
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class PdfExtractor:
+    """Runs `extract_text` in worker processes with a hard per-PDF timeout and memory cap.
+
+    Workers are started lazily, capped at `workers`, and replaced after
+    `max_tasks_per_worker` documents, a timeout, an out-of-memory error or a crash.
+    `extract_fn` must be a picklable module-level function. `extract` is thread-safe.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout_seconds: float = 120.0,
+        max_memory_mb: int = 2048,
+        max_tasks_per_worker: int = 25,
+        extract_fn: Callable[[Path, Path], dict[str, Any]] = extract_text,
+    ):
+        self.extract_fn = extract_fn
+        self.timeout_seconds = timeout_seconds
+        self.max_memory_bytes = max(0, max_memory_mb) * 1024 * 1024
+        self.max_tasks_per_worker = max(1, max_tasks_per_worker)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._idle: list[_ExtractWorker] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_exc: object) -> None:
+        self.close()
+
+    def extract(self, pdf_path: Path, text_path: Path) -> dict[str, Any]:
+        text_path.parent.mkdir(parents=True, exist_ok=True)
+        if text_path.exists():
+            txt = text_path.read_text(encoding="utf-8")
+            return {"tool": "cached", "pages": None, "chars": len(txt), "error": None}
+
+        with self._slots:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("PdfExtractor is closed")
+                worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                worker = _ExtractWorker(self._ctx, self.max_memory_bytes, self.extract_fn)
+            try:
+                meta = worker.run(pdf_path, text_path, self.timeout_seconds)
+            except (EOFError, BrokenPipeError, OSError):
+                meta = self._dead_worker_meta(worker)
+                worker.stop(kill=True)
+                return meta
+            if meta is None:
+                worker.stop(kill=True)
+                return {
+                    "tool": "timeout",
+                    "pages": None,
+                    "chars": 0,
+                    "error": f"extract_timeout:{self.timeout_seconds:g}s",
+                }
+            if meta.get("tool") == "oom" or worker.tasks_done >= self.max_tasks_per_worker:
+                worker.stop()
+            else:
+                with self._lock:
+                    if self._closed:
+                        worker.stop()
+                    else:
+                        self._idle.append(worker)
+            return meta
+
+    @staticmethod
+    def _dead_worker_meta(worker: _ExtractWorker) -> dict[str, Any]:
+        worker.process.join(timeout=5)
+        exitcode = worker.process.exitcode
+        # SIGKILL is what the kernel OOM killer sends.
+        if exitcode == -getattr(signal, "SIGKILL", 9):
+            return _oom_meta("worker_killed")
+        return {
+            "tool": "none",
+            "pages": None,
+            "chars": 0,
+            "error": f"extract_failed:worker_exit_{exitcode}",
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
 
 
 def bounded_text(text: str, head_chars: int, tail_chars: int) -> str:
@@ -1,32 +1,35 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
+from typing import Any
 
-from .arxiv import fetch_month_candidates
+from . import serde
+from .arxiv import fetch_month_candidates, fetch_month_updates
+from .concurrency import AdaptiveRateLimiter, RateLimitedLLM, map_ordered
 from .config import Config
-from .db import DigestDB
+from .db import DigestDB, result_version
+from .llm_cache import with_llm_cache
 from .llm_gemini import GeminiClient, LLMConfig, load_api_key
-from .pdf import download_pdf, extract_text, slice_paper_text
+from .pdf import PdfDownloader, download_pdf, extract_text, slice_paper_text
+from .prefilter import load_triage_history, split_prefiltered, train_prefilter
 from .render import build_digest, write_json, write_jsonl
 from .site import update_home, write_month_site
 from .summarize import summarize_paper
-from .triage import load_schema, triage_paper
+from .summary_pipeline import (
+    SummaryJob,
+    SummaryPipelineConfig,
+    empty_pdf_state,
+    make_pdf_extractor,
+    run_summary_pipeline,
+)
+from .tokens import calibrate, estimator_for
+from .triage import load_schema, triage_pack, triage_paper
 
 
 def _read(path: str) -> str:
     return Path(path).read_text(encoding="utf-8")
 
 
-def _empty_pdf_state() -> dict[str, object | None]:
-    return {
-        "downloaded": False,
-        "pdf_path": None,
-        "text_path": None,
-        "extract_meta": None,
-    }
-
-
 def _triage_view(triage: dict[str, object] | None) -> dict[str, object]:
     triage = triage or {}
     reasons = triage.get("reasons", [])
@@ -45,62 +48,111 @@ def run_month(
     no_pdf: bool = False,
     no_site: bool = False,
     force: bool = False,
+    rerun_stale: bool = False,
 ) -> None:
+    """Run one month end to end.
+
+    `force` recomputes every triage and summary row; `rerun_stale` only recomputes rows
+    whose recorded prompt/schema/model version differs from the current one.
+    """
     month_out = cfg.output_dir / month
     month_out.mkdir(parents=True, exist_ok=True)
     db = DigestDB(cfg.data_dir / "digest.sqlite")
 
     triage_schema = load_schema(Path("schemas/triage.json"))
     summary_schema = load_schema(Path("schemas/summary.json"))
+    # Packed runs still triage some papers one by one (pack fallbacks), so each row records
+    # the prompt that produced it.
+    triage_version = result_version(
+        Path("prompts/triage.md"), Path("schemas/triage.json"), cfg.gemini_model_triage
+    )
+    triage_pack_version = result_version(
+        Path("prompts/triage_pack.md"), Path("schemas/triage.json"), cfg.gemini_model_triage
+    )
+    summary_version = result_version(
+        Path("prompts/summarize.md"), Path("schemas/summary.json"), cfg.gemini_model_summary
+    )
+    summary_estimator = estimator_for(cfg.gemini_model_summary, calibrate(db.get_summary_notes()))
 
     # Stage 1: fetch
-    candidates = fetch_month_candidates(
-        cfg.max_candidates,
-        month,
-        cfg.arxiv_rate_limit_seconds,
-        connect_timeout_seconds=cfg.arxiv_connect_timeout_seconds,
-        read_timeout_seconds=cfg.arxiv_read_timeout_seconds,
-        retries=cfg.arxiv_retries,
-        retry_backoff_seconds=cfg.arxiv_retry_backoff_seconds,
+    raw_path = month_out / "arxiv_raw.json"
+    if cfg.arxiv_incremental:
+        # Without a previous arxiv_raw.json there is nothing to merge into, so fetch in full.
+        resume = raw_path.exists() and not force
+        candidates, watermarks = fetch_month_updates(
+            serde.loads(raw_path.read_bytes()) if resume else [],
+            db.get_arxiv_watermarks(month) if resume else {},
+            cfg.max_candidates,
+            month,
+            cfg.arxiv_rate_limit_seconds,
+            connect_timeout_seconds=cfg.arxiv_connect_timeout_seconds,
+            read_timeout_seconds=cfg.arxiv_read_timeout_seconds,
+            retries=cfg.arxiv_retries,
+            retry_backoff_seconds=cfg.arxiv_retry_backoff_seconds,
+        )
+        db.set_arxiv_watermarks(month, watermarks)
+    else:
+        candidates = fetch_month_candidates(
+            cfg.max_candidates,
+            month,
+            cfg.arxiv_rate_limit_seconds,
+            connect_timeout_seconds=cfg.arxiv_connect_timeout_seconds,
+            read_timeout_seconds=cfg.arxiv_read_timeout_seconds,
+            retries=cfg.arxiv_retries,
+            retry_backoff_seconds=cfg.arxiv_retry_backoff_seconds,
+        )
+    write_json(raw_path, candidates, compact=True)
+    db.upsert_papers_many(month, candidates)
+
+    llm_limiter = AdaptiveRateLimiter(
+        cfg.llm_requests_per_minute,
+        max_per_minute=cfg.llm_max_requests_per_minute or cfg.llm_requests_per_minute,
     )
-    write_json(month_out / "arxiv_raw.json", candidates)
-    for c in candidates:
-        db.upsert_paper(month, c)
 
-    triage_llm = GeminiClient(
-        LLMConfig(
-            api_key=load_api_key(),
+    def triage_client(max_output_tokens: int) -> Any:
+        return with_llm_cache(
+            RateLimitedLLM(
+                GeminiClient(
+                    LLMConfig(
+                        api_key=load_api_key(),
+                        model=cfg.gemini_model_triage,
+                        temperature=cfg.llm_temperature_triage,
+                        max_output_tokens=max_output_tokens,
+                    )
+                ),
+                llm_limiter,
+            ),
+            db,
             model=cfg.gemini_model_triage,
             temperature=cfg.llm_temperature_triage,
-            max_output_tokens=cfg.llm_max_output_tokens_triage,
+            max_mb=cfg.llm_cache_max_mb,
+            refresh=force,
         )
-    )
+
+    # Only the packed request answers for several papers; fallbacks and their repairs get
+    # the single-paper output budget.
+    triage_llm = triage_client(cfg.llm_max_output_tokens_triage)
 
     triage_prompt = _read("prompts/triage.md")
+    triage_pack_prompt = _read("prompts/triage_pack.md") if cfg.triage_pack_size > 1 else ""
     summarize_prompt = _read("prompts/summarize.md")
     repair_prompt = _read("prompts/repair_json.md")
 
-    # Stage 2: triage
-    triage_rows: list[dict] = []
-    for paper in candidates:
+    # Stage 2: triage (cache lookups and writes stay on this thread; LLM calls fan out)
+    def triage_one(paper: dict) -> dict:
         try:
-            cached = None if force else db.get_triage(paper["arxiv_id_base"])
-            result_raw = cached or triage_paper(
-                paper, triage_llm, triage_prompt, repair_prompt, triage_schema
-            )
+            result_raw = triage_paper(paper, triage_llm, triage_prompt, repair_prompt, triage_schema)
             reasons_raw = result_raw.get("reasons", [])
             if not isinstance(reasons_raw, list):
                 reasons_raw = [str(reasons_raw)]
-            result = {
+            return {
                 "arxiv_id_base": paper["arxiv_id_base"],
                 "decision": result_raw.get("decision", "reject"),
                 "confidence": float(result_raw.get("confidence", 0.0)),
                 "reasons": reasons_raw,
             }
-            triage_rows.append(result)
-            db.upsert_triage(month, result)
         except Exception as exc:
-            fallback = {
+            return {
                 "arxiv_id_base": paper["arxiv_id_base"],
                 "decision": "reject",
                 "confidence": 0.0,
@@ -109,19 +161,76 @@ def run_month(
                     "automatic_reject_fallback",
                 ],
             }
-            triage_rows.append(fallback)
-            db.upsert_triage(month, fallback)
+
+    triage_by_id: dict[str, dict] = {}
+    pending: list[dict] = []
+    candidate_ids = [p["arxiv_id_base"] for p in candidates]
+    cached_triage = {} if force else db.get_triage_for_month(month, candidate_ids)
+    if rerun_stale:
+        for aid in db.get_stale_triage_ids(cached_triage, triage_version, triage_pack_version):
+            del cached_triage[aid]
+    for paper in candidates:
+        aid = paper["arxiv_id_base"]
+        cached = cached_triage.get(aid)
+        if cached:
+            triage_by_id[aid] = {"arxiv_id_base": aid, **_triage_view(cached)}
+        else:
+            pending.append(paper)
+    if cfg.prefilter_margin > 0:
+        prefilter = train_prefilter(
+            *load_triage_history(cfg.output_dir, before=month), margin=cfg.prefilter_margin
+        )
+        rejected, pending = split_prefiltered(prefilter, pending)
+        for row in rejected:
+            triage_by_id[row["arxiv_id_base"]] = row
+    db.upsert_triage_many(month, triage_by_id.values())
+    k = cfg.triage_pack_size
+    if k > 1:
+        pack_llm = triage_client(cfg.llm_max_output_tokens_triage * k)
+        packs = [pending[i : i + k] for i in range(0, len(pending), k)]
+        results = (
+            (row, triage_pack_version if packed else triage_version)
+            for rows in map_ordered(
+                lambda pack: triage_pack(
+                    pack, pack_llm, triage_pack_prompt, repair_prompt, triage_schema, triage_one
+                ),
+                packs,
+                workers=cfg.triage_workers,
+            )
+            for row, packed in rows
+        )
+    else:
+        results = (
+            (row, triage_version)
+            for row in map_ordered(triage_one, pending, workers=cfg.triage_workers)
+        )
+    for paper, (result, version) in zip(pending, results):
+        triage_by_id[paper["arxiv_id_base"]] = result
+        db.upsert_triage(month, result, version)
+    triage_rows: list[dict] = [
+        triage_by_id[p["arxiv_id_base"]] for p in candidates if p["arxiv_id_base"] in triage_by_id
+    ]
 
     write_jsonl(month_out / "triage.jsonl", sorted(triage_rows, key=lambda x: x["arxiv_id_base"]))
 
     # Stage 3: summarize
-    summary_llm = GeminiClient(
-        LLMConfig(
-            api_key=load_api_key(),
-            model=cfg.gemini_model_summary,
-            temperature=cfg.llm_temperature_summary,
-            max_output_tokens=cfg.llm_max_output_tokens_summary,
-        )
+    summary_llm = with_llm_cache(
+        RateLimitedLLM(
+            GeminiClient(
+                LLMConfig(
+                    api_key=load_api_key(),
+                    model=cfg.gemini_model_summary,
+                    temperature=cfg.llm_temperature_summary,
+                    max_output_tokens=cfg.llm_max_output_tokens_summary,
+                )
+            ),
+            llm_limiter,
+        ),
+        db,
+        model=cfg.gemini_model_summary,
+        temperature=cfg.llm_temperature_summary,
+        max_mb=cfg.llm_cache_max_mb,
+        refresh=force,
     )
     triage_map = {t["arxiv_id_base"]: t for t in triage_rows}
     accepted = [p for p in candidates if triage_map.get(p["arxiv_id_base"], {}).get("decision") == "accept"]
@@ -135,81 +244,76 @@ def run_month(
     summaries: list[dict] = []
     summary_map: dict[str, dict] = {}
     pdf_map: dict[str, dict[str, object | None]] = {}
+    jobs: list[SummaryJob] = []
+    accepted_ids = [p["arxiv_id_base"] for p in accepted]
+    cached_summaries = {} if force else db.get_summaries_for_ids(accepted_ids)
+    stale_summaries = db.get_stale_summary_ids(cached_summaries, summary_version) if rerun_stale else set()
     for paper in accepted:
         arxiv_id_base = paper["arxiv_id_base"]
-        pdf_state: dict[str, object | None] = _empty_pdf_state()
+        cached_summary = cached_summaries.get(arxiv_id_base)
+        if cached_summary and arxiv_id_base not in stale_summaries:
+            summaries.append(cached_summary)
+            summary_map[arxiv_id_base] = cached_summary
+            pdf_map[arxiv_id_base] = empty_pdf_state()
+            continue
+        job = SummaryJob(paper=paper, month_out=month_out)
+        if no_pdf:
+            job.skip("summary_skipped:no_pdf_mode", "no_pdf_mode")
+        jobs.append(job)
+
+    def summarize_job(job: SummaryJob) -> dict | None:
         try:
-            cached_summary = None if force else db.get_summary(arxiv_id_base)
-            if cached_summary:
-                summaries.append(cached_summary)
-                summary_map[arxiv_id_base] = cached_summary
-                pdf_map[arxiv_id_base] = pdf_state
-                continue
-            raw_text = ""
-            notes = "summary_not_attempted"
-            if no_pdf:
-                notes = "summary_skipped:no_pdf_mode"
-                pdf_state = {
-                    "downloaded": False,
-                    "pdf_path": None,
-                    "text_path": None,
-                    "extract_meta": {"error": "no_pdf_mode"},
-                }
-            elif not paper.get("links", {}).get("pdf"):
-                notes = "summary_skipped:missing_pdf_link"
-                pdf_state = {
-                    "downloaded": False,
-                    "pdf_path": None,
-                    "text_path": None,
-                    "extract_meta": {"error": "missing_pdf_link"},
-                }
-            else:
-                pdf_path = month_out / "pdfs" / f"{arxiv_id_base}.pdf"
-                txt_path = month_out / "text" / f"{arxiv_id_base}.txt"
-                try:
-                    download_pdf(paper["links"]["pdf"], pdf_path, cfg.pdf_rate_limit_seconds)
-                    meta = extract_text(pdf_path, txt_path)
-                    raw_text = txt_path.read_text(encoding="utf-8") if txt_path.exists() else ""
-                    pdf_state = {
-                        "downloaded": True,
-                        "pdf_path": str(pdf_path),
-                        "text_path": str(txt_path),
-                        "extract_meta": meta,
-                    }
-                    notes = json.dumps(meta, sort_keys=True)
-                except Exception as exc:
-                    notes = f"summary_skipped:pdf_failed:{type(exc).__name__}"
-                    pdf_state = {
-                        "downloaded": False,
-                        "pdf_path": str(pdf_path),
-                        "text_path": str(txt_path),
-                        "extract_meta": {"error": f"download_or_extract_failed:{type(exc).__name__}"},
-                    }
-
-            if raw_text.strip():
-                summary = summarize_paper(
-                    paper=paper,
-                    triage=triage_map[arxiv_id_base],
-                    raw_fulltext=raw_text,
-                    fulltext_slices=slice_paper_text(
-                        raw_text,
-                        excerpt_chars=18_000,
-                        tail_chars=cfg.text_tail_chars,
-                    ),
-                    used_fulltext=True,
-                    notes=notes,
-                    llm=summary_llm,
-                    prompt_template=summarize_prompt,
-                    repair_template=repair_prompt,
-                    schema=summary_schema,
-                    max_input_tokens=cfg.summary_max_input_tokens,
-                )
-                summaries.append(summary)
-                summary_map[arxiv_id_base] = summary
-                db.upsert_summary(month, summary)
+            return summarize_paper(
+                paper=job.paper,
+                triage=triage_map[job.arxiv_id_base],
+                raw_fulltext=job.raw_text,
+                fulltext_slices=slice_paper_text(
+                    job.raw_text,
+                    excerpt_chars=18_000,
+                    tail_chars=cfg.text_tail_chars,
+                ),
+                used_fulltext=True,
+                notes=job.notes,
+                llm=summary_llm,
+                prompt_template=summarize_prompt,
+                repair_template=repair_prompt,
+                schema=summary_schema,
+                max_input_tokens=cfg.summary_max_input_tokens,
+                token_estimator=summary_estimator,
+            )
         except Exception:
-            pass
-        pdf_map[arxiv_id_base] = pdf_state
+            return None
+
+    # Downloads, extraction and LLM calls for different papers overlap; SQLite writes
+    # happen here as each job completes.
+    extractor = make_pdf_extractor(cfg)
+    downloader = PdfDownloader()
+    try:
+        for job in run_summary_pipeline(
+            jobs,
+            download=lambda url, path: download_pdf(url, path, 0.0, downloader=downloader),
+            extract=extractor.extract if extractor is not None else extract_text,
+            summarize=summarize_job,
+            config=SummaryPipelineConfig(
+                download_workers=cfg.pdf_download_workers,
+                extract_workers=cfg.pdf_extract_workers,
+                summary_workers=cfg.summary_workers,
+                queue_size=cfg.pipeline_queue_size,
+                pdf_rate_limit_seconds=cfg.pdf_rate_limit_seconds,
+            ),
+        ):
+            if job.summary:
+                db.upsert_summary(month, job.summary, summary_version)
+            # A stale summary that fails to regenerate is kept rather than dropped.
+            summary = job.summary or cached_summaries.get(job.arxiv_id_base)
+            if summary:
+                summaries.append(summary)
+                summary_map[job.arxiv_id_base] = summary
+            pdf_map[job.arxiv_id_base] = job.pdf_state
+    finally:
+        downloader.close()
+        if extractor is not None:
+            extractor.close()
 
     summaries = sorted(summaries, key=lambda x: (x["published_date"], x["arxiv_id_base"]))
     write_jsonl(month_out / "papers.jsonl", summaries)
@@ -231,7 +335,7 @@ def run_month(
                 "links": paper["links"],
                 "triage": _triage_view(triage_map.get(arxiv_id_base)),
                 "paper_summary": summary_map.get(arxiv_id_base),
-                "pdf": pdf_map.get(arxiv_id_base, _empty_pdf_state()),
+                "pdf": pdf_map.get(arxiv_id_base, empty_pdf_state()),
             }
         )
     write_jsonl(month_out / "backend_rows.jsonl", backend_rows)
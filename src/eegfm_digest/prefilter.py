@@ -0,0 +1,165 @@
+"""Deterministic TF-IDF pre-filter that auto-rejects obviously off-topic candidates."""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+from itertools import pairwise
+from pathlib import Path
+from typing import Any
+
+from . import serde
+from .render import iter_jsonl
+
+MIN_ACCEPTED = 5
+PREFILTER_REASON = "prefilter_reject"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def _tokens(text: str) -> list[str]:
+    """Unigrams and bigrams with a crude plural fold, so "foundation models" matches "model"."""
+    words = [
+        w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+        for w in _TOKEN_RE.findall(text.lower())
+    ]
+    return words + [f"{a} {b}" for a, b in pairwise(words)]
+
+
+def _paper_text(paper: dict[str, Any]) -> str:
+    return f"{paper.get('title', '')}\n{paper.get('summary', '')}"
+
+
+def _unit(vec: dict[str, float]) -> dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    return {k: v / norm for k, v in vec.items()} if norm else {}
+
+
+def _dot(a: dict[str, float], b: dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+@dataclass(frozen=True)
+class Prefilter:
+    """Cosine similarity to the centroid of accepted papers, over title+abstract TF-IDF.
+
+    `threshold` is `margin` times the lowest leave-one-out score of any accepted training
+    paper, so only candidates scoring far below every known accept are rejected.
+    """
+
+    idf: dict[str, float]
+    unseen_idf: float
+    centroid: dict[str, float]
+    threshold: float
+
+    def vector(self, paper: dict[str, Any]) -> dict[str, float]:
+        # Unseen terms keep the maximum weight: an abstract made of new vocabulary must not
+        # collapse onto the few boilerplate words it shares with the accepts.
+        counts = Counter(_tokens(_paper_text(paper)))
+        return _unit(
+            {t: (1.0 + math.log(n)) * self.idf.get(t, self.unseen_idf) for t, n in counts.items()}
+        )
+
+    def score(self, paper: dict[str, Any]) -> float:
+        return _dot(self.vector(paper), self.centroid)
+
+    def rejects(self, paper: dict[str, Any]) -> bool:
+        return self.score(paper) < self.threshold
+
+
+def train_prefilter(
+    papers: Iterable[dict[str, Any]],
+    decisions: dict[str, str],
+    margin: float,
+) -> Prefilter | None:
+    """Fit on papers with a known triage decision; None when disabled or there are too few accepts."""
+    labelled = list({p["arxiv_id_base"]: p for p in papers if p["arxiv_id_base"] in decisions}.values())
+    accepted_ids = {p["arxiv_id_base"] for p in labelled if decisions[p["arxiv_id_base"]] == "accept"}
+    if margin <= 0 or len(accepted_ids) < MIN_ACCEPTED:
+        return None
+
+    doc_freq: Counter[str] = Counter()
+    for paper in labelled:
+        doc_freq.update(set(_tokens(_paper_text(paper))))
+    n_docs = len(labelled)
+    idf = {t: math.log((1 + n_docs) / (1 + df)) + 1.0 for t, df in doc_freq.items()}
+    unseen_idf = math.log(1 + n_docs) + 1.0
+
+    base = Prefilter(idf=idf, unseen_idf=unseen_idf, centroid={}, threshold=0.0)
+    accepted = [base.vector(p) for p in labelled if p["arxiv_id_base"] in accepted_ids]
+    total: Counter[str] = Counter()
+    for vec in accepted:
+        total.update(vec)
+    # Leave-one-out: score each accept against the sum of the others,
+    # cos(v, T - v) = (v.T - v.v) / |T - v| with |T - v|^2 = |T|^2 - 2 v.T + v.v.
+    total_sq = _dot(total, total)
+    loo_scores = []
+    for vec in accepted:
+        dot, self_sq = _dot(vec, total), _dot(vec, vec)
+        rest_sq = total_sq - 2 * dot + self_sq
+        loo_scores.append((dot - self_sq) / math.sqrt(rest_sq) if rest_sq > 1e-12 else 0.0)
+    return Prefilter(
+        idf=idf,
+        unseen_idf=unseen_idf,
+        centroid=_unit(dict(total)),
+        threshold=margin * min(loo_scores),
+    )
+
+
+def load_triage_history(
+    output_dir: Path, before: str | None = None
+) -> tuple[list[dict[str, Any]], dict[str, str]]:
+    """Candidates and LLM triage decisions accumulated in `outputs/*/{arxiv_raw.json,triage.jsonl}`.
+
+    Only months earlier than `before` are read when it is given. Rows the pre-filter itself
+    or an exception fallback produced are skipped, so the model only learns from real LLM
+    decisions.
+    """
+    papers: list[dict[str, Any]] = []
+    decisions: dict[str, str] = {}
+    if not output_dir.exists():
+        return papers, decisions
+    month_dirs = sorted(p for p in output_dir.iterdir() if p.is_dir())
+    for month_dir in month_dirs:
+        if before is not None and month_dir.name >= before:
+            continue
+        raw_path, triage_path = month_dir / "arxiv_raw.json", month_dir / "triage.jsonl"
+        if not raw_path.exists() or not triage_path.exists():
+            continue
+        for row in iter_jsonl(triage_path, fields=("arxiv_id_base", "decision", "reasons")):
+            reasons = row.get("reasons") or []
+            if PREFILTER_REASON in reasons or "automatic_reject_fallback" in reasons:
+                continue
+            decisions[row["arxiv_id_base"]] = row.get("decision", "reject")
+        papers.extend(serde.loads(raw_path.read_bytes()))
+    return papers, decisions
+
+
+def prefilter_row(arxiv_id_base: str) -> dict[str, Any]:
+    return {
+        "arxiv_id_base": arxiv_id_base,
+        "decision": "reject",
+        "confidence": 0.0,
+        "reasons": [PREFILTER_REASON],
+    }
+
+
+def split_prefiltered(
+    prefilter: Prefilter | None, papers: list[dict[str, Any]]
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """(`prefilter_reject` rows, papers that still need LLM triage)."""
+    if prefilter is None:
+        return [], papers
+    rejected: list[dict[str, Any]] = []
+    keep: list[dict[str, Any]] = []
+    for paper in papers:
+        if prefilter.rejects(paper):
+            rejected.append(prefilter_row(paper["arxiv_id_base"]))
+        else:
+            keep.append(paper)
+    return rejected, keep
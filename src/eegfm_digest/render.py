@@ -1,9 +1,20 @@
 from __future__ import annotations
 
 import json
+import os
+import stat
+import tempfile
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, TextIO
+
+from . import serde
+
+# Read once at import: os.umask can only be queried by setting it, which is not thread-safe.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 
 def pick_top_picks(summaries: list[dict[str, Any]], triage_map: dict[str, dict[str, Any]]) -> list[str]:
@@ -37,12 +48,86 @@ def build_digest(month: str, candidates: list[dict[str, Any]], triage_rows: list
     }
 
 
-def write_json(path: Path, payload: Any) -> None:
+@contextmanager
+def atomic_writer(path: Path) -> Iterator[TextIO]:
+    """Open a temp file next to `path`; on success fsync it and rename it over `path`.
+
+    Readers (and a resumed run) see either the previous file or the complete new one.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    tmp = Path(tmp_name)
+    try:
+        # mkstemp creates 0600; keep the target's mode, or what open() would have given it.
+        try:
+            mode = stat.S_IMODE(path.stat().st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
 
 
-def write_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    lines = [json.dumps(r, ensure_ascii=False, sort_keys=True) for r in rows]
-    path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+def _fsync_dir(directory: Path) -> None:
+    """Make a completed rename durable; not every platform can open a directory."""
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def write_json(path: Path, payload: Any, compact: bool = False) -> None:
+    """Pretty-printed by default; `compact` skips indentation for machine-read artifacts."""
+    with atomic_writer(path) as f:
+        if compact and isinstance(payload, list):
+            # One element at a time keeps memory flat for large arrays.
+            f.write("[")
+            for i, item in enumerate(payload):
+                if i:
+                    f.write(",")
+                f.write(serde.dumps(item))
+            f.write("]")
+        else:
+            f.write(serde.dumps(payload, pretty=not compact))
+        f.write("\n")
+
+
+def write_jsonl(path: Path, rows: Iterable[dict[str, Any]]) -> None:
+    # Rows keep the stdlib's ", "/": " separators, which orjson cannot emit; its C encoder
+    # is already fast for single-line output.
+    with atomic_writer(path) as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, sort_keys=True))
+            f.write("\n")
+
+
+def iter_jsonl(
+    path: Path, fields: Iterable[str] | None = None, contains: str | None = None
+) -> Iterator[dict[str, Any]]:
+    """Decode `path` one line at a time; a missing file yields nothing.
+
+    `fields` keeps only those keys of each row. Lines without the `contains` substring are
+    skipped before decoding, so a scan for a rare marker parses only the lines that carry it.
+    """
+    if not path.exists():
+        return
+    keep = None if fields is None else tuple(fields)
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or (contains is not None and contains not in line):
+                continue
+            row = serde.loads(line)
+            yield row if keep is None else {k: row[k] for k in keep if k in row}
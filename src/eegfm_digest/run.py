@@ -25,6 +25,11 @@ def main() -> None:
     parser.add_argument("--no-pdf", action="store_true")
     parser.add_argument("--no-site", action="store_true")
     parser.add_argument("--force", action="store_true")
+    parser.add_argument(
+        "--rerun-stale",
+        action="store_true",
+        help="Recompute only triage/summary rows produced by a different prompt, schema or model",
+    )
     args = parser.parse_args()
 
     cfg = load_config()
@@ -35,7 +40,14 @@ def main() -> None:
     if args.include_borderline:
         cfg = replace(cfg, include_borderline=True)
 
-    run_month(cfg, args.month, no_pdf=args.no_pdf, no_site=args.no_site, force=args.force)
+    run_month(
+        cfg,
+        args.month,
+        no_pdf=args.no_pdf,
+        no_site=args.no_site,
+        force=args.force,
+        rerun_stale=args.rerun_stale,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""JSON encode/decode with an optional orjson fast path.
+
+Output is byte-identical to `json.dumps(obj, ensure_ascii=False, sort_keys=..., ...)` with
+either `indent=2` or compact separators, whichever backend is active, so artifact hashes
+such as `month_rev` do not depend on what is installed. Anything orjson would format
+differently is encoded by the standard library instead.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None  # type: ignore[assignment]
+
+BACKENDS = ("orjson", "json") if orjson is not None else ("json",)
+
+_backend = BACKENDS[0]
+_COMPACT = (",", ":")
+# Floats in this range are printed identically by `repr` and orjson; outside it the
+# exponent formats differ ("1e+16" vs "1e16"), and orjson writes NaN/inf as null.
+_FLOAT_MIN, _FLOAT_MAX = 1e-4, 1e16
+
+
+def backend() -> str:
+    return _backend
+
+
+def use_backend(name: str) -> None:
+    """Select `"orjson"` or `"json"`; benchmarks and tests compare them directly."""
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not available; choose from {BACKENDS}")
+    _backend = name
+
+
+def _orjson_floats_ok(obj: Any) -> bool:
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind is dict:
+            stack.extend(item.values())
+        elif kind is list or kind is tuple:
+            stack.extend(item)
+        elif kind is float and item != 0.0 and not _FLOAT_MIN <= abs(item) < _FLOAT_MAX:
+            return False
+    return True
+
+
+def _orjson_dumps(obj: Any, option: int) -> str | None:
+    if not _orjson_floats_ok(obj):
+        return None
+    # Passthrough makes orjson reject what the stdlib would encode differently (str/int
+    # subclasses such as enums, dataclasses, datetimes), as it does non-str keys and
+    # integers beyond 64 bits.
+    option |= (
+        orjson.OPT_PASSTHROUGH_SUBCLASS
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+    )
+    try:
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    except orjson.JSONEncodeError:
+        return None
+
+
+def dumps(obj: Any, pretty: bool = False, sort_keys: bool = True) -> str:
+    """`indent=2` when `pretty`, else compact `(",", ":")` separators; never ASCII-escaped."""
+    if _backend == "orjson":
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        text = _orjson_dumps(obj, option)
+        if text is not None:
+            return text
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=sort_keys)
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, separators=_COMPACT)
+
+
+def loads(data: str | bytes) -> Any:
+    if _backend == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity literals and integers beyond 64 bits are valid for the stdlib.
+            pass
+    return json.loads(data)
@@ -7,6 +7,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
+from . import serde
+from .render import write_json
+
 _SHORT_BLURB = (
     "This digest serves as a monthly update on the current EEG foundation model literature on arXiv. "
     "We filter with arXiv title and abstract keywords, and a triage LLM to decide on papers that qualify. "
@@ -520,31 +523,26 @@ def write_month_site(
         render_month_page(month, summaries, metadata, digest), encoding="utf-8"
     )
     payload = _month_payload(month, summaries, metadata, digest, backend_rows)
-    (month_dir / "papers.json").write_text(
-        json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
-        encoding="utf-8",
-    )
-    (month_dir / "digest.json").write_text(
-        json.dumps(digest, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
-        encoding="utf-8",
-    )
+    write_json(month_dir / "papers.json", payload)
+    write_json(month_dir / "digest.json", digest)
 
 
 def _month_manifest_item(month_dir: Path) -> dict[str, Any]:
     month = month_dir.name
     payload_path = month_dir / "papers.json"
     month_rev = "missing"
-    if payload_path.exists():
-        try:
-            month_rev = hashlib.sha256(payload_path.read_bytes()).hexdigest()[:16]
-        except Exception:
-            month_rev = "missing"
     payload: Any = {}
     if payload_path.exists():
         try:
-            payload = json.loads(payload_path.read_text(encoding="utf-8"))
+            raw = payload_path.read_bytes()
         except Exception:
-            payload = {}
+            raw = None
+        if raw is not None:
+            month_rev = hashlib.sha256(raw).hexdigest()[:16]
+            try:
+                payload = serde.loads(raw)
+            except ValueError:
+                payload = {}
 
     papers: list[dict[str, Any]] = []
     candidates = 0
@@ -658,8 +656,5 @@ def update_home(docs_dir: Path) -> None:
     }
     data_dir = docs_dir / "data"
     data_dir.mkdir(parents=True, exist_ok=True)
-    (data_dir / "months.json").write_text(
-        json.dumps(manifest, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
-        encoding="utf-8",
-    )
+    write_json(data_dir / "months.json", manifest)
     (docs_dir / ".nojekyll").write_text("\n", encoding="utf-8")
@@ -3,7 +3,9 @@ from __future__ import annotations
 import json
 from typing import Any
 
+from .llm_cache import cache_on_success
 from .llm_gemini import GeminiClient, parse_json_text
+from .tokens import TokenEstimator
 from .triage import validate_json
 
 TAG_TAXONOMY: dict[str, list[str]] = {
@@ -74,6 +76,7 @@ def _select_payload(
     prompt_template: str,
     llm: GeminiClient,
     max_input_tokens: int,
+    token_estimator: TokenEstimator | None = None,
 ) -> tuple[dict[str, Any], str]:
     base = _base_payload(paper, triage)
     if not raw_fulltext.strip():
@@ -81,10 +84,30 @@ def _select_payload(
 
     payload_fulltext = {**base, "fulltext": raw_fulltext}
     prompt_fulltext = _render_prompt(prompt_template, payload_fulltext)
+    estimate = token_estimator.estimate(prompt_fulltext) if token_estimator is not None else None
+    # Clearly under/over the limit: decide locally and skip the count_tokens round-trip.
+    if estimate is not None and not token_estimator.near_limit(estimate, max_input_tokens):
+        if estimate <= max_input_tokens:
+            return payload_fulltext, f"input_mode=fulltext;prompt_tokens_est={estimate}"
+        return {
+            **base,
+            "fulltext_slices": fulltext_slices,
+        }, f"input_mode=fulltext_slices;reason=fulltext_over_limit;prompt_tokens_est={estimate};max_tokens={max_input_tokens}"
+
     token_count = _count_tokens_or_none(llm, prompt_fulltext)
 
     if token_count is not None and token_count <= max_input_tokens:
-        return payload_fulltext, f"input_mode=fulltext;prompt_tokens={token_count}"
+        return payload_fulltext, f"input_mode=fulltext;prompt_tokens={token_count};prompt_chars={len(prompt_fulltext)}"
+
+    if token_count is None and estimate is not None:
+        # No exact count (e.g. a provider without a count endpoint): go with the calibrated
+        # estimate, logged as such so it never feeds back into calibration.
+        if estimate <= max_input_tokens:
+            return payload_fulltext, f"input_mode=fulltext;prompt_tokens_est={estimate}"
+        return {
+            **base,
+            "fulltext_slices": fulltext_slices,
+        }, f"input_mode=fulltext_slices;reason=fulltext_over_limit;prompt_tokens_est={estimate};max_tokens={max_input_tokens}"
 
     if token_count is None:
         return {**base, "fulltext_slices": fulltext_slices}, "input_mode=fulltext_slices;reason=count_tokens_failed"
@@ -92,7 +115,10 @@ def _select_payload(
     return {
         **base,
         "fulltext_slices": fulltext_slices,
-    }, f"input_mode=fulltext_slices;reason=fulltext_over_limit;prompt_tokens={token_count};max_tokens={max_input_tokens}"
+    }, (
+        f"input_mode=fulltext_slices;reason=fulltext_over_limit;prompt_tokens={token_count};"
+        f"prompt_chars={len(prompt_fulltext)};max_tokens={max_input_tokens}"
+    )
 
 
 def _to_numeric_or_none(value: Any) -> float | None:
@@ -217,6 +243,7 @@ def summarize_paper(
     repair_template: str,
     schema: dict[str, Any],
     max_input_tokens: int,
+    token_estimator: TokenEstimator | None = None,
 ) -> dict[str, Any]:
     payload, mode_notes = _select_payload(
         paper=paper,
@@ -226,25 +253,28 @@ def summarize_paper(
         prompt_template=prompt_template,
         llm=llm,
         max_input_tokens=max_input_tokens,
+        token_estimator=token_estimator,
     )
     merged_notes = f"{notes};{mode_notes}" if notes else mode_notes
     prompt = _render_prompt(prompt_template, payload)
-    raw = llm.generate(prompt, schema=schema)
-    try:
-        data = parse_json_text(raw)
-        data = _normalize_summary_output(
-            data=data,
-            paper=paper,
-            used_fulltext=used_fulltext,
-            notes=merged_notes,
-        )
-        validate_json(data, schema)
-        return data
-    except Exception:
-        repair_prompt = (
-            repair_template.replace("{{SCHEMA_JSON}}", json.dumps(schema, ensure_ascii=False))
-            .replace("{{BAD_OUTPUT}}", raw)
-        )
+    with cache_on_success(llm) as keep:
+        raw = llm.generate(prompt, schema=schema)
+        try:
+            data = parse_json_text(raw)
+            data = _normalize_summary_output(
+                data=data,
+                paper=paper,
+                used_fulltext=used_fulltext,
+                notes=merged_notes,
+            )
+            validate_json(data, schema)
+            keep()
+            return data
+        except Exception:  # noqa: BLE001
+            repair_prompt = (
+                repair_template.replace("{{SCHEMA_JSON}}", json.dumps(schema, ensure_ascii=False))
+                .replace("{{BAD_OUTPUT}}", raw)
+            )
         try:
             repaired = llm.generate(repair_prompt, schema=schema)
             data = parse_json_text(repaired)
@@ -255,6 +285,7 @@ def summarize_paper(
                 notes=merged_notes,
             )
             validate_json(data, schema)
+            keep()
             return data
         except Exception:
             # deterministic fallback with schema-compatible defaults
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .concurrency import RateLimiter, Stage, run_pipeline
+from .config import Config
+from .pdf import PdfExtractor
+
+
+def empty_pdf_state() -> dict[str, Any]:
+    return {
+        "downloaded": False,
+        "pdf_path": None,
+        "text_path": None,
+        "extract_meta": None,
+    }
+
+
+@dataclass
+class SummaryJob:
+    paper: dict[str, Any]
+    month_out: Path
+    pdf_state: dict[str, Any] = field(default_factory=empty_pdf_state)
+    raw_text: str = ""
+    notes: str = "summary_not_attempted"
+    summary: dict[str, Any] | None = None
+    done: bool = False
+
+    @property
+    def arxiv_id_base(self) -> str:
+        return self.paper["arxiv_id_base"]
+
+    @property
+    def pdf_path(self) -> Path:
+        return self.month_out / "pdfs" / f"{self.arxiv_id_base}.pdf"
+
+    @property
+    def txt_path(self) -> Path:
+        return self.month_out / "text" / f"{self.arxiv_id_base}.txt"
+
+    def skip(self, notes: str, error: str) -> None:
+        self.notes = notes
+        self.pdf_state = {
+            "downloaded": False,
+            "pdf_path": None,
+            "text_path": None,
+            "extract_meta": {"error": error},
+        }
+        self.done = True
+
+    def fail_pdf(self, exc: Exception) -> None:
+        self.notes = f"summary_skipped:pdf_failed:{type(exc).__name__}"
+        self.pdf_state = {
+            "downloaded": False,
+            "pdf_path": str(self.pdf_path),
+            "text_path": str(self.txt_path),
+            "extract_meta": {"error": f"download_or_extract_failed:{type(exc).__name__}"},
+        }
+        self.done = True
+
+
+@dataclass(frozen=True)
+class SummaryPipelineConfig:
+    download_workers: int = 2
+    extract_workers: int = 2
+    summary_workers: int = 1
+    queue_size: int = 4
+    pdf_rate_limit_seconds: float = 0.0
+
+
+def make_pdf_extractor(cfg: Config) -> PdfExtractor | None:
+    """Process-pool extractor for `PDF_EXTRACT_MODE=process`; None means extract inline."""
+    if cfg.pdf_extract_mode != "process":
+        return None
+    return PdfExtractor(
+        workers=cfg.pdf_extract_workers,
+        timeout_seconds=cfg.pdf_extract_timeout_seconds,
+        max_memory_mb=cfg.pdf_extract_max_memory_mb,
+        max_tasks_per_worker=cfg.pdf_extract_max_tasks_per_worker,
+    )
+
+
+def run_summary_pipeline(
+    jobs: Iterable[SummaryJob],
+    download: Callable[[str, Path], Any],
+    extract: Callable[[Path, Path], dict[str, Any]],
+    summarize: Callable[[SummaryJob], dict[str, Any] | None],
+    config: SummaryPipelineConfig,
+) -> Iterator[SummaryJob]:
+    """Download -> extract -> summarize with bounded queues between stages.
+
+    Jobs come back in completion order. Download/extract failures are recorded on the
+    job; exceptions from `summarize` stop the pipeline and propagate to the caller.
+    """
+    pdf_limiter = RateLimiter(
+        1.0 / config.pdf_rate_limit_seconds if config.pdf_rate_limit_seconds > 0 else 0.0
+    )
+
+    def download_stage(job: SummaryJob) -> SummaryJob:
+        if job.done:
+            return job
+        pdf_url = job.paper.get("links", {}).get("pdf")
+        if not pdf_url:
+            job.skip("summary_skipped:missing_pdf_link", "missing_pdf_link")
+            return job
+        try:
+            if not job.pdf_path.exists():
+                pdf_limiter.acquire()
+            download(pdf_url, job.pdf_path)
+        except Exception as exc:  # noqa: BLE001
+            job.fail_pdf(exc)
+        return job
+
+    def extract_stage(job: SummaryJob) -> SummaryJob:
+        if job.done:
+            return job
+        try:
+            meta = extract(job.pdf_path, job.txt_path)
+            job.raw_text = job.txt_path.read_text(encoding="utf-8") if job.txt_path.exists() else ""
+            job.pdf_state = {
+                "downloaded": True,
+                "pdf_path": str(job.pdf_path),
+                "text_path": str(job.txt_path),
+                "extract_meta": meta,
+            }
+            job.notes = json.dumps(meta, sort_keys=True)
+        except Exception as exc:  # noqa: BLE001
+            job.fail_pdf(exc)
+        return job
+
+    def summarize_stage(job: SummaryJob) -> SummaryJob:
+        if not job.done and job.raw_text.strip():
+            job.summary = summarize(job)
+        job.done = True
+        return job
+
+    return run_pipeline(
+        jobs,
+        [
+            Stage("download", download_stage, config.download_workers),
+            Stage("extract", extract_stage, config.extract_workers),
+            Stage("summarize", summarize_stage, config.summary_workers),
+        ],
+        queue_size=config.queue_size,
+    )
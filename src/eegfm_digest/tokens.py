@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import math
+import re
+import statistics
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+# Median counted prompt tokens per *extracted-text* char over 92 published Gemini summaries
+# (`prompt_tokens=` vs. `"chars"`), logged before `prompt_chars=` existed. The rendered prompt
+# adds the template (~2.8k chars), metadata and JSON escaping, so per rendered char the ratio
+# is lower (<= ~0.26): this default overestimates slightly, towards slices and exact counts,
+# until per-model calibration on `prompt_chars=` takes over.
+DEFAULT_TOKENS_PER_CHAR = 0.273
+MIN_CALIBRATION_SAMPLES = 5
+
+_PROMPT_CHARS_RE = re.compile(r"(?:^|;)prompt_chars=(\d+)")
+_PROMPT_TOKENS_RE = re.compile(r"(?:^|;)prompt_tokens=(\d+)")
+
+
+@dataclass(frozen=True)
+class TokenEstimator:
+    """Local prompt-size estimate; only estimates within `margin` of a limit need an exact count."""
+
+    tokens_per_char: float = DEFAULT_TOKENS_PER_CHAR
+    margin: float = 0.15
+
+    def estimate(self, text: str) -> int:
+        return max(1, math.ceil(len(text) * self.tokens_per_char))
+
+    def near_limit(self, estimate: int, limit: int) -> bool:
+        return abs(estimate - limit) <= self.margin * limit
+
+
+def calibration_sample(notes: str) -> tuple[int, int] | None:
+    """(rendered prompt chars, counted prompt tokens) from a summary's `notes`, if both were logged.
+
+    Only exact counts (`prompt_tokens=`) are used; local estimates are logged as
+    `prompt_tokens_est=` and never feed back into calibration. The extracted-text `"chars"`
+    is not a substitute for `prompt_chars=`: it leaves out the template and metadata the
+    count includes, so older notes without `prompt_chars=` are skipped.
+    """
+    chars = _PROMPT_CHARS_RE.search(notes)
+    tokens = _PROMPT_TOKENS_RE.search(notes)
+    if not chars or not tokens:
+        return None
+    n_chars, n_tokens = int(chars.group(1)), int(tokens.group(1))
+    if n_chars <= 0 or n_tokens <= 0:
+        return None
+    return n_chars, n_tokens
+
+
+def calibrate(rows: Iterable[tuple[str | None, str]]) -> dict[str, float]:
+    """Per-model median tokens/char from (model, notes) pairs; rows without a model pool under ""."""
+    ratios: dict[str, list[float]] = {}
+    for model, notes in rows:
+        sample = calibration_sample(notes or "")
+        if sample is not None:
+            chars, tokens = sample
+            ratios.setdefault(model or "", []).append(tokens / chars)
+    return {
+        model: statistics.median(values)
+        for model, values in ratios.items()
+        if len(values) >= MIN_CALIBRATION_SAMPLES
+    }
+
+
+def estimator_for(model: str, calibration: dict[str, float]) -> TokenEstimator:
+    ratio = calibration.get(model) or calibration.get("") or DEFAULT_TOKENS_PER_CHAR
+    return TokenEstimator(tokens_per_char=ratio)
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 import json
+from collections.abc import Callable
 from pathlib import Path
 from typing import Any
 
 from jsonschema import ValidationError, validate
 
+from .llm_cache import cache_on_success
 from .llm_gemini import GeminiClient, parse_json_text
 
+TRIAGE_JSON_ERROR = "triage_json_error"
+
 
 class SchemaValidationError(RuntimeError):
     pass
@@ -33,17 +37,20 @@ def _persisted_triage(arxiv_id_base: str, data: dict[str, Any]) -> dict[str, Any
     }
 
 
-def triage_paper(
+def triage_prompt(paper: dict[str, Any], prompt_template: str) -> str:
+    return prompt_template.replace("{{TITLE}}", paper["title"]).replace(
+        "{{ABSTRACT}}", paper["summary"]
+    )
+
+
+def triage_from_output(
     paper: dict[str, Any],
+    raw: str,
     llm: GeminiClient,
-    prompt_template: str,
     repair_template: str,
     schema: dict[str, Any],
 ) -> dict[str, Any]:
-    prompt = prompt_template.replace("{{TITLE}}", paper["title"]).replace(
-        "{{ABSTRACT}}", paper["summary"]
-    )
-    raw = llm.generate(prompt, schema=schema)
+    """Parse and validate a raw triage response, asking `llm` for one JSON repair if needed."""
     try:
         data = parse_json_text(raw)
         validate_json(data, schema)
@@ -63,5 +70,118 @@ def triage_paper(
                 "arxiv_id_base": paper["arxiv_id_base"],
                 "decision": "reject",
                 "confidence": 0.0,
-                "reasons": ["triage_json_error", "insufficient_valid_output"],
+                "reasons": [TRIAGE_JSON_ERROR, "insufficient_valid_output"],
             }
+
+
+def triage_paper(
+    paper: dict[str, Any],
+    llm: GeminiClient,
+    prompt_template: str,
+    repair_template: str,
+    schema: dict[str, Any],
+) -> dict[str, Any]:
+    with cache_on_success(llm) as keep:
+        raw = llm.generate(triage_prompt(paper, prompt_template), schema=schema)
+        row = triage_from_output(paper, raw, llm, repair_template, schema)
+        if TRIAGE_JSON_ERROR not in row["reasons"]:
+            keep()
+    return row
+
+
+def pack_schema(schema: dict[str, Any]) -> dict[str, Any]:
+    """List-valued response schema for packed triage, derived from the single-paper schema."""
+    item = {key: value for key, value in schema.items() if key not in {"$schema", "title"}}
+    item["properties"] = {"arxiv_id_base": {"type": "string", "minLength": 1}, **schema["properties"]}
+    item["required"] = ["arxiv_id_base", *schema["required"]]
+    return {
+        "type": "object",
+        "additionalProperties": False,
+        "required": ["results"],
+        "properties": {"results": {"type": "array", "items": item}},
+    }
+
+
+def triage_pack_prompt(papers: list[dict[str, Any]], prompt_template: str) -> str:
+    payload = [
+        {"arxiv_id_base": p["arxiv_id_base"], "title": p["title"], "abstract": p["summary"]} for p in papers
+    ]
+    return prompt_template.replace("{{PAPERS_JSON}}", json.dumps(payload, ensure_ascii=False, indent=2))
+
+
+def triage_papers(
+    papers: list[dict[str, Any]],
+    llm: GeminiClient,
+    prompt_template: str,
+    repair_template: str,
+    schema: dict[str, Any],
+) -> dict[str, dict[str, Any]]:
+    """Triage several papers with one call; returns rows only for items that validate.
+
+    Items are checked one by one against `schema`, so a single malformed or missing item
+    does not discard the rest of the response.
+    """
+    response_schema = pack_schema(schema)
+    with cache_on_success(llm) as keep:
+        raw = llm.generate(triage_pack_prompt(papers, prompt_template), schema=response_schema)
+        try:
+            items = parse_json_text(raw)["results"]
+        except Exception:  # noqa: BLE001
+            repair_prompt = (
+                repair_template.replace(
+                    "{{SCHEMA_JSON}}", json.dumps(response_schema, ensure_ascii=False)
+                ).replace("{{BAD_OUTPUT}}", raw)
+            )
+            try:
+                items = parse_json_text(llm.generate(repair_prompt, schema=response_schema))["results"]
+            except Exception:  # noqa: BLE001
+                return {}
+        rows = _pack_rows(papers, items, schema)
+        if rows:
+            keep()
+    return rows
+
+
+def _pack_rows(
+    papers: list[dict[str, Any]], items: Any, schema: dict[str, Any]
+) -> dict[str, dict[str, Any]]:
+    if not isinstance(items, list):
+        return {}
+
+    wanted = {p["arxiv_id_base"] for p in papers}
+    rows: dict[str, dict[str, Any]] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        aid = item.get("arxiv_id_base")
+        if aid not in wanted or aid in rows:
+            continue
+        data = {key: value for key, value in item.items() if key != "arxiv_id_base"}
+        try:
+            validate_json(data, schema)
+        except SchemaValidationError:
+            continue
+        rows[aid] = _persisted_triage(aid, data)
+    return rows
+
+
+def triage_pack(
+    papers: list[dict[str, Any]],
+    llm: GeminiClient,
+    prompt_template: str,
+    repair_template: str,
+    schema: dict[str, Any],
+    fallback: Callable[[dict[str, Any]], dict[str, Any]],
+) -> list[tuple[dict[str, Any], bool]]:
+    """`(row, packed)` for `papers` in order: packed results where valid, else `fallback(paper)`.
+
+    `packed` tells the caller which prompt produced the row, so it can record the right version.
+    """
+    try:
+        rows = triage_papers(papers, llm, prompt_template, repair_template, schema)
+    except Exception:  # noqa: BLE001
+        rows = {}
+    return [
+        (rows[p["arxiv_id_base"]], True) if p["arxiv_id_base"] in rows else (fallback(p), False)
+        for p in papers
+    ]
@@ -1,7 +1,24 @@
+import io
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+
 import httpx
 import pytest
 
-from eegfm_digest.arxiv import dedupe_latest, fetch_query, in_month, parse_arxiv_id
+from eegfm_digest.arxiv import (
+    dedupe_latest,
+    fetch_month_candidates,
+    fetch_month_updates,
+    fetch_query,
+    fetch_range_candidates,
+    fetch_window,
+    in_month,
+    iter_feed_entries,
+    month_bounds,
+    parse_arxiv_id,
+    submitted_date_clause,
+)
 
 
 FEED_ONE_ENTRY = """\
@@ -24,6 +41,7 @@ FEED_ONE_ENTRY = """\
 class _FakeResponse:
     def __init__(self, text: str):
         self.text = text
+        self.content = text.encode("utf-8")
 
     def raise_for_status(self) -> None:
         return None
@@ -70,6 +88,36 @@ def test_dedupe_keeps_latest_version():
     assert keep["version"] == 3
 
 
+def test_iter_feed_entries_streams_entries_and_total():
+    body = "".join(_entry_xml(f"2501.{i:05d}", "2025-01-05T00:00:00Z") for i in range(3))
+    feed = (
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f"<opensearch:totalResults>42</opensearch:totalResults>{body}</feed>"
+    )
+    meta: dict = {}
+    rows = list(iter_feed_entries(io.BytesIO(feed.encode("utf-8")), meta))
+
+    assert meta["total"] == 42
+    assert [r["arxiv_id_base"] for r in rows] == ["2501.00000", "2501.00001", "2501.00002"]
+    assert rows[0]["links"]["pdf"] == "http://arxiv.org/pdf/2501.00000v1"
+
+
+def test_iter_feed_entries_parses_every_field():
+    (row,) = iter_feed_entries(io.BytesIO(FEED_ONE_ENTRY.encode("utf-8")))
+    assert row == {
+        "arxiv_id": "2501.00001v1",
+        "arxiv_id_base": "2501.00001",
+        "version": 1,
+        "title": "Test EEG FM Paper",
+        "summary": "Abstract text.",
+        "authors": ["Author One"],
+        "categories": ["cs.LG"],
+        "published": "2025-01-01T00:00:00Z",
+        "updated": "2025-01-01T00:00:00Z",
+        "links": {"abs": "http://arxiv.org/abs/2501.00001v1", "pdf": "http://arxiv.org/pdf/2501.00001v1"},
+    }
+
+
 def test_fetch_query_retries_then_succeeds(monkeypatch):
     monkeypatch.setattr("eegfm_digest.arxiv.time.sleep", lambda *_args, **_kwargs: None)
     client = _RetryOnceClient()
@@ -97,3 +145,223 @@ def test_fetch_query_raises_after_retry_exhaustion(monkeypatch):
             retry_backoff_seconds=0,
             client=_AlwaysTimeoutClient(),
         )
+
+
+def _entry_xml(arxiv_id: str, published: str) -> str:
+    return f"""
+  <entry>
+    <id>http://arxiv.org/abs/{arxiv_id}v1</id>
+    <updated>{published}</updated>
+    <published>{published}</published>
+    <title>Paper {arxiv_id}</title>
+    <summary>Abstract.</summary>
+    <author><name>Author One</name></author>
+    <category term="cs.LG"/>
+    <link title="pdf" href="http://arxiv.org/pdf/{arxiv_id}v1" rel="related" type="application/pdf"/>
+  </entry>"""
+
+
+class _TwoQueryClient:
+    """Serves two pages per query; first pages only return once both queries are in flight."""
+
+    def __init__(self):
+        self.instances = 0
+        self.seen: list[tuple[str, int]] = []
+        self.first_pages = threading.Barrier(2, timeout=2)
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.instances += 1
+        return self
+
+    def __exit__(self, *_exc):
+        return None
+
+    def get(self, _url, params=None):
+        query, start = params["search_query"], params["start"]
+        with self.lock:
+            self.seen.append((query, start))
+        if start == 0:
+            self.first_pages.wait()
+        tag = "1" if "foundation" in query else "2"
+        rows = params["max_results"] if start == 0 else 1
+        body = "".join(_entry_xml(f"2501.{tag}{start + i:04d}", "2025-01-05T00:00:00Z") for i in range(rows))
+        return _FakeResponse(f'<feed xmlns="http://www.w3.org/2005/Atom">{body}</feed>')
+
+
+def test_fetch_month_candidates_runs_queries_concurrently_on_one_client(monkeypatch):
+    client = _TwoQueryClient()
+    monkeypatch.setattr("eegfm_digest.arxiv._new_client", lambda *_args: client)
+    rows = fetch_month_candidates(max_candidates=150, month="2025-01", rate_limit_seconds=0)
+
+    assert client.instances == 1
+    assert sorted(start for _query, start in client.seen) == [0, 0, 100, 100]
+    assert len(rows) == 2 * 101
+
+
+_RANGE_RE = re.compile(r"submittedDate:\[(\d{12}) TO (\d{12})\]")
+
+
+class _WindowedArchiveClient:
+    """Answers windowed queries from an in-memory archive, honoring `start`/`max_results`."""
+
+    def __init__(self, published: list[datetime]):
+        self.published = sorted(published, reverse=True)
+        self.queries: list[str] = []
+
+    def get(self, _url, params=None):
+        query = params["search_query"]
+        self.queries.append(query)
+        lo, hi = _RANGE_RE.search(query).groups()
+        lo_dt = datetime.strptime(lo, "%Y%m%d%H%M").replace(tzinfo=timezone.utc)
+        hi_dt = datetime.strptime(hi, "%Y%m%d%H%M").replace(tzinfo=timezone.utc) + timedelta(minutes=1)
+        hits = [p for p in self.published if lo_dt <= p < hi_dt]
+        page = hits[params["start"] : params["start"] + params["max_results"]]
+        body = "".join(
+            _entry_xml(f"2501.{self.published.index(p):05d}", p.strftime("%Y-%m-%dT%H:%M:%SZ")) for p in page
+        )
+        return _FakeResponse(
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+            f"<opensearch:totalResults>{len(hits)}</opensearch:totalResults>{body}</feed>"
+        )
+
+
+def test_submitted_date_clause_covers_month_inclusively():
+    start, end = month_bounds("2024-12")
+    assert submitted_date_clause(start, end) == "submittedDate:[202412010000 TO 202412312359]"
+
+
+def test_fetch_window_splits_windows_beyond_page_cap():
+    start, end = month_bounds("2025-01")
+    published = [start + timedelta(hours=3 * i) for i in range(240)]
+    client = _WindowedArchiveClient(published)
+
+    rows = fetch_window(
+        "all:eeg",
+        start,
+        end,
+        max_results=10_000,
+        rate_limit_seconds=0,
+        page_size=20,
+        max_start=40,
+        client=client,
+    )
+
+    assert len(rows) == 240
+    assert len({r["arxiv_id_base"] for r in rows}) == 240
+    assert all(_RANGE_RE.search(q) for q in client.queries)
+    assert any(q.count("submittedDate") == 1 and "202501010000 TO 202501312359" in q for q in client.queries)
+    assert len(client.queries) < 60
+
+
+def test_fetch_window_skips_older_halves_once_max_results_is_reached():
+    start, end = month_bounds("2025-01")
+    published = [start + timedelta(hours=3 * i) for i in range(240)]
+    client = _WindowedArchiveClient(published)
+
+    rows = fetch_window(
+        "all:eeg", start, end, max_results=30, rate_limit_seconds=0, page_size=20, max_start=40, client=client
+    )
+
+    assert len(rows) == 30
+    window_starts = [_RANGE_RE.search(q).group(1) for q in client.queries]
+    # Only the first (whole-month) query reaches back to the start of the month.
+    assert window_starts[0] == "202501010000"
+    assert all(lo > "202501010000" for lo in window_starts[1:])
+
+
+class _ContextWindowedArchiveClient(_WindowedArchiveClient):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        return None
+
+
+def test_fetch_range_candidates_buckets_months_from_one_window_per_query(monkeypatch):
+    months = ["2024-11", "2024-12", "2025-01"]
+    published = [month_bounds(m)[0] + timedelta(days=d, hours=1) for m in months for d in range(3)]
+    client = _ContextWindowedArchiveClient(published)
+    monkeypatch.setattr("eegfm_digest.arxiv._new_client", lambda *_args: client)
+
+    by_month = fetch_range_candidates(months, max_candidates=2, rate_limit_seconds=0)
+
+    assert sorted(by_month) == months
+    for month in months:
+        assert len(by_month[month]) == 2
+        assert all(p["published"].startswith(month) for p in by_month[month])
+        assert by_month[month][-1]["published"].startswith(f"{month}-03")
+    # One contiguous window per query instead of one per (query, month).
+    assert len(client.queries) == 2
+    assert all("202411010000 TO 202501312359" in q for q in client.queries)
+
+
+_UPDATED_RE = re.compile(r"lastUpdatedDate:\[(\d{12}) TO (\d{12})\]")
+
+
+class _VersionedArchiveClient:
+    """Serves (arxiv_id, version, updated) entries, honoring a lastUpdatedDate range if present."""
+
+    def __init__(self, entries: list[tuple[str, int, str]]):
+        self.entries = entries
+        self.queries: list[str] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        return None
+
+    def get(self, _url, params=None):
+        query = params["search_query"]
+        self.queries.append(query)
+        match = _UPDATED_RE.search(query)
+        hits = [
+            e
+            for e in self.entries
+            if match is None or match.group(1) <= datetime.fromisoformat(e[2][:-1]).strftime("%Y%m%d%H%M")
+        ]
+        page = hits[params["start"] : params["start"] + params["max_results"]]
+        body = "".join(
+            _entry_xml(aid, "2025-01-05T00:00:00Z")
+            .replace(f"{aid}v1", f"{aid}v{ver}")
+            .replace("<updated>2025-01-05T00:00:00Z</updated>", f"<updated>{updated}</updated>")
+            for aid, ver, updated in page
+        )
+        return _FakeResponse(f'<feed xmlns="http://www.w3.org/2005/Atom">{body}</feed>')
+
+
+def test_fetch_month_updates_full_then_incremental(monkeypatch):
+    client = _VersionedArchiveClient(
+        [("2501.00001", 1, "2025-01-05T00:00:00Z"), ("2501.00002", 1, "2025-01-06T00:00:00Z")]
+    )
+    monkeypatch.setattr("eegfm_digest.arxiv._new_client", lambda *_args: client)
+    now = datetime(2025, 2, 10, tzinfo=timezone.utc)
+
+    rows, watermarks = fetch_month_updates([], {}, 100, "2025-01", 0, now=now)
+    assert [r["arxiv_id_base"] for r in rows] == ["2501.00001", "2501.00002"]
+    assert set(watermarks.values()) == {"2025-01-06T00:00:00Z"}
+    assert not any("lastUpdatedDate" in q for q in client.queries)
+
+    client.entries.append(("2501.00001", 2, "2025-02-08T12:00:00Z"))
+    client.queries.clear()
+    rows, watermarks = fetch_month_updates(rows, watermarks, 100, "2025-01", 0, now=now)
+
+    assert all("lastUpdatedDate:[202501060000 TO 202502100000]" in q for q in client.queries)
+    assert len(client.queries) == 2
+    assert {r["arxiv_id_base"]: r["version"] for r in rows} == {"2501.00001": 2, "2501.00002": 1}
+    assert set(watermarks.values()) == {"2025-02-08T12:00:00Z"}
+
+
+def test_fetch_month_updates_caps_the_merge_at_max_candidates(monkeypatch):
+    client = _VersionedArchiveClient(
+        [("2501.00001", 1, "2025-01-05T00:00:00Z"), ("2501.00002", 1, "2025-01-06T00:00:00Z")]
+    )
+    monkeypatch.setattr("eegfm_digest.arxiv._new_client", lambda *_args: client)
+    now = datetime(2025, 2, 10, tzinfo=timezone.utc)
+
+    rows, watermarks = fetch_month_updates([], {}, 2, "2025-01", 0, now=now)
+    client.entries.append(("2501.00003", 1, "2025-02-08T12:00:00Z"))
+    rows, _ = fetch_month_updates(rows, watermarks, 2, "2025-01", 0, now=now)
+
+    assert [r["arxiv_id_base"] for r in rows] == ["2501.00002", "2501.00003"]
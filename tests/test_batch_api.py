@@ -0,0 +1,140 @@
+import json
+from collections.abc import Callable
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from eegfm_digest.batch_api import BatchJobError, BatchRequest, OpenAIBatchBackend, run_batch_job
+from eegfm_digest.llm_gemini import GeminiBatchBackend, LLMConfig
+
+
+class FakeBatchServer:
+    """In-process stand-in for an OpenAI-compatible Files + Batches API."""
+
+    def __init__(self, respond: Callable[[str], str | None], polls_until_done: int = 2, final: str = "completed"):
+        self.respond = respond
+        self.polls_until_done = polls_until_done
+        self.final = final
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self.submitted: list[list[dict]] = []
+
+    def _run(self, batch: dict) -> None:
+        lines = []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            req = json.loads(line)
+            text = self.respond(req["body"]["messages"][0]["content"])
+            if text is None:
+                lines.append({"custom_id": req["custom_id"], "response": None, "error": {"code": "server_error"}})
+            else:
+                body = {"choices": [{"message": {"role": "assistant", "content": text}}]}
+                lines.append({"custom_id": req["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+        file_id = f"file-out-{batch['id']}"
+        self.files[file_id] = "\n".join(json.dumps(x) for x in lines) + "\n"
+        batch["output_file_id"] = file_id
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        assert request.headers["Authorization"] == "Bearer test-key"
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/files":
+            parts = request.read().decode("utf-8").split("\r\n")
+            jsonl = [line for part in parts if part.startswith('{"custom_id"') for line in part.splitlines()]
+            file_id = f"file-{len(self.files)}"
+            self.files[file_id] = "\n".join(jsonl)
+            self.submitted.append([json.loads(x) for x in jsonl])
+            return httpx.Response(200, json={"id": file_id, "purpose": "batch"})
+        if request.method == "POST" and path == "/v1/batches":
+            body = json.loads(request.content)
+            assert body["endpoint"] == "/v1/chat/completions"
+            batch_id = f"batch-{len(self.batches)}"
+            self.batches[batch_id] = {"id": batch_id, "input_file_id": body["input_file_id"], "polls": 0}
+            return httpx.Response(200, json={"id": batch_id, "status": "validating"})
+        if request.method == "GET" and path.startswith("/v1/batches/"):
+            batch = self.batches[path.rsplit("/", 1)[-1]]
+            batch["polls"] += 1
+            status = "in_progress"
+            if batch["polls"] > self.polls_until_done:
+                status = self.final
+                if status == "completed" and "output_file_id" not in batch:
+                    self._run(batch)
+            return httpx.Response(200, json={**batch, "status": status})
+        if request.method == "GET" and path.endswith("/content"):
+            return httpx.Response(200, text=self.files[path.split("/")[-2]])
+        return httpx.Response(404)
+
+
+def _backend(server: FakeBatchServer) -> OpenAIBatchBackend:
+    return OpenAIBatchBackend(
+        "http://batch.test/v1",
+        "test-key",
+        model="m",
+        temperature=0.0,
+        max_output_tokens=64,
+        client=httpx.Client(transport=httpx.MockTransport(server.handler)),
+    )
+
+
+def _requests() -> list[BatchRequest]:
+    return [BatchRequest("2025-01/a", "prompt a"), BatchRequest("2025-01/b", "prompt b"), BatchRequest("2025-01/c", "boom")]
+
+
+def test_openai_backend_round_trip_against_fake_server(tmp_path):
+    server = FakeBatchServer(lambda prompt: None if prompt == "boom" else f"out:{prompt}")
+    sleeps: list[float] = []
+    job_path = tmp_path / "jobs" / "triage.jsonl"
+
+    results = run_batch_job(_backend(server), _requests(), {"type": "object"}, job_path, poll_seconds=5, sleep=sleeps.append)
+
+    assert results == {"2025-01/a": "out:prompt a", "2025-01/b": "out:prompt b"}
+    assert sleeps == [5, 5]
+    [lines] = server.submitted
+    assert [x["custom_id"] for x in lines] == ["2025-01/a", "2025-01/b", "2025-01/c"]
+    assert lines[0]["body"]["response_format"] == {"type": "json_object"}
+    assert job_path.exists()
+    assert not job_path.with_suffix(".state.json").exists()
+
+
+def test_interrupted_job_is_resumed_not_resubmitted(tmp_path):
+    server = FakeBatchServer(lambda prompt: f"out:{prompt}", polls_until_done=10)
+    job_path = tmp_path / "triage.jsonl"
+    with pytest.raises(BatchJobError, match="rerun to resume"):
+        run_batch_job(_backend(server), _requests(), None, job_path, poll_seconds=1, timeout_seconds=2, sleep=lambda _s: None)
+    assert job_path.with_suffix(".state.json").exists()
+
+    results = run_batch_job(_backend(server), _requests(), None, job_path, poll_seconds=1, sleep=lambda _s: None)
+    assert len(server.submitted) == 1
+    assert results["2025-01/c"] == "out:boom"
+
+
+def test_failed_job_raises_and_clears_state(tmp_path):
+    server = FakeBatchServer(lambda prompt: prompt, polls_until_done=0, final="expired")
+    job_path = tmp_path / "triage.jsonl"
+    with pytest.raises(BatchJobError, match="failed"):
+        run_batch_job(_backend(server), _requests(), None, job_path, sleep=lambda _s: None)
+    assert not job_path.with_suffix(".state.json").exists()
+
+
+def test_gemini_backend_job_lines_and_results():
+    output = "\n".join(
+        [
+            json.dumps({"key": "m/a", "response": {"candidates": [{"content": {"parts": [{"text": '{"x": 1}'}]}}]}}),
+            json.dumps({"key": "m/b", "error": {"code": 13}}),
+        ]
+    )
+    client = SimpleNamespace(
+        batches=SimpleNamespace(
+            get=lambda name: SimpleNamespace(
+                state=SimpleNamespace(name="JOB_STATE_SUCCEEDED"), dest=SimpleNamespace(file_name="files/out")
+            )
+        ),
+        files=SimpleNamespace(download=lambda file: output.encode("utf-8")),
+    )
+    backend = GeminiBatchBackend(LLMConfig(api_key="k", model="g", temperature=0.0, max_output_tokens=32), client=client)
+
+    line = backend.job_line(BatchRequest("m/a", "prompt"), {"type": "object"})
+    assert line["key"] == "m/a"
+    assert line["request"]["contents"][0]["parts"] == [{"text": "prompt"}]
+    assert line["request"]["generation_config"]["response_json_schema"] == {"type": "object"}
+    assert backend.status("batches/1") == "succeeded"
+    assert backend.results("batches/1") == {"m/a": '{"x": 1}'}
@@ -0,0 +1,479 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from eegfm_digest.batch import (
+    BatchRunConfig,
+    RateLimitStop,
+    _prefetch_range,
+    _run_summary_phase_for_month,
+    _run_triage_batch_api,
+    _run_triage_phase_for_month,
+    run_batch,
+)
+from eegfm_digest.config import Config
+from eegfm_digest.db import DigestDB, ResultVersion
+from eegfm_digest.llm_cache import CachedLLM
+
+
+def _candidate(arxiv_id_base: str) -> dict:
+    return {
+        "arxiv_id": f"{arxiv_id_base}v1",
+        "arxiv_id_base": arxiv_id_base,
+        "version": 1,
+        "title": f"Paper {arxiv_id_base}",
+        "summary": "abstract",
+        "authors": ["Author A"],
+        "categories": ["cs.LG"],
+        "published": "2025-01-02T00:00:00Z",
+        "updated": "2025-01-02T00:00:00Z",
+        "links": {"abs": f"https://arxiv.org/abs/{arxiv_id_base}", "pdf": ""},
+    }
+
+
+def _setup(tmp_path: Path, ids: list[str]) -> tuple[Config, DigestDB]:
+    cfg = Config(
+        gemini_model_triage="triage-model",
+        gemini_model_summary="summary-model",
+        output_dir=tmp_path / "outputs",
+        data_dir=tmp_path / "data",
+        docs_dir=tmp_path / "docs",
+    )
+    month_out = cfg.output_dir / "2025-01"
+    month_out.mkdir(parents=True)
+    (month_out / "arxiv_raw.json").write_text(json.dumps([_candidate(i) for i in ids]), encoding="utf-8")
+    return cfg, DigestDB(cfg.data_dir / "digest.sqlite")
+
+
+def test_triage_phase_runs_uncached_concurrently_and_keeps_cache(monkeypatch, tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(8)]
+    cfg, db = _setup(tmp_path, ids)
+    db.upsert_triage(
+        "2025-01",
+        {"arxiv_id_base": ids[0], "decision": "accept", "confidence": 0.9, "reasons": ["cached", "row"]},
+    )
+    called: list[str] = []
+    threads: set[int] = set()
+    lock = threading.Lock()
+
+    def fake_triage_paper(paper, **_kwargs):
+        with lock:
+            called.append(paper["arxiv_id_base"])
+            threads.add(threading.get_ident())
+        return {"decision": "reject", "confidence": 0.1, "reasons": ["r1", "r2"]}
+
+    monkeypatch.setattr("eegfm_digest.batch.triage_paper", fake_triage_paper)
+    run_cfg = BatchRunConfig(months=["2025-01"], triage_workers=4)
+    _run_triage_phase_for_month(cfg, run_cfg, "2025-01", db, llm=object())
+
+    rows = [json.loads(line) for line in (cfg.output_dir / "2025-01" / "triage.jsonl").read_text().splitlines()]
+    assert [r["arxiv_id_base"] for r in rows] == ids
+    assert rows[0]["reasons"] == ["cached", "row"]
+    assert sorted(called) == ids[1:]
+    assert db.get_triage(ids[-1])["decision"] == "reject"
+    db.close()
+
+
+def test_triage_phase_rate_limit_stop_propagates(monkeypatch, tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(6)]
+    cfg, db = _setup(tmp_path, ids)
+
+    def fake_triage_paper(paper, **_kwargs):
+        if paper["arxiv_id_base"] == ids[2]:
+            raise RateLimitStop("quota")
+        return {"decision": "reject", "confidence": 0.1, "reasons": ["r1", "r2"]}
+
+    monkeypatch.setattr("eegfm_digest.batch.triage_paper", fake_triage_paper)
+    run_cfg = BatchRunConfig(months=["2025-01"], triage_workers=2)
+    with pytest.raises(RateLimitStop):
+        _run_triage_phase_for_month(cfg, run_cfg, "2025-01", db, llm=object())
+
+    assert db.get_triage(ids[0]) is not None
+    assert db.get_triage(ids[1]) is not None
+    assert db.get_triage(ids[2]) is None
+    flushed = (cfg.output_dir / "2025-01" / "triage.jsonl").read_text().splitlines()
+    assert [json.loads(line)["arxiv_id_base"] for line in flushed][:2] == ids[:2]
+    assert db.get_work_states("2025-01", "triage")[ids[0]].state == "done"
+    db.close()
+
+
+def test_resumed_triage_retries_failed_rows_until_max_attempts(monkeypatch, tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(3)]
+    cfg, db = _setup(tmp_path, ids)
+    called: list[str] = []
+
+    def flaky_triage_paper(paper, **_kwargs):
+        called.append(paper["arxiv_id_base"])
+        if paper["arxiv_id_base"] == ids[1]:
+            raise ValueError("bad output")
+        return {"decision": "reject", "confidence": 0.1, "reasons": ["r1", "r2"]}
+
+    monkeypatch.setattr("eegfm_digest.batch.triage_paper", flaky_triage_paper)
+    run_cfg = BatchRunConfig(months=["2025-01"], max_attempts=2)
+    for _ in range(3):
+        _run_triage_phase_for_month(cfg, run_cfg, "2025-01", db, llm=object())
+
+    assert called == [*ids, ids[1]]
+    entry = db.get_work_states("2025-01", "triage")[ids[1]]
+    assert (entry.state, entry.attempts, entry.error) == ("failed", 2, "triage_exception:ValueError")
+    assert db.get_triage(ids[1])["reasons"][-1] == "automatic_reject_fallback"
+    db.close()
+
+
+def test_triage_phase_packs_pending_papers_into_fewer_calls(tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(7)]
+    cfg, db = _setup(tmp_path, ids)
+    calls: list[list[str]] = []
+
+    class PackLLM:
+        def generate(self, prompt, schema=None):
+            papers = json.loads(prompt[prompt.index("Input papers:") + len("Input papers:") :])
+            calls.append([p["arxiv_id_base"] for p in papers])
+            results = [
+                {"arxiv_id_base": p["arxiv_id_base"], "decision": "reject", "confidence": 0.2, "reasons": ["a", "b"]}
+                for p in papers
+            ]
+            return json.dumps({"results": results})
+
+    run_cfg = BatchRunConfig(months=["2025-01"], triage_pack_size=3, triage_workers=2)
+    _run_triage_phase_for_month(cfg, run_cfg, "2025-01", db, llm=PackLLM())
+
+    assert sorted(calls) == [ids[0:3], ids[3:6], ids[6:7]]
+    rows = [json.loads(line) for line in (cfg.output_dir / "2025-01" / "triage.jsonl").read_text().splitlines()]
+    assert [r["arxiv_id_base"] for r in rows] == ids
+    assert all(r["decision"] == "reject" for r in rows)
+    db.close()
+
+
+def test_packed_triage_stamps_each_row_with_the_prompt_that_produced_it(tmp_path):
+    ids = ["2501.00001", "2501.00002"]
+    cfg, db = _setup(tmp_path, ids)
+    single_calls: list[str] = []
+    pack_calls: list[str] = []
+
+    class SingleLLM:
+        def generate(self, prompt, schema=None):
+            single_calls.append(prompt)
+            return json.dumps({"decision": "accept", "confidence": 0.7, "reasons": ["single", "paper"]})
+
+    class PackLLM:
+        def generate(self, prompt, schema=None):
+            pack_calls.append(prompt)
+            item = {"arxiv_id_base": ids[0], "decision": "reject", "confidence": 0.2, "reasons": ["a", "b"]}
+            return json.dumps({"results": [item]})
+
+    single = ResultVersion("triage-sha", "schema", "model")
+    packed = ResultVersion("triage-pack-sha", "schema", "model")
+    run_cfg = BatchRunConfig(months=["2025-01"], triage_pack_size=2)
+    _run_triage_phase_for_month(
+        cfg, run_cfg, "2025-01", db, llm=SingleLLM(), version=single, pack_llm=PackLLM(), pack_version=packed
+    )
+
+    # The missing item falls back to the single-paper client, not the pack-sized one.
+    assert len(pack_calls) == 1
+    assert len(single_calls) == 1 and "Paper 2501.00002" in single_calls[0]
+    assert db.get_stale_triage_ids(ids, packed) == {ids[1]}
+    assert db.get_stale_triage_ids(ids, single) == {ids[0]}
+    assert db.get_stale_triage_ids(ids, single, packed) == set()
+    db.close()
+
+
+def test_prefetch_range_fetches_only_missing_months_once(monkeypatch, tmp_path):
+    cfg, db = _setup(tmp_path, ["2501.00001"])
+    db.close()
+    calls: list[list[str]] = []
+
+    def fake_fetch_range(months, *_args, **_kwargs):
+        calls.append(list(months))
+        return {m: [_candidate(f"{m[2:4]}{m[5:7]}.00009")] for m in months}
+
+    monkeypatch.setattr("eegfm_digest.batch.fetch_range_candidates", fake_fetch_range)
+    run_cfg = BatchRunConfig(months=["2024-12", "2025-01", "2025-02"], fetch_mode="range")
+    prefetched = _prefetch_range(cfg, run_cfg, run_cfg.months)
+
+    assert calls == [["2024-12", "2025-02"]]
+    assert prefetched == {"2024-12", "2025-02"}
+    raw = json.loads((cfg.output_dir / "2025-02" / "arxiv_raw.json").read_text())
+    assert [p["arxiv_id_base"] for p in raw] == ["2502.00009"]
+    kept = json.loads((cfg.output_dir / "2025-01" / "arxiv_raw.json").read_text())
+    assert [p["arxiv_id_base"] for p in kept] == ["2501.00001"]
+
+
+def test_rerun_stale_only_retriages_rows_from_other_versions(monkeypatch, tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(4)]
+    cfg, db = _setup(tmp_path, ids)
+    current = ResultVersion("prompt-v2", "schema", "model")
+    row = {"decision": "accept", "confidence": 0.9, "reasons": ["cached", "row"]}
+    db.upsert_triage("2025-01", {"arxiv_id_base": ids[0], **row}, current)
+    db.upsert_triage("2025-01", {"arxiv_id_base": ids[1], **row}, ResultVersion("prompt-v1", "schema", "model"))
+    db.upsert_triage("2025-01", {"arxiv_id_base": ids[2], **row}, current)
+    called: list[str] = []
+
+    def fake_triage_paper(paper, **_kwargs):
+        called.append(paper["arxiv_id_base"])
+        return {"decision": "reject", "confidence": 0.1, "reasons": ["r1", "r2"]}
+
+    monkeypatch.setattr("eegfm_digest.batch.triage_paper", fake_triage_paper)
+    run_cfg = BatchRunConfig(months=["2025-01"], rerun_stale=True)
+    _run_triage_phase_for_month(cfg, run_cfg, "2025-01", db, llm=object(), version=current)
+
+    assert called == [ids[1], ids[3]]
+    assert db.get_stale_triage_ids(ids, current) == set()
+    db.close()
+
+
+_ACCEPT = json.dumps({"decision": "accept", "confidence": 0.8, "reasons": ["eeg", "foundation model"]})
+
+
+class _FakeBatchBackend:
+    name = "fake"
+
+    def __init__(self, outputs: dict[str, str]):
+        self.outputs = outputs
+        self.requests: list[str] = []
+
+    def job_line(self, request, schema):
+        self.requests.append(request.custom_id)
+        return {"custom_id": request.custom_id, "prompt": request.prompt}
+
+    def submit(self, job_path):
+        return "job-1"
+
+    def status(self, job_id):
+        return "succeeded"
+
+    def results(self, job_id):
+        return self.outputs
+
+
+class _SyncLLM:
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    def generate(self, prompt, schema=None):
+        self.prompts.append(prompt)
+        return _ACCEPT
+
+
+def test_batch_api_triage_ingests_outputs_through_repair_and_falls_back_to_sync(tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(4)]
+    cfg, db = _setup(tmp_path, ids)
+    version = ResultVersion("p", "s", "triage-model")
+    db.upsert_triage(
+        "2025-01",
+        {"arxiv_id_base": ids[0], "decision": "reject", "confidence": 0.9, "reasons": ["cached", "row"]},
+    )
+    backend = _FakeBatchBackend({f"2025-01/{ids[1]}": _ACCEPT, f"2025-01/{ids[2]}": "not json"})
+    sync = _SyncLLM()
+    llm = CachedLLM(sync, db, model="triage-model", temperature=0.0, max_bytes=1 << 20)
+
+    _run_triage_batch_api(cfg, BatchRunConfig(months=["2025-01"]), ["2025-01"], db, llm, backend, set(), version)
+
+    assert backend.requests == [f"2025-01/{i}" for i in ids[1:]]
+    # ids[2] needed one JSON repair and ids[3] got no batch output: both went through `llm`.
+    assert len(sync.prompts) == 2
+    assert "not json" in sync.prompts[0]
+    assert "Paper 2501.00003" in sync.prompts[1]
+    rows = [json.loads(line) for line in (cfg.output_dir / "2025-01" / "triage.jsonl").read_text().splitlines()]
+    assert [r["decision"] for r in rows] == ["reject", "accept", "accept", "accept"]
+    assert db.get_stale_triage_ids(ids[1:], version) == set()
+    assert not (cfg.data_dir / "batch_jobs" / "triage.state.json").exists()
+
+    # Batch outputs land in the LLM response cache, so a forced re-run submits nothing new.
+    backend.requests.clear()
+    _run_triage_batch_api(
+        cfg, BatchRunConfig(months=["2025-01"], triage_force=True), ["2025-01"], db, llm, backend, {"2025-01"}, version
+    )
+    assert backend.requests == [f"2025-01/{ids[0]}"]
+    db.close()
+
+
+def test_summary_phase_resumes_unflushed_summaries_from_the_ledger(monkeypatch, tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(3)]
+    cfg, db = _setup(tmp_path, ids)
+    rows = [{"arxiv_id_base": i, "decision": "accept", "confidence": 0.9, "reasons": ["a", "b"]} for i in ids]
+    (cfg.output_dir / "2025-01" / "triage.jsonl").write_text("\n".join(json.dumps(r) for r in rows))
+
+    def summary(aid: str) -> dict:
+        return {"arxiv_id_base": aid, "published_date": "2025-01-02", "paper_type": "method"}
+
+    # ids[0] was summarized by a run that died before papers.jsonl was written.
+    db.upsert_summary("2025-01", summary(ids[0]))
+    db.set_work_state("2025-01", "summary", [ids[0]], "done")
+    seen: list[str] = []
+
+    def fake_pipeline(jobs, **_kwargs):
+        for job in jobs:
+            seen.append(job.arxiv_id_base)
+            if job.arxiv_id_base == ids[1]:
+                job.summary = summary(job.arxiv_id_base)
+            else:
+                job.notes = "summary_skipped:pdf_failed:HTTPError"
+            yield job
+
+    monkeypatch.setattr("eegfm_digest.batch.run_summary_pipeline", fake_pipeline)
+    run_cfg = BatchRunConfig(months=["2025-01"], no_site=True)
+    _run_summary_phase_for_month(cfg, run_cfg, "2025-01", db, llm=object())
+
+    assert seen == ids[1:]
+    papers = (cfg.output_dir / "2025-01" / "papers.jsonl").read_text().splitlines()
+    assert [json.loads(line)["arxiv_id_base"] for line in papers] == ids[:2]
+    states = db.get_work_states("2025-01", "summary")
+    assert states[ids[1]].state == "done"
+    assert (states[ids[2]].state, states[ids[2]].error) == ("failed", "summary_skipped:pdf_failed:HTTPError")
+    db.close()
+
+
+def test_summary_phase_retries_failed_items_until_max_attempts(monkeypatch, tmp_path):
+    ids = [f"2501.{n:05d}" for n in range(2)]
+    cfg, db = _setup(tmp_path, ids)
+    rows = [{"arxiv_id_base": i, "decision": "accept", "confidence": 0.9, "reasons": ["a", "b"]} for i in ids]
+    (cfg.output_dir / "2025-01" / "triage.jsonl").write_text("\n".join(json.dumps(r) for r in rows))
+    seen: list[str] = []
+
+    def fake_pipeline(jobs, **_kwargs):
+        for job in jobs:
+            seen.append(job.arxiv_id_base)
+            if job.arxiv_id_base == ids[0]:
+                job.summary = {"arxiv_id_base": ids[0], "published_date": "2025-01-02", "paper_type": "method"}
+            else:
+                # PDF failures never reach the LLM but still use up an attempt.
+                job.notes = "summary_skipped:pdf_failed:HTTPError"
+            yield job
+
+    monkeypatch.setattr("eegfm_digest.batch.run_summary_pipeline", fake_pipeline)
+    run_cfg = BatchRunConfig(months=["2025-01"], no_site=True, max_attempts=2)
+    for _ in range(3):
+        _run_summary_phase_for_month(cfg, run_cfg, "2025-01", db, llm=object())
+
+    assert seen == [*ids, ids[1]]
+    entry = db.get_work_states("2025-01", "summary")[ids[1]]
+    assert (entry.state, entry.attempts) == ("failed", 2)
+    db.close()
+
+
+def _patch_run_batch(
+    monkeypatch, tmp_path: Path, months: list[str], triage, summary, **settings
+) -> Path:
+    cfg = Config(
+        gemini_model_triage="triage-model",
+        gemini_model_summary="summary-model",
+        output_dir=tmp_path / "outputs",
+        data_dir=tmp_path / "data",
+        docs_dir=tmp_path / "docs",
+    )
+    config_path = tmp_path / "batch.json"
+    config_path.write_text(
+        json.dumps(
+            {"months": months, "months_from_outputs": False, "env_path": str(tmp_path / ".env"), **settings}
+        )
+    )
+    monkeypatch.setattr("eegfm_digest.batch.load_config", lambda: cfg)
+    monkeypatch.setattr("eegfm_digest.batch.load_api_key", lambda: "key")
+    monkeypatch.setattr("eegfm_digest.batch.GeminiClient", lambda _config: object())
+    monkeypatch.setattr("eegfm_digest.batch._run_triage_phase_for_month", triage)
+    monkeypatch.setattr("eegfm_digest.batch._run_summary_phase_for_month", summary)
+    return config_path
+
+
+def test_run_batch_summarizes_newest_month_while_older_months_triage(monkeypatch, tmp_path):
+    months = ["2025-01", "2025-02", "2025-03"]
+    events: list[str] = []
+    newest_summarized = threading.Event()
+
+    def fake_triage(cfg, run_cfg, month, db, llm, **_kwargs):
+        if month == "2025-01":
+            # The oldest month's triage only finishes once the newest month has been summarized.
+            assert newest_summarized.wait(timeout=5)
+        events.append(f"triage {month}")
+
+    def fake_summary(cfg, run_cfg, month, db, llm, **_kwargs):
+        events.append(f"summary {month}")
+        if month == "2025-03":
+            newest_summarized.set()
+
+    run_batch(_patch_run_batch(monkeypatch, tmp_path, months, fake_triage, fake_summary))
+
+    assert [e for e in events if e.startswith("triage")] == [f"triage {m}" for m in reversed(months)]
+    assert [e for e in events if e.startswith("summary")] == [f"summary {m}" for m in reversed(months)]
+    assert events.index("summary 2025-03") < events.index("triage 2025-01")
+
+
+def test_run_batch_publishes_other_months_when_one_month_fails(monkeypatch, tmp_path):
+    months = ["2025-01", "2025-02", "2025-03", "2025-04"]
+    summarized: list[str] = []
+
+    def fake_triage(cfg, run_cfg, month, db, llm, **_kwargs):
+        if month == "2025-04":
+            raise ValueError("bad arxiv response")
+
+    def fake_summary(cfg, run_cfg, month, db, llm, **_kwargs):
+        if month == "2025-03":
+            raise OSError("disk full")
+        summarized.append(month)
+
+    config_path = _patch_run_batch(monkeypatch, tmp_path, months, fake_triage, fake_summary)
+    with pytest.raises(RuntimeError, match=r"2025-03 \(summary: OSError.*2025-04 \(triage: ValueError"):
+        run_batch(config_path)
+    assert summarized == ["2025-02", "2025-01"]
+
+
+def test_run_batch_rate_limit_stop_still_stops_the_run(monkeypatch, tmp_path):
+    summarized: list[str] = []
+
+    def fake_triage(cfg, run_cfg, month, db, llm, **_kwargs):
+        if month == "2025-02":
+            raise RateLimitStop("quota")
+
+    def fake_summary(cfg, run_cfg, month, db, llm, **_kwargs):
+        summarized.append(month)
+
+    config_path = _patch_run_batch(monkeypatch, tmp_path, ["2025-01", "2025-02"], fake_triage, fake_summary)
+    with pytest.raises(RateLimitStop):
+        run_batch(config_path)
+    assert "2025-01" not in summarized
+
+
+def test_run_batch_trains_the_prefilter_only_on_months_before_the_run(monkeypatch, tmp_path):
+    befores: list[str | None] = []
+
+    def fake_history(output_dir, before=None):
+        befores.append(before)
+        return [], {}
+
+    monkeypatch.setattr("eegfm_digest.batch.load_triage_history", fake_history)
+    config_path = _patch_run_batch(
+        monkeypatch,
+        tmp_path,
+        ["2025-03", "2025-01", "2025-02"],
+        lambda *_args, **_kwargs: None,
+        lambda *_args, **_kwargs: None,
+        prefilter_margin=0.5,
+    )
+    run_batch(config_path)
+    assert befores == ["2025-01"]
+
+
+@pytest.mark.parametrize(("settings", "ceiling"), [({}, 6.0), ({"max_requests_per_minute": {"gemini": 30}}, 30.0)])
+def test_run_batch_caps_adaptive_rate_at_the_configured_budget(monkeypatch, tmp_path, settings, ceiling):
+    limiters: list[tuple[float, float | None]] = []
+
+    def recording_limiter(rpm, max_per_minute=None):
+        limiters.append((rpm, max_per_minute))
+        return object()
+
+    monkeypatch.setattr("eegfm_digest.batch.AdaptiveRateLimiter", recording_limiter)
+    monkeypatch.setattr("eegfm_digest.batch.RateLimitedLLM", lambda llm, _limiter: llm)
+    config_path = _patch_run_batch(
+        monkeypatch,
+        tmp_path,
+        ["2025-01"],
+        lambda *_args, **_kwargs: None,
+        lambda *_args, **_kwargs: None,
+        requests_per_minute={"gemini": 6},
+        **settings,
+    )
+    run_batch(config_path)
+    assert limiters == [(6.0, ceiling)]
@@ -0,0 +1,150 @@
+import threading
+import time
+
+import pytest
+
+from eegfm_digest.concurrency import (
+    AdaptiveRateLimiter,
+    RateLimiter,
+    Stage,
+    map_ordered,
+    retry_after_seconds,
+    run_pipeline,
+)
+
+
+class _Stop(BaseException):
+    pass
+
+
+def test_map_ordered_yields_in_input_order_despite_completion_order():
+    def slow_first(x: int) -> int:
+        time.sleep(0.05 if x == 0 else 0.0)
+        return x * 10
+
+    assert list(map_ordered(slow_first, range(6), workers=4)) == [0, 10, 20, 30, 40, 50]
+
+
+def test_map_ordered_runs_tasks_concurrently():
+    barrier = threading.Barrier(4, timeout=2)
+
+    def wait_for_peers(x: int) -> int:
+        barrier.wait()
+        return x
+
+    assert list(map_ordered(wait_for_peers, range(4), workers=4)) == [0, 1, 2, 3]
+
+
+def test_map_ordered_base_exception_cancels_queued_tasks():
+    started: list[int] = []
+
+    def fn(x: int) -> int:
+        started.append(x)
+        if x == 1:
+            raise _Stop("quota")
+        time.sleep(0.02)
+        return x
+
+    seen: list[int] = []
+    with pytest.raises(_Stop):
+        seen.extend(map_ordered(fn, range(50), workers=2))
+    assert seen == [0]
+    assert len(started) < 50
+
+
+def test_rate_limiter_spaces_requests(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr("eegfm_digest.concurrency.time.monotonic", lambda: clock["now"])
+    limiter = RateLimiter.per_minute(60)
+
+    assert limiter.reserve() == 0.0
+    assert limiter.reserve() == pytest.approx(1.0)
+    assert limiter.reserve() == pytest.approx(2.0)
+    clock["now"] += 10.0
+    assert limiter.reserve() == 0.0
+
+
+def test_rate_limiter_disabled_for_non_positive_rate():
+    limiter = RateLimiter.per_minute(0)
+    assert not limiter.enabled
+    assert [limiter.reserve() for _ in range(5)] == [0.0] * 5
+
+
+def test_adaptive_limiter_increases_additively_and_halves_on_throttle(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr("eegfm_digest.concurrency.time.monotonic", lambda: clock["now"])
+    limiter = AdaptiveRateLimiter(60, min_per_minute=10, max_per_minute=64, increase_per_minute=2)
+
+    # A minute of successes at ~60 rpm adds ~2 rpm, not 2 rpm per success.
+    for _ in range(60):
+        limiter.on_success()
+    assert limiter.requests_per_minute == pytest.approx(62, abs=0.1)
+    for _ in range(200):
+        limiter.on_success()
+    assert limiter.requests_per_minute == pytest.approx(64)
+
+    limiter.on_throttle(retry_after=5.0)
+    assert limiter.requests_per_minute == pytest.approx(32)
+    assert limiter.reserve() == pytest.approx(5.0)
+    for _ in range(3):
+        limiter.on_throttle()
+    assert limiter.requests_per_minute == pytest.approx(10)
+
+
+def test_adaptive_limiter_starts_from_observed_throughput_on_first_throttle(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr("eegfm_digest.concurrency.time.monotonic", lambda: clock["now"])
+    limiter = AdaptiveRateLimiter()
+    for _ in range(20):
+        assert limiter.reserve() == 0.0
+        limiter.on_success()
+        clock["now"] += 0.5
+    assert not limiter.enabled
+
+    limiter.on_throttle(retry_after=None)
+    # 20 successes over ~10s is ~2 req/s; the limiter restarts at half of that.
+    assert limiter.enabled
+    assert limiter.rate_per_second == pytest.approx(1.0, rel=0.1)
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert retry_after_seconds("12") == 12.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds("soon") is None
+    assert retry_after_seconds("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_run_pipeline_processes_every_item_through_all_stages():
+    stages = [
+        Stage("double", lambda x: x * 2, workers=2),
+        Stage("inc", lambda x: x + 1, workers=3),
+    ]
+    assert sorted(run_pipeline(range(20), stages, queue_size=2)) == [x * 2 + 1 for x in range(20)]
+
+
+def test_run_pipeline_overlaps_stages():
+    third_download_started = threading.Event()
+
+    def download(x: int) -> int:
+        if x == 2:
+            third_download_started.set()
+        return x
+
+    def summarize(x: int) -> int:
+        # The first item can only finish summarizing once the third is downloading.
+        if x == 0:
+            assert third_download_started.wait(timeout=2)
+        return x
+
+    stages = [Stage("download", download), Stage("extract", lambda x: x), Stage("summarize", summarize)]
+    assert sorted(run_pipeline(range(5), stages, queue_size=1)) == [0, 1, 2, 3, 4]
+
+
+def test_run_pipeline_reraises_first_stage_failure():
+    def boom(x: int) -> int:
+        if x == 3:
+            raise _Stop("quota")
+        return x
+
+    with pytest.raises(_Stop):
+        list(run_pipeline(range(100), [Stage("a", lambda x: x), Stage("b", boom, workers=2)], queue_size=2))
@@ -0,0 +1,184 @@
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from eegfm_digest.batch import _bootstrap_cache_from_outputs
+from eegfm_digest.db import DigestDB, ResultVersion, result_version
+from eegfm_digest.render import write_json, write_jsonl
+
+
+def _commits(db: DigestDB) -> list[str]:
+    statements: list[str] = []
+    db.conn.set_trace_callback(statements.append)
+    return statements
+
+
+def test_upsert_many_writes_all_rows_in_one_commit(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    trace = _commits(db)
+    db.upsert_papers_many("2025-01", [{"arxiv_id_base": f"2501.{i:05d}"} for i in range(50)])
+
+    assert trace.count("COMMIT") == 1
+    assert db.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] == 50
+    db.close()
+
+
+def test_transaction_groups_writes_and_rolls_back_on_error(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    trace = _commits(db)
+    with db.transaction():
+        db.upsert_triage("2025-01", {"arxiv_id_base": "a", "decision": "accept"})
+        db.upsert_summary("2025-01", {"arxiv_id_base": "a", "title": "A"})
+        db.upsert_triage_many("2025-01", [{"arxiv_id_base": "b", "decision": "reject"}])
+    assert trace.count("COMMIT") == 1
+
+    with pytest.raises(RuntimeError), db.transaction():
+        db.upsert_triage("2025-01", {"arxiv_id_base": "c", "decision": "accept"})
+        raise RuntimeError("boom")
+    assert db.get_triage("b")["decision"] == "reject"
+    assert db.get_triage("c") is None
+    db.close()
+
+
+def test_bootstrap_cache_from_outputs_is_one_transaction(tmp_path):
+    month_out = tmp_path / "outputs" / "2025-01"
+    ids = [f"2501.{i:05d}" for i in range(20)]
+    write_json(month_out / "arxiv_raw.json", [{"arxiv_id_base": i} for i in ids])
+    write_jsonl(month_out / "triage.jsonl", [{"arxiv_id_base": i, "decision": "accept"} for i in ids])
+    write_jsonl(month_out / "papers.jsonl", [{"arxiv_id_base": i, "title": i} for i in ids[:5]])
+    db = DigestDB(tmp_path / "digest.sqlite")
+    trace = _commits(db)
+
+    _bootstrap_cache_from_outputs(db, "2025-01", month_out)
+
+    assert trace.count("COMMIT") == 1
+    assert db.get_triage(ids[-1])["decision"] == "accept"
+    assert db.get_summary(ids[0])["title"] == ids[0]
+    db.close()
+
+
+def test_arxiv_watermarks_round_trip(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    assert db.get_arxiv_watermarks("2025-01") == {}
+    db.set_arxiv_watermarks("2025-01", {"qa": "2025-01-05T00:00:00Z", "qb": "2025-01-06T00:00:00Z"})
+    db.set_arxiv_watermarks("2025-01", {"qa": "2025-02-01T00:00:00Z"})
+    assert db.get_arxiv_watermarks("2025-01") == {"qa": "2025-02-01T00:00:00Z", "qb": "2025-01-06T00:00:00Z"}
+    assert db.get_arxiv_watermarks("2025-02") == {}
+    db.close()
+
+
+def test_connections_use_wal_and_are_per_thread(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    other: list[object] = []
+    worker = threading.Thread(target=lambda: other.append(db.conn))
+    worker.start()
+    worker.join()
+    assert other[0] is not db.conn
+    db.close()
+
+
+def test_concurrent_writers_and_readers_do_not_lock(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+
+    def work(worker: int) -> int:
+        hits = 0
+        for i in range(40):
+            aid = f"{worker}.{i}"
+            db.upsert_triage("2025-01", {"arxiv_id_base": aid, "decision": "reject"})
+            with db.transaction():
+                db.upsert_summaries_many("2025-01", [{"arxiv_id_base": aid, "title": aid}])
+            hits += db.get_triage(aid) is not None
+        return hits
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(work, range(8))) == [40] * 8
+    assert db.conn.execute("SELECT COUNT(*) FROM triage").fetchone()[0] == 320
+    assert db.conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0] == 320
+    db.close()
+
+
+def test_bulk_cache_readers(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    db.upsert_triage_many("2025-01", [{"arxiv_id_base": f"a{i}", "decision": "accept"} for i in range(3)])
+    db.upsert_triage("2024-12", {"arxiv_id_base": "moved", "decision": "reject"})
+    db.upsert_summaries_many("2025-01", [{"arxiv_id_base": f"a{i}", "title": f"T{i}"} for i in range(1500)])
+
+    triage = db.get_triage_for_month("2025-01", ["a0", "moved", "unknown"])
+    assert sorted(triage) == ["a0", "a1", "a2", "moved"]
+    assert triage["moved"]["decision"] == "reject"
+
+    ids = [f"a{i}" for i in range(0, 1500, 2)] + ["unknown"]
+    summaries = db.get_summaries_for_ids(ids * 2)
+    assert len(summaries) == 750
+    assert summaries["a1498"]["title"] == "T1498"
+    db.close()
+
+
+def test_stale_ids_track_recorded_versions(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    v1 = ResultVersion("p1", "s1", "m")
+    v2 = ResultVersion("p2", "s1", "m")
+    db.upsert_triage("2025-01", {"arxiv_id_base": "old", "decision": "accept"}, v1)
+    db.upsert_triage("2025-01", {"arxiv_id_base": "new", "decision": "accept"}, v2)
+    db.upsert_triage("2025-01", {"arxiv_id_base": "legacy", "decision": "accept"})
+    # Re-upserting without a version (bootstrap from outputs) keeps the recorded one.
+    db.upsert_triage_many("2025-01", [{"arxiv_id_base": "new", "decision": "accept"}])
+
+    assert db.get_stale_triage_ids(["old", "new", "legacy", "missing"], v2) == {"old", "legacy"}
+    assert db.get_stale_triage_ids(["old", "new", "legacy"], v2, v1) == {"legacy"}
+    db.upsert_summary("2025-01", {"arxiv_id_base": "old"}, v1)
+    assert db.get_stale_summary_ids(["old"], v1) == set()
+    assert db.get_stale_summary_ids(["old"], ResultVersion("p1", "s1", "other-model")) == {"old"}
+    db.close()
+
+
+def test_version_columns_are_added_to_existing_databases(tmp_path):
+    path = tmp_path / "digest.sqlite"
+    legacy = sqlite3.connect(path)
+    legacy.execute(
+        "CREATE TABLE triage (arxiv_id_base TEXT PRIMARY KEY, month TEXT NOT NULL, "
+        "triage_json TEXT NOT NULL, updated_at TEXT DEFAULT CURRENT_TIMESTAMP)"
+    )
+    legacy.execute("INSERT INTO triage(arxiv_id_base, month, triage_json) VALUES ('a', '2025-01', '{}')")
+    legacy.commit()
+    legacy.close()
+
+    db = DigestDB(path)
+    assert db.get_stale_triage_ids(["a"], ResultVersion("p", "s", "m")) == {"a"}
+    db.upsert_triage("2025-01", {"arxiv_id_base": "a"}, ResultVersion("p", "s", "m"))
+    assert db.get_stale_triage_ids(["a"], ResultVersion("p", "s", "m")) == set()
+    db.close()
+
+
+def test_result_version_hashes_files(tmp_path):
+    prompt, schema = tmp_path / "prompt.md", tmp_path / "schema.json"
+    prompt.write_text("v1", encoding="utf-8")
+    schema.write_text("{}", encoding="utf-8")
+    first = result_version(prompt, schema, "m")
+    prompt.write_text("v2", encoding="utf-8")
+    second = result_version(prompt, schema, "m")
+    assert first.schema_sha == second.schema_sha
+    assert first.prompt_sha != second.prompt_sha
+
+
+def test_work_ledger_counts_attempts_and_requeues_running(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    db.set_work_state("2025-01", "triage", ["a", "b"], "pending")
+    db.set_work_state("2025-01", "triage", ["a", "b"], "running")
+    db.set_work_state("2025-01", "triage", ["a"], "failed", error="triage_exception:ValueError")
+    db.set_work_state("2025-01", "triage", ["a"], "running")
+    db.set_work_state("2025-01", "triage", ["a"], "done")
+
+    states = db.get_work_states("2025-01", "triage")
+    assert (states["a"].state, states["a"].attempts, states["a"].error) == ("done", 2, None)
+    assert (states["b"].state, states["b"].attempts) == ("running", 1)
+    assert db.get_work_states("2025-01", "summary") == {}
+    assert db.requeue_running_work() == 1
+    assert db.count_work_states("2025-01", "triage") == {"done": 1, "pending": 1}
+    with pytest.raises(ValueError):
+        db.set_work_state("2025-01", "triage", ["a"], "paused")
+    db.close()
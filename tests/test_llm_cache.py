@@ -0,0 +1,175 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from eegfm_digest.db import LLM_TOUCH_BATCH, DigestDB
+from eegfm_digest.llm_cache import CachedLLM, llm_cache_key, with_llm_cache
+from eegfm_digest.triage import TRIAGE_JSON_ERROR, load_schema, triage_paper
+
+
+class _CountingLLM:
+    def __init__(self):
+        self.calls: list[str] = []
+
+    def generate(self, prompt, schema=None):
+        self.calls.append(prompt)
+        if prompt == "boom":
+            raise RuntimeError("provider error")
+        return f"answer:{prompt}"
+
+
+def test_repeated_calls_are_served_from_cache(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    inner = _CountingLLM()
+    llm = CachedLLM(inner, db, model="m", temperature=0.2, max_bytes=1 << 20)
+
+    assert llm.generate("p1", schema={"type": "object"}) == "answer:p1"
+    assert llm.generate("p1", schema={"type": "object"}) == "answer:p1"
+    assert llm.generate("p1", schema={"type": "object"}) == "answer:p1"
+    assert inner.calls == ["p1"]
+    assert (llm.hits, llm.misses) == (2, 1)
+
+    # A fresh wrapper (next run) still hits the persisted entry.
+    again = CachedLLM(inner, db, model="m", temperature=0.2, max_bytes=1 << 20)
+    again.generate("p1", schema={"type": "object"})
+    assert inner.calls == ["p1"]
+    db.close()
+
+
+def test_key_covers_prompt_model_temperature_and_schema():
+    base = llm_cache_key("p", "m", 0.2, {"type": "object"})
+    assert base == llm_cache_key("p", "m", 0.2, {"type": "object"})
+    assert base != llm_cache_key("p2", "m", 0.2, {"type": "object"})
+    assert base != llm_cache_key("p", "m2", 0.2, {"type": "object"})
+    assert base != llm_cache_key("p", "m", 0.3, {"type": "object"})
+    assert base != llm_cache_key("p", "m", 0.2, None)
+
+
+def test_errors_are_not_cached(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    inner = _CountingLLM()
+    llm = CachedLLM(inner, db, model="m", temperature=0.2, max_bytes=1 << 20)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            llm.generate("boom")
+    assert inner.calls == ["boom", "boom"]
+    db.close()
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("eegfm_digest.db.time.time", lambda: clock["now"])
+    db = DigestDB(tmp_path / "digest.sqlite")
+    inner = _CountingLLM()
+    # Each response is 9 bytes ("answer:pN"); room for two.
+    llm = CachedLLM(inner, db, model="m", temperature=0.0, max_bytes=20)
+
+    for prompt in ("p1", "p2"):
+        clock["now"] += 1
+        llm.generate(prompt)
+    clock["now"] += 1
+    llm.generate("p1")  # refresh p1 so p2 is the LRU entry
+    clock["now"] += 1
+    llm.generate("p3")
+
+    inner.calls.clear()
+    for prompt in ("p1", "p3", "p2"):
+        clock["now"] += 1
+        llm.generate(prompt)
+    assert inner.calls == ["p2"]
+    db.close()
+
+
+def test_cache_disabled_returns_the_client_unchanged(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    inner = _CountingLLM()
+    assert with_llm_cache(inner, db, model="m", temperature=0.2, max_mb=0) is inner
+    assert isinstance(with_llm_cache(inner, db, model="m", temperature=0.2, max_mb=1), CachedLLM)
+    db.close()
+
+
+class _ScriptedLLM:
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.calls = 0
+
+    def generate(self, prompt, schema=None):
+        self.calls += 1
+        return self.reply
+
+
+def _triage(llm) -> dict:
+    return triage_paper(
+        paper={"arxiv_id_base": "2501.00001", "title": "EEG model", "summary": "abstract"},
+        llm=llm,
+        prompt_template=Path("prompts/triage.md").read_text(encoding="utf-8"),
+        repair_template=Path("prompts/repair_json.md").read_text(encoding="utf-8"),
+        schema=load_schema(Path("schemas/triage.json")),
+    )
+
+
+def test_outputs_that_fail_validation_are_not_replayed(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    bad = _ScriptedLLM("not json")
+    row = _triage(CachedLLM(bad, db, model="m", temperature=0.0, max_bytes=1 << 20))
+    assert TRIAGE_JSON_ERROR in row["reasons"]
+    assert bad.calls == 2  # original + repair, neither cached
+
+    good = _ScriptedLLM(json.dumps({"decision": "accept", "confidence": 0.9, "reasons": ["eeg", "fm"]}))
+    rerun = CachedLLM(good, db, model="m", temperature=0.0, max_bytes=1 << 20)
+    assert _triage(rerun)["decision"] == "accept"
+    assert good.calls == 1
+
+    # The validated response is cached now.
+    assert _triage(CachedLLM(good, db, model="m", temperature=0.0, max_bytes=1 << 20))["decision"] == "accept"
+    assert good.calls == 1
+    db.close()
+
+
+def test_refresh_skips_lookups_but_stores_new_responses(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    inner = _CountingLLM()
+    CachedLLM(inner, db, model="m", temperature=0.0, max_bytes=1 << 20).generate("p1")
+    forced = CachedLLM(inner, db, model="m", temperature=0.0, max_bytes=1 << 20, refresh=True)
+    forced.generate("p1")
+    assert forced.peek("p1") is None
+    assert inner.calls == ["p1", "p1"]
+    assert CachedLLM(inner, db, model="m", temperature=0.0, max_bytes=1 << 20).peek("p1") == "answer:p1"
+    db.close()
+
+
+def test_cache_hits_batch_recency_updates(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    llm = CachedLLM(_CountingLLM(), db, model="m", temperature=0.0, max_bytes=1 << 20)
+    llm.generate("p1")
+    statements: list[str] = []
+    db.conn.set_trace_callback(statements.append)
+    for _ in range(LLM_TOUCH_BATCH - 1):
+        llm.generate("p1")
+    assert "COMMIT" not in statements
+    llm.generate("p1")
+    assert statements.count("COMMIT") == 1
+    db.close()
+
+
+def test_deferred_responses_are_scoped_to_their_context(tmp_path):
+    import asyncio
+
+    db = DigestDB(tmp_path / "digest.sqlite")
+    llm = CachedLLM(_CountingLLM(), db, model="m", temperature=0.0, max_bytes=1 << 20)
+
+    async def work(prompt: str, keep_it: bool) -> None:
+        with llm.deferred() as keep:
+            await asyncio.sleep(0)  # both tasks are now inside a deferred block on one thread
+            llm.generate(prompt)
+            if keep_it:
+                keep()
+
+    async def main() -> None:
+        await asyncio.gather(work("kept", True), work("dropped", False))
+
+    asyncio.run(main())
+    assert llm.peek("kept") == "answer:kept"
+    assert llm.peek("dropped") is None
+    db.close()
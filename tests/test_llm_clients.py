@@ -0,0 +1,116 @@
+import json
+from typing import ClassVar
+
+import httpx
+import pytest
+
+from eegfm_digest.concurrency import (
+    AdaptiveRateLimiter,
+    RateLimited,
+    RateLimitedLLM,
+    RateLimiter,
+    RateLimitStop,
+)
+from eegfm_digest.llm_gemini import GeminiClient, LLMConfig
+from eegfm_digest.llm_openrouter import OpenRouterClient
+
+
+def _chat_payload(text: str) -> dict:
+    return {"choices": [{"message": {"content": text}}]}
+
+
+def _openrouter(transport: httpx.MockTransport, **kwargs) -> OpenRouterClient:
+    client = OpenRouterClient(api_key="k", model="m", temperature=0.2, max_output_tokens=64, **kwargs)
+    client._client = httpx.Client(transport=transport)
+    return client
+
+
+def test_openrouter_request_shape():
+    bodies: list[dict] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        assert request.headers["Authorization"] == "Bearer k"
+        return httpx.Response(200, json=_chat_payload(' {"ok": true} '))
+
+    client = _openrouter(httpx.MockTransport(handler))
+    assert client.generate("s", schema={}) == '{"ok": true}'
+    assert client.generate("t") == '{"ok": true}'
+    assert [b["messages"][0]["content"] for b in bodies] == ["s", "t"]
+    assert bodies[0]["response_format"] == {"type": "json_object"}
+    assert "response_format" not in bodies[1]
+    client.close()
+
+
+def test_openrouter_quota_raises_rate_limit_stop():
+    transport = httpx.MockTransport(lambda _request: httpx.Response(402, text="no credits"))
+    with pytest.raises(RateLimitStop):
+        _openrouter(transport).generate("p")
+
+
+def test_gemini_client_calls_the_shared_genai_models():
+    class FakeModels:
+        def generate_content(self, model, contents, config):
+            assert config["response_mime_type"] == "application/json"
+            return type("Resp", (), {"text": f" {model}:{contents} "})()
+
+        def count_tokens(self, model, contents):
+            return {"total_tokens": len(contents)}
+
+    client = GeminiClient.__new__(GeminiClient)
+    client.config = LLMConfig(api_key="k", model="gm", temperature=0.2, max_output_tokens=64)
+    client._client = type("FakeGenai", (), {"models": FakeModels()})()
+
+    limited = RateLimitedLLM(client, RateLimiter.per_minute(0))
+    assert limited.generate("hello", schema={}) == "gm:hello"
+    assert limited.count_tokens("12345") == 5
+
+
+def test_openrouter_429_is_retried_through_the_adaptive_limiter(monkeypatch):
+    monkeypatch.setattr("eegfm_digest.concurrency.time.sleep", lambda _s: None)
+    statuses = iter([429, 429, 200])
+
+    def handler(_request: httpx.Request) -> httpx.Response:
+        status = next(statuses)
+        if status == 429:
+            return httpx.Response(429, headers={"Retry-After": "7"}, text="slow down")
+        return httpx.Response(200, json=_chat_payload("done"))
+
+    limiter = AdaptiveRateLimiter(120)
+    throttles: list[float | None] = []
+    on_throttle = limiter.on_throttle
+    monkeypatch.setattr(limiter, "on_throttle", lambda ra=None: (throttles.append(ra), on_throttle(ra)))
+
+    llm = RateLimitedLLM(_openrouter(httpx.MockTransport(handler)), limiter)
+    assert llm.generate("p") == "done"
+    assert throttles == [7.0, 7.0]
+    # Two halvings, then one success adds its 1/rate share of the 1 rpm/minute step.
+    assert limiter.requests_per_minute == pytest.approx(120 * 0.25 + 1 / (120 * 0.25))
+
+
+def test_openrouter_persistent_429_stops_after_max_retries(monkeypatch):
+    monkeypatch.setattr("eegfm_digest.concurrency.time.sleep", lambda _s: None)
+    transport = httpx.MockTransport(lambda _request: httpx.Response(429, text="slow down"))
+    llm = RateLimitedLLM(_openrouter(transport), AdaptiveRateLimiter(60), max_retries=2)
+    with pytest.raises(RateLimitStop, match="after 2 retries"):
+        llm.generate("p")
+
+
+def test_gemini_resource_exhausted_maps_to_rate_limited():
+    class ClientError(Exception):
+        code = 429
+        details: ClassVar[dict] = {
+            "error": {"details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "37s"}]}
+        }
+
+    class FakeModels:
+        def generate_content(self, model, contents, config):
+            raise ClientError("RESOURCE_EXHAUSTED")
+
+    client = GeminiClient.__new__(GeminiClient)
+    client.config = LLMConfig(api_key="k", model="gm", temperature=0.2, max_output_tokens=64)
+    client._client = type("FakeGenai", (), {"models": FakeModels()})()
+
+    with pytest.raises(RateLimited) as info:
+        client.generate("p")
+    assert info.value.retry_after == 37.0
@@ -0,0 +1,62 @@
+import httpx
+import pytest
+
+from eegfm_digest.pdf import IncompleteDownloadError, PdfDownloader
+
+BODY = b"%PDF-1.4\n" + bytes(range(256)) * 40
+
+
+def _range_server(requests: list[httpx.Request], truncate_to: int | None = None) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        range_header = request.headers.get("Range")
+        if range_header:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            if start >= len(BODY):
+                return httpx.Response(416)
+            return httpx.Response(
+                206,
+                content=BODY[start:],
+                headers={"Content-Range": f"bytes {start}-{len(BODY) - 1}/{len(BODY)}"},
+            )
+        body = BODY if truncate_to is None else BODY[:truncate_to]
+        return httpx.Response(200, content=body, headers={"Content-Length": str(len(BODY))})
+
+    return httpx.MockTransport(handler)
+
+
+def test_downloader_reuses_client_and_writes_atomically(tmp_path):
+    requests: list[httpx.Request] = []
+    with httpx.Client(transport=_range_server(requests)) as client:
+        downloader = PdfDownloader(client=client, chunk_size=100)
+        for name in ("a", "b"):
+            out = downloader.download(f"https://arxiv.org/pdf/{name}", tmp_path / f"{name}.pdf")
+            assert out.read_bytes() == BODY
+        downloader.download("https://arxiv.org/pdf/a", tmp_path / "a.pdf")
+    assert len(requests) == 2
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_downloader_resumes_partial_file_with_range(tmp_path):
+    out = tmp_path / "a.pdf"
+    (tmp_path / "a.pdf.part").write_bytes(BODY[:1000])
+    requests: list[httpx.Request] = []
+    with httpx.Client(transport=_range_server(requests)) as client:
+        PdfDownloader(client=client).download("https://arxiv.org/pdf/a", out)
+    assert requests[0].headers["Range"] == "bytes=1000-"
+    assert out.read_bytes() == BODY
+
+
+def test_downloader_truncated_body_never_becomes_cached_pdf(tmp_path):
+    out = tmp_path / "a.pdf"
+    requests: list[httpx.Request] = []
+    with httpx.Client(transport=_range_server(requests, truncate_to=500)) as client:
+        downloader = PdfDownloader(client=client)
+        with pytest.raises(IncompleteDownloadError):
+            downloader.download("https://arxiv.org/pdf/a", out)
+        assert not out.exists()
+        assert (tmp_path / "a.pdf.part").stat().st_size == 500
+
+        downloader.download("https://arxiv.org/pdf/a", out)
+    assert requests[-1].headers["Range"] == "bytes=500-"
+    assert out.read_bytes() == BODY
@@ -0,0 +1,64 @@
+import os
+import time
+from pathlib import Path
+
+from pypdf import PdfWriter
+
+from eegfm_digest.pdf import PdfExtractor, extract_text
+
+
+def _pid_extract(_pdf_path: Path, text_path: Path) -> dict:
+    text_path.write_text("text", encoding="utf-8")
+    return {"tool": "fake", "pages": 1, "chars": 4, "error": None, "pid": os.getpid()}
+
+
+def _hang_extract(_pdf_path: Path, _text_path: Path) -> dict:
+    time.sleep(60)
+    return {"tool": "fake", "pages": 1, "chars": 0, "error": None}
+
+
+def _oom_extract(_pdf_path: Path, _text_path: Path) -> dict:
+    raise MemoryError()
+
+
+def _blank_pdf(path: Path) -> Path:
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    with path.open("wb") as fh:
+        writer.write(fh)
+    return path
+
+
+def test_process_extractor_matches_inline_extraction(tmp_path):
+    pdf_path = _blank_pdf(tmp_path / "a.pdf")
+    inline = extract_text(pdf_path, tmp_path / "inline" / "a.txt")
+    with PdfExtractor(workers=1) as extractor:
+        pooled = extractor.extract(pdf_path, tmp_path / "pooled" / "a.txt")
+        cached = extractor.extract(pdf_path, tmp_path / "pooled" / "a.txt")
+    assert pooled == inline
+    assert pooled["tool"] == "pypdf"
+    assert (tmp_path / "pooled" / "a.txt").exists()
+    assert cached["tool"] == "cached"
+
+
+def test_process_extractor_recycles_workers(tmp_path):
+    with PdfExtractor(workers=1, max_tasks_per_worker=2, extract_fn=_pid_extract) as extractor:
+        pids = [extractor.extract(tmp_path / "x.pdf", tmp_path / f"{n}.txt")["pid"] for n in range(3)]
+    assert pids[0] == pids[1]
+    assert pids[2] != pids[1]
+    assert os.getpid() not in pids
+
+
+def test_process_extractor_reports_timeout_and_replaces_worker(tmp_path):
+    with PdfExtractor(workers=1, timeout_seconds=0.5, extract_fn=_hang_extract) as extractor:
+        meta = extractor.extract(tmp_path / "x.pdf", tmp_path / "slow.txt")
+    assert meta["tool"] == "timeout"
+    assert meta["error"].startswith("extract_timeout:")
+    assert not (tmp_path / "slow.txt").exists()
+
+
+def test_process_extractor_reports_oom(tmp_path):
+    with PdfExtractor(workers=1, extract_fn=_oom_extract) as extractor:
+        meta = extractor.extract(tmp_path / "x.pdf", tmp_path / "big.txt")
+    assert meta["tool"] == "oom"
+    assert meta["error"].startswith("extract_oom:")
@@ -1,9 +1,13 @@
 import hashlib
 import json
+import stat
 from pathlib import Path
 
+import pytest
+
 from eegfm_digest.config import Config
 from eegfm_digest.pipeline import run_month
+from eegfm_digest.render import iter_jsonl, write_json, write_jsonl
 
 
 def _candidate(arxiv_id_base: str, published: str, title: str) -> dict:
@@ -55,7 +59,7 @@ def test_pipeline_writes_backend_rows_and_skips_site(monkeypatch, tmp_path):
 
     monkeypatch.setattr("eegfm_digest.pipeline.triage_paper", fake_triage_paper)
 
-    def fake_download_pdf(_url, out_path, _rate):  # noqa: ANN001
+    def fake_download_pdf(_url, out_path, _rate, **_kwargs):
         out_path.parent.mkdir(parents=True, exist_ok=True)
         out_path.write_bytes(b"%PDF-1.4")
         return out_path
@@ -185,7 +189,7 @@ def test_pipeline_site_outputs_manifest_month_revision(monkeypatch, tmp_path):
         },
     )
 
-    def fake_download_pdf(_url, out_path, _rate):  # noqa: ANN001
+    def fake_download_pdf(_url, out_path, _rate, **_kwargs):
         out_path.parent.mkdir(parents=True, exist_ok=True)
         out_path.write_bytes(b"%PDF-1.4")
         return out_path
@@ -273,3 +277,64 @@ def test_pipeline_site_outputs_manifest_month_revision(monkeypatch, tmp_path):
     assert (cfg.docs_dir / "index.html").exists()
     assert (cfg.docs_dir / "explore" / "index.html").exists()
     assert (cfg.docs_dir / "process" / "index.html").exists()
+
+
+def test_json_writers_pretty_compact_and_streamed(tmp_path):
+    payload = [{"b": "é", "a": [1, 2]}, {"c": None}]
+    write_json(tmp_path / "pretty.json", payload)
+    write_json(tmp_path / "compact.json", payload, compact=True)
+    write_json(tmp_path / "object.json", {"k": payload}, compact=True)
+    write_jsonl(tmp_path / "rows.jsonl", (row for row in payload))
+    write_jsonl(tmp_path / "empty.jsonl", [])
+
+    read = lambda name: (tmp_path / name).read_text(encoding="utf-8")
+    assert read("pretty.json") == json.dumps(payload, ensure_ascii=False, indent=2, sort_keys=True) + "\n"
+    assert read("compact.json") == '[{"a":[1,2],"b":"é"},{"c":null}]\n'
+    assert json.loads(read("object.json")) == {"k": payload}
+    assert _read_jsonl(tmp_path / "rows.jsonl") == payload
+    assert read("empty.jsonl") == ""
+
+
+def test_interrupted_write_keeps_previous_file(tmp_path):
+    path = tmp_path / "triage.jsonl"
+    write_jsonl(path, [{"arxiv_id_base": "old"}])
+
+    def rows():
+        yield {"arxiv_id_base": "new"}
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        write_jsonl(path, rows())
+
+    assert _read_jsonl(path) == [{"arxiv_id_base": "old"}]
+    assert [p.name for p in tmp_path.iterdir()] == ["triage.jsonl"]
+
+
+def test_iter_jsonl_streams_with_projection_and_line_filter(tmp_path):
+    path = tmp_path / "triage.jsonl"
+    rows = [
+        {"arxiv_id_base": "a", "decision": "accept", "reasons": ["eeg"]},
+        {"arxiv_id_base": "b", "decision": "reject", "reasons": ["triage_exception:ClientError"]},
+    ]
+    write_jsonl(path, rows)
+
+    assert list(iter_jsonl(path)) == rows
+    assert list(iter_jsonl(path, fields=("arxiv_id_base", "missing"))) == [
+        {"arxiv_id_base": "a"},
+        {"arxiv_id_base": "b"},
+    ]
+    assert [r["arxiv_id_base"] for r in iter_jsonl(path, contains="ClientError")] == ["b"]
+    assert list(iter_jsonl(tmp_path / "absent.jsonl")) == []
+
+
+def test_atomic_writes_use_umask_mode_and_keep_existing_mode(monkeypatch, tmp_path):
+    monkeypatch.setattr("eegfm_digest.render._UMASK", 0o002)
+    new = tmp_path / "months.json"
+    write_json(new, {"months": []})
+    assert stat.S_IMODE(new.stat().st_mode) == 0o664
+
+    existing = tmp_path / "papers.jsonl"
+    existing.write_text("", encoding="utf-8")
+    existing.chmod(0o640)
+    write_jsonl(existing, [{"arxiv_id_base": "a"}])
+    assert stat.S_IMODE(existing.stat().st_mode) == 0o640
@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+
+from eegfm_digest.batch import BatchRunConfig, _run_triage_phase_for_month
+from eegfm_digest.config import Config
+from eegfm_digest.db import DigestDB
+from eegfm_digest.prefilter import (
+    PREFILTER_REASON,
+    load_triage_history,
+    split_prefiltered,
+    train_prefilter,
+)
+
+ON_TOPIC = [
+    "An EEG foundation model pretrained on large unlabeled EEG corpora for broad transfer",
+    "Self-supervised masked pretraining of a large EEG transformer foundation model",
+    "Benchmarking EEG foundation models across downstream BCI and sleep tasks",
+    "Scaling laws for pretrained EEG foundation models",
+    "Fine-tuning EEG foundation models with parameter-efficient adapters",
+    "A multimodal EEG foundation model with pretrained transferable representations",
+]
+OFF_TOPIC = [
+    "Graph neural network generalization bounds for molecular property prediction",
+    "Transfer learning for crop yield forecasting from satellite imagery",
+    "Masked autoencoders for speech representation learning",
+    "Domain generalization for medical image segmentation",
+]
+
+
+def _paper(aid: str, text: str) -> dict:
+    return {"arxiv_id_base": aid, "title": text, "summary": f"{text}. We report results."}
+
+
+def _history() -> tuple[list[dict], dict[str, str]]:
+    papers = [_paper(f"on{i}", t) for i, t in enumerate(ON_TOPIC)]
+    papers += [_paper(f"off{i}", t) for i, t in enumerate(OFF_TOPIC)]
+    decisions = {p["arxiv_id_base"]: "accept" if p["arxiv_id_base"].startswith("on") else "reject" for p in papers}
+    return papers, decisions
+
+
+def test_prefilter_keeps_every_historical_accept_and_rejects_off_topic():
+    papers, decisions = _history()
+    prefilter = train_prefilter(papers, decisions, margin=0.5)
+    assert prefilter is not None
+    assert not any(prefilter.rejects(p) for p in papers if decisions[p["arxiv_id_base"]] == "accept")
+
+    new = [
+        _paper("new-on", "A pretrained EEG foundation model for seizure detection transfer"),
+        _paper("new-off", "Quantum annealing for portfolio optimization"),
+    ]
+    rejected, keep = split_prefiltered(prefilter, new)
+    assert rejected == [
+        {"arxiv_id_base": "new-off", "decision": "reject", "confidence": 0.0, "reasons": [PREFILTER_REASON]}
+    ]
+    assert [p["arxiv_id_base"] for p in keep] == ["new-on"]
+
+
+def test_prefilter_disabled_without_margin_or_enough_accepts():
+    papers, decisions = _history()
+    assert train_prefilter(papers, decisions, margin=0.0) is None
+    few = {aid: d for aid, d in decisions.items() if aid not in {"on0", "on1"}}
+    assert train_prefilter(papers, few, margin=0.5) is None
+    assert split_prefiltered(None, papers) == ([], papers)
+
+
+def _write_month(output_dir: Path, month: str, papers: list[dict], rows: list[dict]) -> None:
+    month_dir = output_dir / month
+    month_dir.mkdir(parents=True)
+    (month_dir / "arxiv_raw.json").write_text(json.dumps(papers), encoding="utf-8")
+    (month_dir / "triage.jsonl").write_text("\n".join(json.dumps(r) for r in rows), encoding="utf-8")
+
+
+def test_load_triage_history_skips_prefilter_rows_and_later_months(tmp_path):
+    row = {"confidence": 0.5, "reasons": ["a", "b"]}
+    _write_month(
+        tmp_path,
+        "2025-01",
+        [_paper("a", "x"), _paper("b", "y")],
+        [
+            {"arxiv_id_base": "a", "decision": "accept", **row},
+            {"arxiv_id_base": "b", "decision": "reject", "confidence": 0.0, "reasons": [PREFILTER_REASON]},
+        ],
+    )
+    _write_month(tmp_path, "2025-02", [_paper("c", "z")], [{"arxiv_id_base": "c", "decision": "reject", **row}])
+
+    papers, decisions = load_triage_history(tmp_path, before="2025-02")
+    assert decisions == {"a": "accept"}
+    assert [p["arxiv_id_base"] for p in papers] == ["a", "b"]
+    assert load_triage_history(tmp_path)[1] == {"a": "accept", "c": "reject"}
+
+
+def test_triage_phase_skips_llm_for_prefiltered_candidates(monkeypatch, tmp_path):
+    cfg = Config(
+        gemini_model_triage="triage-model",
+        gemini_model_summary="summary-model",
+        output_dir=tmp_path / "outputs",
+        data_dir=tmp_path / "data",
+        docs_dir=tmp_path / "docs",
+    )
+    history, decisions = _history()
+    _write_month(
+        cfg.output_dir,
+        "2024-12",
+        history,
+        [{"arxiv_id_base": aid, "decision": d, "confidence": 0.5, "reasons": ["a", "b"]} for aid, d in decisions.items()],
+    )
+    candidates = [
+        _paper("2501.00001", "A pretrained EEG foundation model for sleep staging transfer"),
+        _paper("2501.00002", "Quantum annealing for portfolio optimization"),
+    ]
+    (cfg.output_dir / "2025-01").mkdir()
+    (cfg.output_dir / "2025-01" / "arxiv_raw.json").write_text(json.dumps(candidates), encoding="utf-8")
+    db = DigestDB(cfg.data_dir / "digest.sqlite")
+    called: list[str] = []
+
+    def fake_triage_paper(paper, **_kwargs):
+        called.append(paper["arxiv_id_base"])
+        return {"decision": "accept", "confidence": 0.9, "reasons": ["r1", "r2"]}
+
+    monkeypatch.setattr("eegfm_digest.batch.triage_paper", fake_triage_paper)
+    prefilter = train_prefilter(*load_triage_history(cfg.output_dir), margin=0.5)
+    _run_triage_phase_for_month(
+        cfg, BatchRunConfig(months=["2025-01"]), "2025-01", db, llm=object(), prefilter=prefilter
+    )
+
+    assert called == ["2501.00001"]
+    assert db.get_triage("2501.00002")["reasons"] == [PREFILTER_REASON]
+    rows = [json.loads(line) for line in (cfg.output_dir / "2025-01" / "triage.jsonl").read_text().splitlines()]
+    assert [r["decision"] for r in rows] == ["accept", "reject"]
+    db.close()
@@ -2,7 +2,7 @@ import json
 from pathlib import Path
 
 from eegfm_digest.summarize import summarize_paper
-from eegfm_digest.triage import load_schema, triage_paper
+from eegfm_digest.triage import load_schema, pack_schema, triage_pack, triage_paper
 
 
 class FakeLLM:
@@ -128,3 +128,75 @@ def test_summary_fallback_path():
     assert out["arxiv_id_base"] == "2501.12345"
     assert out["used_fulltext"] is False
     assert "summary_json_error" in out["notes"]
+
+
+def _pack_papers(n: int) -> list[dict]:
+    return [
+        {"arxiv_id_base": f"2501.0000{i}", "title": f"Title {i}", "summary": f"Abstract {i}"} for i in range(n)
+    ]
+
+
+def _item(aid: str, **overrides) -> dict:
+    return {"arxiv_id_base": aid, "decision": "accept", "confidence": 0.8, "reasons": ["eeg", "fm"], **overrides}
+
+
+def test_pack_schema_is_a_list_of_triage_items():
+    schema = pack_schema(load_schema(Path("schemas/triage.json")))
+    item = schema["properties"]["results"]["items"]
+    assert item["required"] == ["arxiv_id_base", "decision", "confidence", "reasons"]
+    assert item["additionalProperties"] is False
+    assert "$schema" not in item
+
+
+def test_triage_pack_falls_back_per_paper_only_for_failed_items():
+    papers = _pack_papers(4)
+    ids = [p["arxiv_id_base"] for p in papers]
+    response = {
+        "results": [
+            _item(ids[0]),
+            _item(ids[1], confidence=2.0),
+            _item("9999.99999"),
+            _item(ids[3], decision="reject"),
+        ]
+    }
+    llm = FakeLLM([json.dumps(response)])
+    fallback_ids: list[str] = []
+
+    def fallback(paper):
+        fallback_ids.append(paper["arxiv_id_base"])
+        return {"arxiv_id_base": paper["arxiv_id_base"], "decision": "borderline", "confidence": 0.5, "reasons": ["a", "b"]}
+
+    rows = triage_pack(
+        papers,
+        llm,
+        "PAPERS:\n{{PAPERS_JSON}}",
+        Path("prompts/repair_json.md").read_text(),
+        load_schema(Path("schemas/triage.json")),
+        fallback,
+    )
+
+    assert len(llm.prompts) == 1
+    payload = json.loads(llm.prompts[0].split("PAPERS:\n", 1)[1])
+    assert payload[0] == {"arxiv_id_base": ids[0], "title": "Title 0", "abstract": "Abstract 0"}
+    assert fallback_ids == [ids[1], ids[2]]
+    assert [r["arxiv_id_base"] for r, _ in rows] == ids
+    assert [r["decision"] for r, _ in rows] == ["accept", "borderline", "borderline", "reject"]
+    assert [packed for _, packed in rows] == [True, False, False, True]
+
+
+def test_triage_pack_repairs_unparseable_output_once_then_falls_back():
+    papers = _pack_papers(2)
+    llm = FakeLLM(["not json", "still not json"])
+    rows = triage_pack(
+        papers,
+        llm,
+        "{{PAPERS_JSON}}",
+        Path("prompts/repair_json.md").read_text(),
+        load_schema(Path("schemas/triage.json")),
+        lambda paper: {"arxiv_id_base": paper["arxiv_id_base"], "decision": "reject"},
+    )
+    assert len(llm.prompts) == 2
+    assert '"results"' in llm.prompts[1]
+    assert rows == [
+        ({"arxiv_id_base": p["arxiv_id_base"], "decision": "reject"}, False) for p in papers
+    ]
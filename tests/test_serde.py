@@ -0,0 +1,62 @@
+import json
+import math
+from dataclasses import dataclass
+from enum import IntEnum
+
+import pytest
+
+from eegfm_digest import serde
+
+
+@pytest.fixture(params=serde.BACKENDS)
+def backend(request):
+    previous = serde.backend()
+    serde.use_backend(request.param)
+    yield request.param
+    serde.use_backend(previous)
+
+
+class Level(IntEnum):
+    HIGH = 2
+
+
+SAMPLES = [
+    {"b": "é ✓  ", "a": [1, 0.1, -0.0, 1e15, True, None], "z": {}, "y": []},
+    {"floats": [1e16, 1e-5, 5e-324, 1.7976931348623157e308, 123456.789]},
+    {"big": 2**64, "neg": -(2**63) - 1},
+    {"esc": "\"\\\n\t\x00\x1f\x7f\u2028"},
+    {2: "int key", 1: "sorted as ints"},
+    {"enum": Level.HIGH, "tuple": (1, 2)},
+    [{"k": float("nan")}, float("inf")],
+]
+
+
+@pytest.mark.parametrize("obj", SAMPLES)
+def test_dumps_is_byte_identical_to_stdlib(backend, obj):
+    assert serde.dumps(obj, pretty=True) == json.dumps(obj, ensure_ascii=False, indent=2, sort_keys=True)
+    assert serde.dumps(obj) == json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    unsorted = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    assert serde.dumps(obj, sort_keys=False) == unsorted
+
+
+def test_unserializable_objects_raise_like_stdlib(backend):
+    @dataclass
+    class Row:
+        x: int
+
+    with pytest.raises(TypeError):
+        serde.dumps({"row": Row(1)})
+
+
+def test_loads_accepts_str_bytes_and_stdlib_extensions(backend):
+    assert serde.loads('{"a": [1, "é"]}') == {"a": [1, "é"]}
+    assert serde.loads(b'{"a": 1}') == {"a": 1}
+    assert serde.loads(str(2**70)) == 2**70
+    assert math.isnan(serde.loads("NaN"))
+    with pytest.raises(ValueError):
+        serde.loads("{broken")
+
+
+def test_use_backend_rejects_unknown_names():
+    with pytest.raises(ValueError, match="not available"):
+        serde.use_backend("ujson")
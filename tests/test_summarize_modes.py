@@ -2,6 +2,7 @@ import json
 from pathlib import Path
 
 from eegfm_digest.summarize import summarize_paper
+from eegfm_digest.tokens import TokenEstimator, calibration_sample
 from eegfm_digest.triage import load_schema
 
 
@@ -9,8 +10,10 @@ class CaptureLLM:
     def __init__(self, token_result):
         self.token_result = token_result
         self.prompts: list[str] = []
+        self.count_calls = 0
 
     def count_tokens(self, content: str) -> int:
+        self.count_calls += 1
         if isinstance(self.token_result, Exception):
             raise self.token_result
         return int(self.token_result)
@@ -160,6 +163,40 @@ def test_summarize_uses_slices_when_count_tokens_fails():
     assert "fulltext_slices" in payload
 
 
+def _summarize_with_estimator(llm: CaptureLLM, fulltext: str, max_input_tokens: int) -> dict:
+    summarize_paper(
+        paper=PAPER,
+        triage=TRIAGE,
+        raw_fulltext=fulltext,
+        fulltext_slices=SLICES,
+        used_fulltext=True,
+        notes="meta",
+        llm=llm,
+        prompt_template="PAYLOAD:\n{{INPUT_JSON}}",
+        repair_template="schema={{SCHEMA_JSON}} bad={{BAD_OUTPUT}}",
+        schema=load_schema(Path("schemas/summary.json")),
+        max_input_tokens=max_input_tokens,
+        token_estimator=TokenEstimator(tokens_per_char=0.25, margin=0.15),
+    )
+    return _payload_from_prompt(llm.prompts[0])
+
+
+def test_local_estimate_skips_count_tokens_far_from_the_limit():
+    under = CaptureLLM(token_result=RuntimeError("must not be called"))
+    assert "fulltext" in _summarize_with_estimator(under, "word " * 2_000, max_input_tokens=100_000)
+    over = CaptureLLM(token_result=RuntimeError("must not be called"))
+    assert "fulltext_slices" in _summarize_with_estimator(over, "word " * 200_000, max_input_tokens=10_000)
+    assert under.count_calls == over.count_calls == 0
+
+
+def test_local_estimate_defers_to_count_tokens_near_the_limit():
+    fulltext = "word " * 8_000  # ~40k chars -> ~10k estimated tokens
+    llm = CaptureLLM(token_result=10_500)
+    payload = _summarize_with_estimator(llm, fulltext, max_input_tokens=10_000)
+    assert llm.count_calls == 1
+    assert "fulltext_slices" in payload
+
+
 def test_summarize_normalizes_paper_type_and_numeric_fields():
     schema = load_schema(Path("schemas/summary.json"))
 
@@ -225,3 +262,26 @@ def test_summarize_normalizes_paper_type_and_numeric_fields():
     assert out["data_scale"]["eeg_hours"] == 20000.0
     assert out["data_scale"]["channels"] == 64.0
     assert len(out["key_points"]) >= 2
+
+
+def test_near_limit_without_a_count_falls_back_to_the_logged_estimate():
+    fulltext = "word " * 7_000  # ~35k chars -> ~8.8k estimated tokens, within the 15% band
+    llm = CaptureLLM(token_result=RuntimeError("no count endpoint"))
+    summary = summarize_paper(
+        paper=PAPER,
+        triage=TRIAGE,
+        raw_fulltext=fulltext,
+        fulltext_slices=SLICES,
+        used_fulltext=True,
+        notes="meta",
+        llm=llm,
+        prompt_template="PAYLOAD:\n{{INPUT_JSON}}",
+        repair_template="schema={{SCHEMA_JSON}} bad={{BAD_OUTPUT}}",
+        schema=load_schema(Path("schemas/summary.json")),
+        max_input_tokens=10_000,
+        token_estimator=TokenEstimator(tokens_per_char=0.25, margin=0.15),
+    )
+    assert llm.count_calls == 1
+    assert "fulltext" in _payload_from_prompt(llm.prompts[0])
+    assert "prompt_tokens_est=" in summary["notes"]
+    assert calibration_sample(summary["notes"]) is None
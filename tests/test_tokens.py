@@ -0,0 +1,79 @@
+from eegfm_digest.db import DigestDB, ResultVersion
+from eegfm_digest.summarize import _render_prompt, _select_payload
+from eegfm_digest.tokens import (
+    DEFAULT_TOKENS_PER_CHAR,
+    TokenEstimator,
+    calibrate,
+    calibration_sample,
+    estimator_for,
+)
+
+
+def _notes(chars: int, tokens: int) -> str:
+    return (
+        f'{{"chars": {chars - 2_000}, "error": null, "pages": 10, "tool": "pypdf"}};'
+        f"input_mode=fulltext;prompt_tokens={tokens};prompt_chars={chars}"
+    )
+
+
+def test_calibration_sample_reads_exact_counts_only():
+    assert calibration_sample(_notes(40_000, 10_000)) == (40_000, 10_000)
+    assert calibration_sample('input_mode=fulltext;prompt_tokens_est=10000;prompt_chars=40000') is None
+    assert calibration_sample("input_mode=fulltext_slices;reason=missing_fulltext") is None
+    # Extracted-text chars omit the prompt template, so they never stand in for prompt_chars.
+    assert calibration_sample('{"chars": 38000};input_mode=fulltext;prompt_tokens=10000') is None
+
+
+class _CountingLLM:
+    def count_tokens(self, prompt: str) -> int:
+        return len(prompt) // 4
+
+
+def test_calibration_uses_rendered_prompt_length():
+    template = "Summarize the paper below. Return JSON only.\n{{INPUT_JSON}}\n" + "Rules. " * 500
+    paper = {
+        "arxiv_id_base": "2501.00001",
+        "title": "EEG FM",
+        "published": "2025-01-02T00:00:00Z",
+        "categories": ["cs.LG"],
+        "summary": "abstract " * 50,
+    }
+    fulltext = "body " * 2_000
+    payload, notes = _select_payload(paper, {}, fulltext, {}, template, _CountingLLM(), 100_000)
+
+    prompt = _render_prompt(template, payload)
+    sample = calibration_sample(f'{{"chars": {len(fulltext)}}};{notes}')
+    assert sample == (len(prompt), len(prompt) // 4)
+    assert calibrate([("m", notes)] * 5) == {"m": (len(prompt) // 4) / len(prompt)}
+
+
+def test_calibrate_per_model_needs_enough_samples():
+    rows = [("m1", _notes(40_000, 10_000 + i)) for i in range(5)]
+    rows += [("m2", _notes(30_000, 10_000))] * 2
+    calibration = calibrate(rows)
+    assert set(calibration) == {"m1"}
+    assert abs(calibration["m1"] - 0.25005) < 1e-4
+
+    assert estimator_for("m1", calibration).tokens_per_char == calibration["m1"]
+    assert estimator_for("m2", calibration).tokens_per_char == DEFAULT_TOKENS_PER_CHAR
+
+
+def test_estimator_flags_only_estimates_near_the_limit():
+    est = TokenEstimator(tokens_per_char=0.25, margin=0.1)
+    assert est.estimate("x" * 400) == 100
+    assert not est.near_limit(80, 100)
+    assert est.near_limit(95, 100)
+    assert est.near_limit(109, 100)
+    assert not est.near_limit(120, 100)
+
+
+def test_calibration_from_stored_summaries(tmp_path):
+    db = DigestDB(tmp_path / "digest.sqlite")
+    version = ResultVersion("p", "s", "gemini-x")
+    for i in range(5):
+        db.upsert_summary("2025-01", {"arxiv_id_base": f"a{i}", "notes": _notes(10_000, 3_000)}, version)
+    db.upsert_summary("2025-01", {"arxiv_id_base": "legacy", "notes": _notes(10_000, 2_000)})
+
+    calibration = calibrate(db.get_summary_notes())
+    assert calibration == {"gemini-x": 0.3}
+    db.close()